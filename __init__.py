@@ -1,384 +1,133 @@
-import base64
-import hashlib
-import logging
-import os
-from typing import Any, Optional
-from urllib.parse import urljoin
+"""
+Python client for the TSF file server.
 
-import requests
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
+Importing the package is cheap: the public names below are resolved from
+their submodules (auth, upload, download, metadata, crypto, ...) on first
+access, so ``requests`` and the AES backends are only loaded once something
+that needs them is used. The package never configures logging; attach a
+handler to the ``pytsfiler`` logger to see its messages.
+"""
 
-# SSL verification setting from environment
-SSL_VERIFY = os.getenv("SSL_VERIFY", "true").lower() in ("true", "1", "yes")
+import importlib
+import logging
+from typing import Any, Dict, List
 
-# Import enhanced client classes
-try:
-    from .client import (
-        AuthenticationError,
-        DownloadError,
-        FileInfo,
-        TSFClient,
-        TSFConfig,
-        TSFError,
-        UploadError,
-        UploadResult,
-        create_client,
-        progress_printer,
-    )
-except ImportError:
-    # Fallback for when aiohttp is not available
-    TSFClient = None
-    TSFConfig = None
-    UploadResult = None
-    FileInfo = None
-    TSFError = Exception
-    AuthenticationError = Exception
-    UploadError = Exception
-    DownloadError = Exception
-    create_client = None
-    progress_printer = None
+from .config import DEFAULT_CONFIG, SSL_VERIFY
+from .exceptions import (
+    AuthenticationError, CircuitOpenError, DownloadError, IntegrityError, PaddingError, TSFError, UploadError,
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-
-# Default configuration
-DEFAULT_CONFIG = {
-    "base_url": "https://localhost:3000",  # Changed to HTTPS
-    "verify_ssl": False,  # Can be changed to True in production
-    "timeout": 60,  # Increased timeout for network stability
-    "chunk_size": 8192,
-    "max_retries": 3,  # Number of retry attempts
-    "retry_backoff": 2  # Exponential backoff base
+logger.addHandler(logging.NullHandler())
+
+# 公開名 → 定義しているサブモジュール (初回アクセス時に import する)
+_LAZY: Dict[str, str] = {
+    # Pooled HTTP session and token management
+    'TSFSession': 'session',
+    'TokenManager': 'auth', 'jwt_expiry': 'auth', 'get_jwt_token': 'auth', 'register_user': 'auth',
+
+    # Downloads
+    'decode2binary': 'download', 'decode2stream': 'download', 'download_to_file': 'download',
+    'list_files': 'download',
+    'iter_pipelined': 'pipeline', 'download_pipelined': 'pipeline',
+    'TSFFile': 'reader',
+
+    # Uploads
+    'upload_binary': 'upload', 'upload_file': 'upload', 'confirm_upload': 'upload', 'get_md5': 'upload',
+    'upload_file_streaming': 'upload', 'get_file_md5': 'upload',
+    'upload_binary_chunked': 'upload', 'upload_file_chunked': 'upload',
+    'upload_file_direct': 'upload', 'upload_binary_direct': 'upload',
+
+    # Metadata
+    'putMetaData': 'metadata', 'queryMetaData': 'metadata', 'iter_metadata': 'metadata',
+    'put_metadata_many': 'metadata', 'BulkWriteResult': 'metadata', 'MetadataQueryCache': 'metadata',
+
+    # Download cache, timing and scheduling
+    'DownloadCache': 'cache', 'CacheStats': 'cache',
+    'set_metrics_sink': 'metrics', 'PhaseAggregator': 'metrics', 'PhaseStats': 'metrics',
+    'TransferScheduler': 'scheduler',
+
+    # Resumable, batch and sync
+    'download_resumable': 'resume', 'upload_file_resumable': 'resume',
+    'upload_many': 'batch', 'BatchUploadResult': 'batch',
+    'download_many': 'batch', 'BatchDownloadResult': 'batch',
+    'sync_directory': 'sync', 'SyncResult': 'sync',
+
+    # Enhanced async client (None when aiohttp is not installed)
+    'TSFClient': 'client', 'TSFConfig': 'client', 'UploadResult': 'client', 'FileInfo': 'client',
+    'create_client': 'client', 'progress_printer': 'client',
 }
 
-def decode2binary(file_id: str, jwt_token: str, base_url: str = "https://localhost:3000") -> bytes:
-    """
-    1. /download/:fileId にアクセスしてメタデータを取得
-    2. 返ってきた JSON から urls, keys, ivs, algorithm を取り出す
-    3. 各 url で暗号化されたファイルチャンクを GET
-    4. 対応する keys[i], ivs[i] で復号
-    5. 復号したチャンクを連結し、最終的なバイナリを返す
-    """
-
-    # 1. ファイル情報メタデータを取得
-    endpoint = f"{base_url}/download/{file_id}"
-    headers = {
-        "Authorization": f"Bearer {jwt_token}"
-    }
-    resp = requests.get(endpoint, headers=headers, verify=SSL_VERIFY)
-    resp.raise_for_status()  # ステータスコードが200以外なら例外を投げる
-
-    data = resp.json()
-
-    urls = data.get("urls", [])       # ["https://.../chunk1", "https://.../chunk2", ...]
-    keys = data.get("keys", [])       # ["<Base64Key1>", "<Base64Key2>", ...]
-    ivs  = data.get("ivs", [])        # ["<Base64Iv1>", "<Base64Iv2>", ...]
-    algorithm = data.get("algorithm", "aes-256-cbc")
-
-    # 念のためチェック
-    if not urls:
-        raise ValueError("No 'urls' in response.")
-    if len(urls) != len(keys) or len(urls) != len(ivs):
-        raise ValueError("Mismatch in lengths of urls, keys, and ivs.")
-
-    # 2. 復号の結果をまとめるためのバッファ
-    decrypted_data = b""
-    print(ivs)
-    # 3. 各チャンクを取得して復号 → decrypted_data に連結
-    for i, url in enumerate(urls):
-        # (a) 暗号化ファイルチャンクをHTTP GETで取得
-        chunk_resp = requests.get(url)
-        chunk_resp.raise_for_status()
-        encrypted_chunk = chunk_resp.content  # bytes
-
-        # (b) Base64デコードしたキーとIVを使ってAES復号器を初期化
-        key = base64.b64decode(keys[i])
-        iv  = base64.b64decode(ivs[i])
-
-        # 本例では "aes-256-cbc" を想定
-        if algorithm.lower() == "aes-256-cbc":
-            cipher = AES.new(key, AES.MODE_CBC, iv)
-        else:
-            raise ValueError(f"Unsupported algorithm: {algorithm}")
-
-        # (c) 復号
-        decrypted_chunk = cipher.decrypt(encrypted_chunk)
-        # PKCS7 Paddingが入っている想定なら、unpadで取り除く
-        # ただし複数チャンク分を連結する場合、最後のチャンクだけunpadすることもあるので
-        # アップロード時の実装に合わせて調整が必要。
-        #
-        # ここでは各チャンクが独立してパディングされている想定とし、毎回unpadをかける。
-        try:
-            decrypted_chunk = unpad(decrypted_chunk, AES.block_size)
-        except ValueError:
-            # パディング除去失敗の場合は適宜エラー処理
-            raise ValueError("Padding error. Possibly incorrect key/IV or corrupted data.")
-
-        # (d) 復号済みチャンクを連結
-        decrypted_data += decrypted_chunk
-
-    # 4. 連結した結果をリターン
-    return decrypted_data
-
-def get_md5(data: bytes) -> str:
-    """
-    バイナリデータのMD5を計算し、16進文字列として返す
-    """
-    md5_hash = hashlib.md5(data).hexdigest()
-    return md5_hash
-
-
-def upload_binary(
-    data: bytes,
-    original_path: str,
-    jwt_token: str,
-    base_url: str = "https://localhost:3000"
-) -> dict:
-    """
-    1. /upload/signed エンドポイントに POST して、signedUrlなどの暗号化情報を取得
-    2. 得られた鍵・IVで data を暗号化
-    3. signedUrl に PUT リクエストを送信
-    4. 成功したら fileId 等を返す
-
-    戻り値:
-      {
-        "fileId": number,
-        "uploadedSize": number,  # アップロードしたバイト数
-      }
-    """
-    # (1) メタデータ取得: originalPath, md5を含むペイロードを送信
-    md5_hex = get_md5(data)
-    payload = {
-        "originalPath": original_path,
-        "md5": md5_hex
-    }
-    headers = {"Authorization": f"Bearer {jwt_token}"}
-
-    resp = requests.post(urljoin(base_url, "upload/signed"), json=payload, headers=headers, verify=SSL_VERIFY)
-
-    # Handle 409 Conflict (file already exists)
-    if resp.status_code == 409:
-        error_data = resp.json()
-        raise FileExistsError(f"File already exists: {error_data.get('error', 'Unknown error')}")
-
-    resp.raise_for_status()
-    meta = resp.json()
-
-    if "error" in meta:
-        raise FileExistsError(f"Upload error: {meta['error']}")
-
-
-    # signedUrl等を取得
-    signed_url = meta["signedUrl"]
-    file_id = meta["fileId"]
-    aes_key_base64 = meta["aesKeyBase64"]
-    iv_base64 = meta["ivBase64"]
-    algorithm = meta["algorithm"]
-    print(iv_base64)
-    # (2) 暗号化用のキーとIVをBase64デコード
-    aes_key = base64.b64decode(aes_key_base64)  # 32バイト想定
-    iv = base64.b64decode(iv_base64)            # 16バイトまたは12バイトなど(アルゴリズムにより)
-    print(len(iv))
-    # ※ サーバー側で "aes-256-cbc" と言っているなら 16バイトIV のCBCモードを想定
-    if algorithm.lower() == "aes-256-cbc":
-        cipher = AES.new(aes_key, AES.MODE_CBC, iv)
-    else:
-        raise ValueError(f"Unsupported algorithm: {algorithm}")
-
-    # CBCモードの場合、ブロックサイズに合わせてパディング
-    encrypted_data = cipher.encrypt(pad(data, AES.block_size))
-
-    # (3) PUT でアップロード (Content-Type は任意。binaryとして送信)
-    put_resp = requests.put(signed_url, data=encrypted_data, headers={"Content-Type": "application/octet-stream"})
-    put_resp.raise_for_status()
-
-    # (4) アップロード完了を確認
-    confirmation = confirm_upload(file_id, jwt_token, base_url)
+_SUBMODULES = frozenset((
+    'auth', 'batch', 'cache', 'cli', 'client', 'compression', 'config', 'crypto', 'download',
+    'exceptions', 'integrity', 'metadata', 'metrics', 'pipeline', 'reader', 'resume', 'scheduler',
+    'session', 'sync', 'testing', 'upload',
+))
 
-    return {
-        "fileId": file_id,
-        "uploadedSize": len(encrypted_data),
-        "finalFilesize": confirmation.get("filesize", len(encrypted_data)),
-        "success": confirmation.get("success", True)
-    }
 
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    except ImportError:
+        if module_name != 'client':
+            raise
+        # aiohttp が無い環境では従来どおり None を返す
+        value = None
+    globals()[name] = value
+    return value
 
-def upload_file(
-    file_path: str,
-    original_path: str,
-    jwt_token: str,
-    base_url: str = "https://localhost:3000"
-) -> dict:
-    """
-    ローカルファイルを読み込んでバイナリ化し、upload_binary を呼び出すラッパ関数
-    """
-    with open(file_path, "rb") as f:
-        data = f.read()
 
-    result = upload_binary(data, original_path, jwt_token, base_url)
-    return result
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY) | _SUBMODULES)
 
-def register_user(email: str, password: str, base_url: str = "https://localhost:3000") -> str:
-    """Register a new user account and return JWT token."""
-    payload = {
-        "email": email,
-        "password": password
-    }
-    response = requests.post(urljoin(base_url, "auth/register"), json=payload, verify=SSL_VERIFY)
-    response.raise_for_status()
-    result = response.json()
-    if "error" in result:
-        raise ValueError(f"Registration failed: {result['error']}")
-    return result["token"]
 
+# Export all classes and functions for easy importing
+__all__ = [
+    # Enhanced client classes (if available)
+    'TSFClient', 'TSFConfig', 'UploadResult', 'FileInfo',
+    'TSFError', 'AuthenticationError', 'UploadError', 'DownloadError', 'IntegrityError', 'PaddingError',
+    'create_client', 'progress_printer',
 
-def get_jwt_token(email: str, password: str, base_url: str = "https://localhost:3000", timeout: int = 60, max_retries: int = 3) -> str:
-    """Authenticate user and get JWT token with retry logic."""
-    import time
-    
-    payload = {
-        "email": email,
-        "password": password
-    }
-    
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                urljoin(base_url, "auth/login"), 
-                json=payload, 
-                verify=SSL_VERIFY, 
-                timeout=timeout
-            )
-            response.raise_for_status()
-            result = response.json()
-            if "error" in result:
-                raise ValueError(f"Authentication failed: {result['error']}")
-            return result["token"]
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                logger.warning(f"TSF authentication timeout (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s: {e}")
-                time.sleep(wait_time)
-                continue
-            else:
-                logger.error(f"TSF authentication failed after {max_retries} attempts: {e}")
-                raise
-
-
-def confirm_upload(file_id: str, jwt_token: str, base_url: str = "https://localhost:3000") -> dict[str, Any]:
-    """Confirm upload completion and get final file size."""
-    payload = {"fileId": file_id}
-    headers = {"Authorization": f"Bearer {jwt_token}"}
-
-    response = requests.post(urljoin(base_url, "upload/signed/confirm"), json=payload, headers=headers, verify=SSL_VERIFY)
-    response.raise_for_status()
-    result = response.json()
-    if "error" in result:
-        raise ValueError(f"Upload confirmation failed: {result['error']}")
-    return result
-
-def upload_file_direct(
-    file_path: str,
-    upload_token: str,
-    base_url: str = "https://localhost:3000"
-) -> dict:
-    """
-    Upload a file using the direct upload endpoint with token authentication.
-    
-    Args:
-        file_path: Path to file to upload
-        upload_token: Upload token for authentication
-        base_url: Server base URL
-        
-    Returns:
-        Dict with upload result
-    """
-
-    # Read file data
-    with open(file_path, "rb") as f:
-        file_data = f.read()
-
-    # Prepare the request
-    filename = os.path.basename(file_path)
-    files = {'file': (filename, file_data)}
-    data = {'filename': filename}
-    headers = {'Authorization': f'Bearer {upload_token}'}
+    # Pooled HTTP session and token management
+    'TSFSession', 'TokenManager', 'jwt_expiry',
 
-    # Upload file
-    response = requests.post(urljoin(base_url, "upload/direct"),
-                           files=files,
-                           data=data,
-                           headers=headers,
-                           verify=SSL_VERIFY)
-    response.raise_for_status()
-    return response.json()
+    # Original functions (backward compatibility)
+    'decode2binary', 'upload_binary', 'upload_file', 'get_jwt_token', 'register_user',
+    'confirm_upload', 'get_md5', 'DEFAULT_CONFIG', 'SSL_VERIFY',
 
+    # Streaming download and random access
+    'decode2stream', 'download_to_file', 'TSFFile',
+    'iter_pipelined', 'download_pipelined',
 
-def upload_binary_direct(
-    data: bytes,
-    filename: str,
-    upload_token: str,
-    base_url: str = "https://localhost:3000"
-) -> dict:
-    """
-    Upload binary data using the direct upload endpoint with token authentication.
-    
-    Args:
-        data: Binary data to upload
-        filename: Name for the uploaded file
-        upload_token: Upload token for authentication
-        base_url: Server base URL
-        
-    Returns:
-        Dict with upload result
-    """
-    # Prepare the request
-    files = {'file': (filename, data)}
-    data_payload = {'filename': filename}
-    headers = {'Authorization': f'Bearer {upload_token}'}
+    # Streaming and chunked upload
+    'upload_file_streaming', 'get_file_md5',
+    'upload_binary_chunked', 'upload_file_chunked',
 
-    # Upload file
-    response = requests.post(urljoin(base_url, "upload/direct"),
-                           files=files,
-                           data=data_payload,
-                           headers=headers,
-                           verify=SSL_VERIFY)
-    response.raise_for_status()
-    return response.json()
+    # Download cache
+    'DownloadCache', 'CacheStats',
 
-def putMetaData(jwt_token: str, base_url: str, metadata: dict) -> requests.Response:
-    """Store metadata associated with a file or record"""
-    headers = {"Authorization": f"Bearer {jwt_token}"}
-    
-    response = requests.post(f"{base_url}/metadata", json=metadata, headers=headers, verify=False)
-    return response
+    # Per-phase timing
+    'set_metrics_sink', 'PhaseAggregator', 'PhaseStats',
 
-def queryMetaData(jwt_token: str, query: dict, base_url: str, select: Optional[dict] = None) -> requests.Response:
-    """Query metadata records with filtering"""
-    headers = {"Authorization": f"Bearer {jwt_token}"}
-    payload = {"query": query}
-    if select:
-        payload["select"] = select
-    
-    response = requests.post(f"{base_url}/metadata/query", json=payload, headers=headers, verify=False)
-    return response
+    # Adaptive transfer scheduling
+    'TransferScheduler', 'CircuitOpenError',
 
-# Export all classes and functions for easy importing
-__all__ = [
-    # Enhanced client classes (if available)
-    'TSFClient', 'TSFConfig', 'UploadResult', 'FileInfo',
-    'TSFError', 'AuthenticationError', 'UploadError', 'DownloadError',
-    'create_client', 'progress_printer',
+    # Resumable transfers
+    'download_resumable', 'upload_file_resumable',
 
-    # Original functions (backward compatibility)
-    'decode2binary', 'upload_binary', 'upload_file', 'get_jwt_token', 'register_user',
-    'confirm_upload', 'get_md5', 'DEFAULT_CONFIG',
+    # Batch transfers and directory sync
+    'upload_many', 'BatchUploadResult', 'sync_directory', 'SyncResult', 'list_files',
+    'download_many', 'BatchDownloadResult',
 
     # New direct upload functions
     'upload_file_direct', 'upload_binary_direct',
     
     # Metadata functions
-    'putMetaData', 'queryMetaData'
+    'putMetaData', 'queryMetaData',
+    'iter_metadata', 'put_metadata_many', 'BulkWriteResult', 'MetadataQueryCache'
 ]
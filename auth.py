@@ -0,0 +1,178 @@
+"""
+Login, registration and cached JWT tokens with proactive refresh.
+
+get_jwt_token logs in once and returns the token; register_user creates an
+account. TokenManager logs in once, reads the token's ``exp`` claim and logs in again
+shortly before it expires. Concurrent callers share a single login request.
+Attached to a TSFSession, it also re-logs in and replays a request once when
+the server answers 401 for a token it issued.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional
+from urllib.parse import urljoin
+
+import requests
+
+from .session import TSFSession, _http, _ssl_verify
+
+logger = logging.getLogger(__name__)
+
+
+def register_user(
+    email: str,
+    password: str,
+    base_url: str = "https://localhost:3000",
+    session: Optional[TSFSession] = None
+) -> str:
+    """Register a new user account and return JWT token."""
+    payload = {
+        "email": email,
+        "password": password
+    }
+    response = _http(session).post(urljoin(base_url, "auth/register"), json=payload, verify=_ssl_verify(session))
+    response.raise_for_status()
+    result = response.json()
+    if "error" in result:
+        raise ValueError(f"Registration failed: {result['error']}")
+    return result["token"]
+
+
+def get_jwt_token(
+    email: str,
+    password: str,
+    base_url: str = "https://localhost:3000",
+    timeout: int = 60,
+    max_retries: int = 3,
+    session: Optional[TSFSession] = None
+) -> str:
+    """Authenticate user and get JWT token with retry logic."""
+    payload = {
+        "email": email,
+        "password": password
+    }
+    
+    for attempt in range(max_retries):
+        try:
+            response = _http(session).post(
+                urljoin(base_url, "auth/login"), 
+                json=payload, 
+                verify=_ssl_verify(session), 
+                timeout=timeout
+            )
+            response.raise_for_status()
+            result = response.json()
+            if "error" in result:
+                raise ValueError(f"Authentication failed: {result['error']}")
+            return result["token"]
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if attempt < max_retries - 1:
+                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
+                logger.warning(f"TSF authentication timeout (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s: {e}")
+                time.sleep(wait_time)
+                continue
+            else:
+                logger.error(f"TSF authentication failed after {max_retries} attempts: {e}")
+                raise
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Return the ``exp`` claim of a JWT as a Unix timestamp, or None if absent."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+class TokenManager:
+    """
+    Thread-safe JWT provider for one account.
+
+    Usage::
+
+        tokens = TokenManager("user@example.com", "password", base_url)
+        with TSFSession(token_manager=tokens) as session:
+            data = decode2binary(file_id, tokens.get_token(), base_url, session=session)
+
+    Args:
+        email: Login email
+        password: Login password
+        base_url: Server base URL
+        refresh_margin: Seconds before ``exp`` at which the token is renewed
+        session: Optional pooled session used for the login requests
+    """
+
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        base_url: str = "https://localhost:3000",
+        refresh_margin: float = 60.0,
+        session: Optional[TSFSession] = None,
+    ) -> None:
+        self.email = email
+        self.password = password
+        self.base_url = base_url
+        self.refresh_margin = refresh_margin
+        self.session = session
+        self.login_count = 0
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        # 直近に発行したトークン (401 の再送対象かどうかの判定に使う)
+        self._issued: Deque[str] = deque(maxlen=4)
+
+    def _fresh(self) -> bool:
+        if self._token is None:
+            return False
+        if self._expires_at is None:
+            return True
+        return time.time() < self._expires_at - self.refresh_margin
+
+    def _login_locked(self) -> str:
+        token = get_jwt_token(self.email, self.password, self.base_url, session=self.session)
+        self.login_count += 1
+        self._token = token
+        self._expires_at = jwt_expiry(token)
+        self._issued.append(token)
+        return token
+
+    def get_token(self) -> str:
+        """Return a cached token, logging in first if it is missing or about to expire."""
+        token = self._token
+        if token is not None and self._fresh():
+            return token
+        with self._lock:
+            # 待っている間に別スレッドが更新していればそれを使う
+            if self._fresh():
+                return self._token  # type: ignore[return-value]
+            return self._login_locked()
+
+    def refresh(self, stale_token: str) -> Optional[str]:
+        """
+        Replace ``stale_token`` after the server rejected it.
+
+        Returns the token to retry with, or None when ``stale_token`` was not
+        issued by this manager (for example a direct-upload token).
+        """
+        with self._lock:
+            if stale_token not in self._issued:
+                return None
+            if self._token != stale_token and self._fresh():
+                return self._token
+            return self._login_locked()
+
+    def invalidate(self) -> None:
+        """Drop the cached token so the next get_token() logs in again."""
+        with self._lock:
+            self._token = None
+            self._expires_at = None
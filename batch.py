@@ -0,0 +1,341 @@
+"""
+Batch transfer helpers built on the module-level functions.
+
+upload_many runs many uploads on a bounded thread pool, hashing each file
+once and skipping contents already sent earlier in the same batch.
+download_many does the same for downloads, and concurrent requests for the
+same object, from one batch or from different threads, share a single fetch.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .cache import DownloadCache
+from .config import DEFAULT_CONFIG
+from .download import decode2binary
+from .session import TSFSession
+from .upload import get_file_md5, upload_file_streaming
+
+# BatchUploadResult.status values
+UPLOADED = "uploaded"
+EXISTS = "exists"          # server answered 409 for this path
+DUPLICATE = "duplicate"    # same MD5 uploaded by another file in this batch
+FAILED = "failed"
+
+
+@dataclass
+class BatchUploadResult:
+    """Per-file outcome of upload_many."""
+
+    local_path: str
+    original_path: str
+    status: str
+    md5: Optional[str] = None
+    file_id: Any = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[BaseException] = None
+    duplicate_of: Optional[str] = None
+    hash_seconds: float = 0.0
+    upload_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status != FAILED
+
+
+class _Md5Registry:
+    """
+    Thread-safe record of the upload that owns each MD5 in a batch.
+
+    The first file to claim an MD5 uploads it; later files with the same MD5
+    wait for that upload's outcome. If it fails, the claim is released so one
+    of the waiting files uploads instead.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._owners: Dict[str, Tuple[str, "Future[BatchUploadResult]"]] = {}
+
+    def claim(self, md5_hex: str, original_path: str) -> Optional[Tuple[str, "Future[BatchUploadResult]"]]:
+        """
+        Claim ``md5_hex``. Returns None if the caller now owns it, otherwise
+        the owner's original path and a future for the owner's outcome.
+        """
+        with self._lock:
+            entry = self._owners.get(md5_hex)
+            if entry is None:
+                self._owners[md5_hex] = (original_path, Future())
+            return entry
+
+    def settle(self, md5_hex: str, outcome: BatchUploadResult) -> None:
+        """Publish the owner's outcome; a failed owner gives up its claim."""
+        with self._lock:
+            _, future = self._owners[md5_hex]
+            if not outcome.ok:
+                del self._owners[md5_hex]
+        future.set_result(outcome)
+
+
+def _wait_for_owner(registry: _Md5Registry, outcome: BatchUploadResult) -> bool:
+    """
+    重複していれば持ち主のアップロード結果を待ち、outcome を DUPLICATE にして True を返す。
+    このファイルが MD5 の持ち主になった場合 (持ち主の失敗で引き継いだ場合を含む) は False
+    """
+    while True:
+        claim = registry.claim(outcome.md5, outcome.original_path)  # type: ignore[arg-type]
+        if claim is None:
+            return False
+        owner_path, owner_future = claim
+        owner = owner_future.result()
+        if owner.ok:
+            outcome.status = DUPLICATE
+            outcome.duplicate_of = owner_path
+            outcome.file_id = owner.file_id
+            outcome.result = owner.result
+            return True
+
+
+def _upload_one(
+    local_path: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str,
+    registry: Optional[_Md5Registry],
+    buffer_size: int,
+    session: Optional[TSFSession],
+) -> BatchUploadResult:
+    outcome = BatchUploadResult(local_path, original_path, FAILED)
+    owner = False
+    try:
+        started = time.perf_counter()
+        outcome.md5 = get_file_md5(local_path, buffer_size)
+        outcome.hash_seconds = time.perf_counter() - started
+
+        if registry is not None:
+            if _wait_for_owner(registry, outcome):
+                return outcome
+            owner = True
+
+        started = time.perf_counter()
+        try:
+            outcome.result = upload_file_streaming(
+                local_path, original_path, jwt_token, base_url,
+                buffer_size=buffer_size, md5_hex=outcome.md5, session=session,
+            )
+            outcome.file_id = outcome.result["fileId"]
+            outcome.status = UPLOADED
+        except FileExistsError as e:
+            # 409: 既にサーバーに存在するので成功扱い
+            outcome.status = EXISTS
+            outcome.error = e
+        finally:
+            outcome.upload_seconds = time.perf_counter() - started
+    except Exception as e:
+        outcome.status = FAILED
+        outcome.error = e
+    finally:
+        if owner:
+            registry.settle(outcome.md5, outcome)  # type: ignore[union-attr, arg-type]
+    return outcome
+
+
+def upload_many(
+    items: Iterable[Tuple[str, str]],
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    max_workers: int = 8,
+    dedup: bool = True,
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"],
+    session: Optional[TSFSession] = None,
+) -> List[BatchUploadResult]:
+    """
+    Upload many files concurrently.
+
+    Each file is hashed once and streamed through upload_file_streaming, so
+    memory stays bounded per worker. A 409 from the server is reported as
+    status ``"exists"`` rather than raised, and any other failure is captured
+    per file as status ``"failed"`` so one bad file does not abort the batch.
+
+    Args:
+        items: Iterable of (local path, original path) pairs
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        max_workers: Number of concurrent uploads
+        dedup: Upload each MD5 once per batch; other files with it wait for
+            that upload and are reported as ``"duplicate"`` of it, or one of
+            them uploads instead if it fails
+        buffer_size: Number of bytes read per step when hashing and encrypting
+        session: Optional pooled session; its pool_maxsize should be at least
+            max_workers
+
+    Returns:
+        List of BatchUploadResult in the same order as ``items``
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    pairs = list(items)
+    registry = _Md5Registry() if dedup else None
+    results: List[Optional[BatchUploadResult]] = [None] * len(pairs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                _upload_one, local_path, original_path, jwt_token, base_url,
+                registry, buffer_size, session,
+            ): i
+            for i, (local_path, original_path) in enumerate(pairs)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    return results  # type: ignore[return-value]
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for and share its result (or exception). Once the
+    call finishes the key is forgotten, so later calls run again; this is
+    request coalescing, not caching.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run or join the call for ``key``; returns (result, shared with another caller)."""
+        with self._lock:
+            running = self._calls.get(key)
+            if running is None:
+                future: Future = Future()
+                self._calls[key] = future
+        if running is not None:
+            return running.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# Shared by every download_many call in the process
+_download_flights = SingleFlight()
+
+
+@dataclass
+class BatchDownloadResult:
+    """Per-file outcome of download_many."""
+
+    file_id: Any
+    data: Optional[bytes] = None
+    error: Optional[BaseException] = None
+    shared: bool = False       # served by a fetch another caller started
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _download_one(
+    file_id: Any,
+    jwt_token: str,
+    base_url: str,
+    chunk_workers: int,
+    decompress: Union[bool, str, None],
+    cache: Optional[DownloadCache],
+    session: Optional[TSFSession],
+) -> BatchDownloadResult:
+    outcome = BatchDownloadResult(file_id)
+    started = time.perf_counter()
+    # トークンもキーに含め、別アカウントの取得結果を共有しないようにする
+    key = (base_url.rstrip("/"), str(file_id), jwt_token, decompress)
+    try:
+        outcome.data, outcome.shared = _download_flights.do(
+            key,
+            lambda: decode2binary(
+                file_id, jwt_token, base_url, max_workers=chunk_workers,
+                session=session, cache=cache, decompress=decompress,
+            ),
+        )
+    except Exception as e:
+        outcome.error = e
+    outcome.seconds = time.perf_counter() - started
+    return outcome
+
+
+def download_many(
+    file_ids: Iterable[Any],
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    max_workers: int = 8,
+    chunk_workers: int = 1,
+    decompress: Union[bool, str, None] = None,
+    cache: Optional[DownloadCache] = None,
+    session: Optional[TSFSession] = None,
+) -> Iterator[BatchDownloadResult]:
+    """
+    Download many files concurrently, yielding each result as it completes.
+
+    Every distinct file_id is fetched once per batch; repeated ids in
+    ``file_ids`` each get a result but share the fetch. Downloads are also
+    coalesced across threads: if another download_many call in this process is
+    already fetching the same id with the same token, this one waits for that
+    fetch instead of repeating the /download metadata request and chunk GETs
+    (the result's ``shared`` flag is set). A failure is reported per file in
+    ``error`` instead of aborting the batch.
+
+    Args:
+        file_ids: IDs to download
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        max_workers: Number of files downloaded concurrently
+        chunk_workers: Chunks fetched concurrently within one file
+        decompress: Passed to decode2binary
+        cache: Optional DownloadCache consulted and filled by every download
+        session: Optional pooled session; its pool_maxsize should be at least
+            max_workers * chunk_workers
+
+    Yields:
+        BatchDownloadResult, in completion order
+    """
+    if max_workers < 1 or chunk_workers < 1:
+        raise ValueError("max_workers and chunk_workers must be at least 1")
+
+    occurrences: Dict[str, List[Any]] = {}
+    for file_id in file_ids:
+        occurrences.setdefault(str(file_id), []).append(file_id)
+    if not occurrences:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(occurrences)))
+    try:
+        futures = {
+            executor.submit(
+                _download_one, ids[0], jwt_token, base_url, chunk_workers, decompress, cache, session,
+            ): key
+            for key, ids in occurrences.items()
+        }
+        for future in as_completed(futures):
+            outcome = future.result()
+            yield outcome
+            for duplicate in occurrences[futures[future]][1:]:
+                yield BatchDownloadResult(duplicate, outcome.data, outcome.error, True, outcome.seconds)
+    finally:
+        # 途中で反復をやめた場合は、まだ始まっていないダウンロードを取り消す
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for ``import pytsfiler``.
+
+Each sample starts a fresh interpreter, so nothing is cached in sys.modules,
+and reports the wall time of the import statement alone (interpreter start-up
+is excluded). It also lists which heavy third-party modules the import pulled
+in; a plain ``import pytsfiler`` is expected to load none of them.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 20 --json import.json
+    python benchmarks/bench_import.py --baseline import.json --tolerance 0.25
+
+With --baseline the run exits non-zero if the median import time grew by more
+than the tolerance or a heavy module started being imported eagerly, so it can
+gate a release. --max-ms sets an absolute limit instead.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+# Modules whose presence after ``import pytsfiler`` means an eager import
+HEAVY_MODULES = ("requests", "urllib3", "Crypto", "cryptography", "aiohttp", "zstandard")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def sample(module: str) -> Dict[str, Any]:
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(module: str, repeat: int) -> Dict[str, Any]:
+    samples = [sample(module) for _ in range(repeat)]
+    times = [s["seconds"] * 1000 for s in samples]
+    return {
+        "module": module,
+        "repeat": repeat,
+        "median_ms": statistics.median(times),
+        "min_ms": min(times),
+        "max_ms": max(times),
+        "heavy_modules": sorted({m for s in samples for m in s["loaded"]}),
+    }
+
+
+def compare(result: Dict[str, Any], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    if result["median_ms"] > baseline["median_ms"] * (1 + tolerance):
+        regressions.append(f"median import time {baseline['median_ms']:.1f} -> {result['median_ms']:.1f} ms")
+    new_heavy = set(result["heavy_modules"]) - set(baseline["heavy_modules"])
+    if new_heavy:
+        regressions.append(f"now imported eagerly: {', '.join(sorted(new_heavy))}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="pytsfiler", help="module to import (default: pytsfiler)")
+    parser.add_argument("--repeat", type=int, default=10, help="fresh interpreters to sample")
+    parser.add_argument("--json", dest="json_path", help="write the result to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median growth vs baseline (fraction)")
+    parser.add_argument("--max-ms", type=float, help="fail if the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    result = run(args.module, args.repeat)
+    print(
+        f"import {result['module']}: median {result['median_ms']:.1f} ms "
+        f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f}, n={result['repeat']})"
+    )
+    print(f"heavy modules loaded: {', '.join(result['heavy_modules']) or 'none'}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = compare(result, args.baseline, args.tolerance) if args.baseline else []
+    if args.max_ms is not None and result["median_ms"] > args.max_ms:
+        failures.append(f"median import time {result['median_ms']:.1f} ms exceeds {args.max_ms:.1f} ms")
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Client-side transfer benchmarks against the in-process FakeTSFServer.
+
+Measures throughput (MB/s of plaintext) and per-operation latency (p50/p99)
+for uploads and downloads across file sizes, chunk counts and concurrency
+levels. The server can inject per-response latency and per-connection
+bandwidth limits so the numbers reflect a WAN-like link instead of loopback.
+
+Usage:
+    python benchmarks/bench_transfer.py
+    python benchmarks/bench_transfer.py --sizes 1M,64M --chunks 1,16 --concurrency 1,8 --latency 0.02
+    python benchmarks/bench_transfer.py --json results.json
+    python benchmarks/bench_transfer.py --baseline results.json --tolerance 0.15
+
+With --baseline the run exits non-zero if any case's MB/s dropped by more
+than the tolerance, so it can gate a release.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from pytsfiler import (
+    TSFSession,
+    decode2binary,
+    decode2stream,
+    get_jwt_token,
+    iter_pipelined,
+    upload_binary,
+    upload_binary_chunked,
+    upload_binary_direct,
+)
+from pytsfiler.testing import FakeTSFServer
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class Bench:
+    def __init__(self, server: FakeTSFServer, session: TSFSession) -> None:
+        self.server = server
+        self.session = session
+        self.token = get_jwt_token(server.email, server.password, server.base_url, session=session)
+        self._names = itertools.count()
+
+    def unique_path(self) -> str:
+        return f"bench/{next(self._names)}.bin"
+
+    def measure(
+        self,
+        name: str,
+        params: Dict[str, Any],
+        payload_bytes: int,
+        operation: Callable[[], Any],
+        concurrency: int,
+        repeat: int,
+    ) -> Dict[str, Any]:
+        """Run ``operation`` ``repeat`` times on ``concurrency`` threads at once."""
+        latencies: List[float] = []
+
+        def timed() -> None:
+            started = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(timed) for _ in range(repeat * concurrency)]:
+                future.result()
+        wall = time.perf_counter() - started
+
+        total_bytes = payload_bytes * repeat * concurrency
+        return {
+            "case": name,
+            **params,
+            "concurrency": concurrency,
+            "operations": len(latencies),
+            "mb_per_s": total_bytes / wall / 1e6 if wall else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "mean_ms": statistics.fmean(latencies) * 1000,
+        }
+
+
+def run_cases(bench: Bench, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    base_url = bench.server.base_url
+    token = bench.token
+    session = bench.session
+
+    for size in args.sizes:
+        data = os.urandom(size)
+
+        for concurrency in args.concurrency:
+            results.append(bench.measure(
+                "upload_binary", {"size": size, "chunks": 1}, size,
+                lambda: upload_binary(data, bench.unique_path(), token, base_url, session=session),
+                concurrency, args.repeat,
+            ))
+            results.append(bench.measure(
+                "upload_binary_direct", {"size": size, "chunks": 1}, size,
+                lambda: upload_binary_direct(data, bench.unique_path(), bench.server.upload_token, base_url, session=session),
+                concurrency, args.repeat,
+            ))
+
+        for chunks in args.chunks:
+            part_size = max(1, -(-size // chunks))
+            file_id = bench.server.add_file(data, bench.unique_path(), chunk_size=part_size)
+
+            for workers in args.concurrency:
+                params = {"size": size, "chunks": chunks, "workers": workers}
+                results.append(bench.measure(
+                    "upload_binary_chunked", params, size,
+                    lambda: upload_binary_chunked(
+                        data, bench.unique_path(), token, base_url,
+                        part_size=part_size, max_workers=workers, session=session,
+                    ),
+                    1, args.repeat,
+                ))
+                results.append(bench.measure(
+                    "decode2binary", params, size,
+                    lambda: decode2binary(file_id, token, base_url, max_workers=workers, session=session),
+                    1, args.repeat,
+                ))
+                results.append(bench.measure(
+                    "iter_pipelined", params, size,
+                    lambda: sum(len(b) for b in iter_pipelined(
+                        file_id, token, base_url, fetch_workers=workers, session=session,
+                    )),
+                    1, args.repeat,
+                ))
+
+            results.append(bench.measure(
+                "decode2stream", {"size": size, "chunks": chunks}, size,
+                lambda: sum(len(b) for b in decode2stream(file_id, token, base_url, 1 << 20, session=session)),
+                1, args.repeat,
+            ))
+            for concurrency in args.concurrency:
+                results.append(bench.measure(
+                    "decode2binary_parallel_files", {"size": size, "chunks": chunks}, size,
+                    lambda: decode2binary(file_id, token, base_url, session=session),
+                    concurrency, args.repeat,
+                ))
+    return results
+
+
+def case_key(row: Dict[str, Any]) -> str:
+    fields = ("case", "size", "chunks", "workers", "concurrency")
+    return "/".join(f"{f}={row[f]}" for f in fields if f in row)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {case_key(row): row for row in json.load(f)["results"]}
+    regressions = []
+    for row in results:
+        old = baseline.get(case_key(row))
+        if old and row["mb_per_s"] < old["mb_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{case_key(row)}: {old['mb_per_s']:.1f} -> {row['mb_per_s']:.1f} MB/s"
+            )
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    header = f"{'case':<30}{'size':>10}{'chunks':>7}{'work':>6}{'conc':>6}{'MB/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['case']:<30}{row['size']:>10}{row['chunks']:>7}{row.get('workers', '-'):>6}"
+            f"{row['concurrency']:>6}{row['mb_per_s']:>10.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="256K,4M,32M", help="comma-separated plaintext sizes (K/M/G suffixes)")
+    parser.add_argument("--chunks", default="1,8", help="comma-separated chunk counts for multi-chunk objects")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated worker/concurrency levels")
+    parser.add_argument("--repeat", type=int, default=3, help="operations per case and concurrent slot")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of injected server latency")
+    parser.add_argument("--bandwidth", default=None, help="per-connection bandwidth, e.g. 50M (bytes/s)")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed MB/s drop vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    args.sizes = [parse_size(s) for s in args.sizes.split(",")]
+    args.chunks = [int(c) for c in args.chunks.split(",")]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    bandwidth = parse_size(args.bandwidth) if args.bandwidth else None
+
+    pool = max(args.concurrency) * 2
+    with FakeTSFServer(latency=args.latency, bandwidth=bandwidth) as server, \
+            TSFSession(pool_maxsize=pool) as session:
+        results = run_cases(Bench(server, session), args)
+
+    print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": {"latency": args.latency, "bandwidth": bandwidth}, "results": results}, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
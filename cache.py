@@ -0,0 +1,215 @@
+"""
+Opt-in local cache of decrypted downloads.
+
+DownloadCache stores one file per TSF object under a private directory and
+keeps an in-memory LRU index of them, so a lookup never lists or stats the
+directory and a miss costs nothing but a dict probe.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+_SUFFIX = ".tsfcache"
+_TMP_SUFFIX = ".tmp"
+
+# コーデックはファイル名に記録する: <name>.<codec>.tsfcache (非圧縮は _NO_CODEC)。
+# <name>.tsfcache はコーデック不明。中身には手を加えないので、ペイロードと取り違えることはない
+_NO_CODEC = "none"
+
+# これより古い一時ファイルは書き込み中に落ちたプロセスの残骸とみなして消す
+_STALE_TMP_SECONDS = 600
+
+
+@dataclass
+class CacheStats:
+    """Counters for sizing a DownloadCache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class DownloadCache:
+    """
+    On-disk LRU cache of decrypted file contents keyed by file_id.
+
+    Entries are written to a temporary file and renamed into place, so a crash
+    never leaves a partial entry behind. When the total size exceeds
+    ``max_bytes`` the least recently used entries are deleted. The index is
+    rebuilt from the directory (oldest mtime first) when the cache is opened,
+    and temporary files left by a writer that died mid-put are removed then.
+
+    An entry can also record the compression codec of the stored object
+    (``""`` for none) in its file name, so a download with
+    ``decompress="auto"`` served from the cache does not have to look the
+    codec up again. The payload itself is stored unchanged.
+
+    Cached payloads are plaintext; the directory is created with mode 0700 and
+    should live on storage you would trust with the decrypted files.
+
+    Usage::
+
+        cache = DownloadCache("~/.cache/pytsfiler", max_bytes=10 * 1024 ** 3)
+        data = decode2binary(file_id, token, cache=cache)
+        print(cache.stats.hit_rate)
+
+    Args:
+        directory: Directory holding the cache entries
+        max_bytes: Byte budget for all entries together
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # name -> (サイズ, コーデック)
+        self._index: "OrderedDict[str, Tuple[int, Optional[str]]]" = OrderedDict()
+        self._stats = CacheStats()
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        stale_before = time.time() - _STALE_TMP_SECONDS
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(_SUFFIX):
+                    st = entry.stat()
+                    name, _, tag = entry.name[: -len(_SUFFIX)].partition(".")
+                    codec = None if not tag else "" if tag == _NO_CODEC else tag
+                    entries.append((st.st_mtime, name, st.st_size, codec))
+                elif entry.name.endswith(_TMP_SUFFIX) and entry.stat().st_mtime < stale_before:
+                    # 同じディレクトリを使う他プロセスの書き込み中のファイルは残す
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+        for _, name, size, codec in sorted(entries, key=lambda e: e[0]):
+            if name in self._index:
+                # put の途中で落ちてコーデック違いのファイルが残った場合は新しい方だけ使う
+                self._drop_locked(name)
+            self._index[name] = (size, codec)
+            self._stats.bytes += size
+        self._evict_locked()
+
+    @staticmethod
+    def _name(file_id: str) -> str:
+        return hashlib.sha256(str(file_id).encode()).hexdigest()
+
+    def _path(self, name: str, codec: Optional[str]) -> str:
+        tag = "" if codec is None else "." + (codec or _NO_CODEC)
+        return os.path.join(self.directory, name + tag + _SUFFIX)
+
+    def _drop_locked(self, name: str) -> None:
+        size, codec = self._index.pop(name)
+        self._stats.bytes -= size
+        try:
+            os.remove(self._path(name, codec))
+        except FileNotFoundError:
+            pass
+
+    def _evict_locked(self) -> None:
+        while self._stats.bytes > self.max_bytes and self._index:
+            name = next(iter(self._index))
+            self._drop_locked(name)
+            self._stats.evictions += 1
+
+    def __contains__(self, file_id: str) -> bool:
+        with self._lock:
+            return self._name(file_id) in self._index
+
+    def get(self, file_id: str) -> Optional[bytes]:
+        """Return the cached payload for ``file_id``, or None on a miss."""
+        entry = self.get_entry(file_id)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, file_id: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Return ``(payload, codec)`` for ``file_id``, or None on a miss; codec is None if not recorded."""
+        name = self._name(file_id)
+        with self._lock:
+            if name not in self._index:
+                self._stats.misses += 1
+                return None
+            self._index.move_to_end(name)
+            codec = self._index[name][1]
+        try:
+            with open(self._path(name, codec), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # 外部から削除された場合は索引から外してミス扱い
+            with self._lock:
+                current = self._index.get(name)
+                if current is not None and current[1] == codec:
+                    self._stats.bytes -= self._index.pop(name)[0]
+                self._stats.misses += 1
+            return None
+        with self._lock:
+            self._stats.hits += 1
+        return data, codec
+
+    def put(self, file_id: str, data: bytes, codec: Optional[str] = None) -> None:
+        """
+        Store ``data`` for ``file_id``; payloads larger than the budget are skipped.
+        ``codec`` records how the payload is compressed (``""`` for not at all).
+        """
+        if codec and not codec.isalnum():
+            raise ValueError(f"Invalid codec name: {codec!r}")
+        if len(data) > self.max_bytes:
+            return
+        name = self._name(file_id)
+        path = self._path(name, codec)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=_TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            if name in self._index and self._path(name, self._index[name][1]) != path:
+                # コーデックが変わった場合は古いファイルを消す
+                self._drop_locked(name)
+            self._stats.bytes += len(data) - self._index.pop(name, (0, None))[0]
+            self._index[name] = (len(data), codec)
+            self._evict_locked()
+
+    def discard(self, file_id: str) -> None:
+        with self._lock:
+            name = self._name(file_id)
+            if name in self._index:
+                self._drop_locked(name)
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in list(self._index):
+                self._drop_locked(name)
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=len(self._index),
+                bytes=self._stats.bytes,
+            )
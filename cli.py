@@ -0,0 +1,624 @@
+"""
+``pytsfiler`` command-line tool for bulk transfers.
+
+Subcommands::
+
+    pytsfiler put [-r] [--prefix P] [--jobs N] PATH|GLOB|- ...
+    pytsfiler get [--jobs N] [-o DIR|-] FILE_ID|- ...
+    pytsfiler sync [--jobs N] [--compare-remote] LOCAL_DIR REMOTE_PREFIX
+    pytsfiler ls [-l|--json] [PREFIX]
+    pytsfiler meta query [--select JSON] QUERY_JSON|-
+
+Server and credentials come from the PYTSFILER_* variables described in
+ENV_CONFIG.md (a ``.env`` file in the working directory is loaded first).
+Transfers share one pooled TSFSession whose TokenManager logs in once and
+renews the token as needed. With ``--summary FILE`` a JSON report with
+per-file status, size and timing is written when the command finishes;
+``--summary -`` prints it to stdout and moves the per-file lines to stderr.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .auth import TokenManager
+from .config import DEFAULT_CONFIG
+from .download import decode2stream, download_to_file, list_files
+from .metadata import iter_metadata
+from .scheduler import TransferScheduler
+from .session import TSFSession
+from .sync import sync_directory
+from .upload import upload_file, upload_file_streaming
+
+logger = logging.getLogger(__name__)
+
+# Per-file statuses in the summary
+OK = "ok"
+EXISTS = "exists"      # put: the server already holds this path (409)
+FAILED = "failed"
+
+_SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """PYTSFILER_<name>, then the legacy KOEKOE_<name>, then ``default``."""
+    return os.getenv(f"PYTSFILER_{name}") or os.getenv(f"KOEKOE_{name}") or default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = _env(name)
+    return default if value is None else value.lower() in ("true", "1", "yes", "on")
+
+
+def _env_number(name: str, default: Any, kind: Callable[[str], Any] = int) -> Any:
+    value = _env(name)
+    if value is None:
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        raise CLIError(f"PYTSFILER_{name} must be a number, got {value!r}") from None
+
+
+def _parse_size(text: str) -> int:
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in _SIZE_UNITS:
+        return int(float(text[:-1]) * _SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+class CLIError(Exception):
+    """Invalid usage or configuration; reported without a traceback."""
+
+
+@dataclass
+class FileReport:
+    """One row of the summary."""
+
+    path: str
+    status: str
+    remote_path: Optional[str] = None
+    file_id: Any = None
+    bytes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class Context:
+    """Configuration and the shared session for one command."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.base_url = (args.base_url or _env("BASE_URL") or DEFAULT_CONFIG["base_url"]).rstrip("/")
+        self.jobs = args.jobs
+        self.buffer_size = _env_number("CHUNK_SIZE", DEFAULT_CONFIG["chunk_size"])
+        self.max_file_size = _env_number("MAX_FILE_SIZE", None, _parse_size)
+        # --summary - で標準出力を JSON に使うときは、ファイルごとの行を標準エラーに回す
+        self.out = sys.stderr if args.summary == "-" else sys.stdout
+
+        scheduler = TransferScheduler(
+            max_retries=_env_number("RETRY_LIMIT", DEFAULT_CONFIG["max_retries"]),
+            # 最初の再送までの秒数。以降は再送ごとに倍になる
+            retry_backoff=_env_number("RETRY_DELAY", DEFAULT_CONFIG["retry_backoff"], float),
+            max_concurrency=max(64, self.jobs * 4),
+        )
+        # 再送は TransferScheduler に任せ、urllib3 側では行わない
+        self.session = TSFSession(
+            pool_maxsize=max(10, self.jobs * 4),
+            timeout=_env_number("TIMEOUT", DEFAULT_CONFIG["timeout"], float),
+            max_retries=0,
+            scheduler=scheduler,
+        )
+        ca_cert = _env("CA_CERT_PATH")
+        if ca_cert:
+            self.session.http.verify = ca_cert
+        elif not _env_bool("VERIFY_SSL", True):
+            self.session.http.verify = False
+
+        email, password = _env("EMAIL"), _env("PASSWORD")
+        self._tokens = TokenManager(email, password, self.base_url, session=self.session) if email and password else None
+        self.session.token_manager = self._tokens
+
+    @property
+    def token(self) -> str:
+        """A valid JWT; logs in on first use and renews it before it expires."""
+        if self._tokens is None:
+            raise CLIError("set PYTSFILER_EMAIL and PYTSFILER_PASSWORD (see ENV_CONFIG.md)")
+        return self._tokens.get_token()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Progress:
+    """
+    Live aggregate throughput on stderr.
+
+    Bytes are counted from the CHUNK_GET and SIGNED_PUT metrics phases, so the
+    rate moves per chunk rather than per finished file.
+    """
+
+    _PHASES = (metrics.CHUNK_GET, metrics.SIGNED_PUT)
+
+    def __init__(self, enabled: bool, total_files: Optional[int] = None, interval: float = 0.5) -> None:
+        self.enabled = enabled
+        self.total_files = total_files
+        self.interval = interval
+        self.files_done = 0
+        self.failed = 0
+        self.transferred = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous_sink: Optional[metrics.MetricsSink] = None
+        self._started = time.perf_counter()
+
+    def _sink(self, phase: str, seconds: float, nbytes: int) -> None:
+        if phase in self._PHASES:
+            with self._lock:
+                self.transferred += nbytes
+
+    def file_done(self, ok: bool) -> None:
+        with self._lock:
+            self.files_done += 1
+            if not ok:
+                self.failed += 1
+
+    def _line(self) -> str:
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        files = f"{self.files_done}/{self.total_files}" if self.total_files is not None else str(self.files_done)
+        failed = f", {self.failed} failed" if self.failed else ""
+        return (
+            f"\r{files} files{failed}  {self.transferred / 1e6:,.1f} MB  "
+            f"{self.transferred / elapsed / 1e6:,.1f} MB/s  {elapsed:,.0f}s"
+        )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            sys.stderr.write(self._line())
+            sys.stderr.flush()
+
+    def __enter__(self) -> "Progress":
+        if self.enabled:
+            self._previous_sink = metrics.set_metrics_sink(self._sink)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            metrics.set_metrics_sink(self._previous_sink)
+            sys.stderr.write(self._line() + "\n")
+            sys.stderr.flush()
+
+
+def _run_parallel(
+    items: List[Any],
+    work: Callable[[Any], FileReport],
+    jobs: int,
+    progress: Progress,
+    on_report: Callable[[FileReport], None],
+) -> List[FileReport]:
+    reports: List[FileReport] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(items) or 1))) as executor:
+        for future in as_completed([executor.submit(work, item) for item in items]):
+            report = future.result()
+            progress.file_done(report.status != FAILED)
+            reports.append(report)
+            on_report(report)
+    return reports
+
+
+def _timed(report: FileReport, action: Callable[[], None]) -> FileReport:
+    """Run ``action`` and record its duration and any failure on ``report``."""
+    started = time.perf_counter()
+    try:
+        action()
+    except FileExistsError as e:
+        report.status, report.error = EXISTS, str(e)
+    except Exception as e:
+        logger.debug("transfer failed", exc_info=True)
+        report.status, report.error = FAILED, f"{type(e).__name__}: {e}"
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# ----------------------------------------------------------------------
+# put
+# ----------------------------------------------------------------------
+
+def _expand_inputs(patterns: Iterable[str], recursive: bool) -> Iterator[Tuple[str, str]]:
+    """Yield (local path, path relative to the upload root) for every input file."""
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise CLIError(f"no files match {pattern!r}")
+        for match in matches:
+            if os.path.isdir(match):
+                if not recursive:
+                    raise CLIError(f"{match} is a directory (use -r)")
+                # ディレクトリ名自体もリモートパスに残す (cp -r と同じ)
+                parent = os.path.dirname(os.path.abspath(match))
+                for root, dirs, names in os.walk(match):
+                    dirs.sort()
+                    for name in sorted(names):
+                        local = os.path.join(root, name)
+                        yield local, os.path.relpath(os.path.abspath(local), parent)
+            elif os.path.isfile(match):
+                yield match, os.path.basename(match)
+            else:
+                raise CLIError(f"{match}: no such file")
+
+
+def _remote_path(prefix: str, relative: str) -> str:
+    relative = relative.replace(os.sep, "/")
+    prefix = prefix.strip("/")
+    return f"{prefix}/{relative}" if prefix else relative
+
+
+def _spool_stdin(buffer_size: int) -> str:
+    """Copy stdin to a temporary file so it can be hashed, then encrypted while sent."""
+    fd, path = tempfile.mkstemp(prefix="pytsfiler-stdin-")
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(sys.stdin.buffer, f, max(buffer_size, 1 << 20))
+    return path
+
+
+def cmd_put(ctx: Context, args: argparse.Namespace) -> List[FileReport]:
+    spooled: Optional[str] = None
+    if args.paths == ["-"]:
+        if not args.name:
+            raise CLIError("uploading stdin needs --name")
+        spooled = _spool_stdin(ctx.buffer_size)
+        inputs = [(spooled, args.name)]
+    elif "-" in args.paths:
+        raise CLIError("'-' cannot be combined with other inputs")
+    else:
+        if args.name:
+            raise CLIError("--name only applies to stdin")
+        inputs = list(_expand_inputs(args.paths, args.recursive))
+
+    def put_one(item: Tuple[str, str]) -> FileReport:
+        local, relative = item
+        remote_path = _remote_path(args.prefix, relative)
+        report = FileReport(
+            "-" if local == spooled else local, OK, remote_path=remote_path, bytes=os.path.getsize(local),
+        )
+
+        def action() -> None:
+            if ctx.max_file_size is not None and report.bytes > ctx.max_file_size:
+                raise CLIError(f"{report.bytes} bytes exceeds PYTSFILER_MAX_FILE_SIZE")
+            if args.compress:
+                result = upload_file(
+                    local, remote_path, ctx.token, ctx.base_url,
+                    session=ctx.session, compress=args.compress,
+                )
+            else:
+                result = upload_file_streaming(
+                    local, remote_path, ctx.token, ctx.base_url,
+                    buffer_size=ctx.buffer_size, session=ctx.session,
+                )
+            report.file_id = result["fileId"]
+
+        return _timed(report, action)
+
+    def show(report: FileReport) -> None:
+        if report.status == OK:
+            print(f"{report.file_id}\t{report.remote_path}", file=ctx.out, flush=True)
+        else:
+            print(f"{report.status}: {report.path}: {report.error}", file=sys.stderr, flush=True)
+
+    try:
+        with Progress(args.progress, len(inputs)) as progress:
+            return _run_parallel(inputs, put_one, ctx.jobs, progress, show)
+    finally:
+        if spooled is not None:
+            os.remove(spooled)
+
+
+# ----------------------------------------------------------------------
+# get
+# ----------------------------------------------------------------------
+
+def _safe_join(root: str, remote_path: str) -> str:
+    """Place ``remote_path`` under ``root``, refusing paths that would escape it."""
+    target = os.path.normpath(os.path.join(root, remote_path.lstrip("/")))
+    if os.path.commonpath([os.path.abspath(root), os.path.abspath(target)]) != os.path.abspath(root):
+        raise CLIError(f"refusing to write {remote_path!r} outside {root}")
+    return target
+
+
+def cmd_get(ctx: Context, args: argparse.Namespace) -> List[FileReport]:
+    file_ids = args.file_ids
+    if file_ids == ["-"]:
+        file_ids = [line.split("\t")[0].strip() for line in sys.stdin if line.strip()]
+    decompress = "auto" if args.decompress else None
+
+    if args.output == "-":
+        # 標準出力へは指定順に 1 ファイルずつ書き出す
+        out = sys.stdout.buffer
+        reports = []
+        with Progress(args.progress, len(file_ids)) as progress:
+            for file_id in file_ids:
+                report = FileReport(str(file_id), OK, file_id=file_id)
+
+                def action(report: FileReport = report) -> None:
+                    for block in decode2stream(
+                        report.file_id, ctx.token, ctx.base_url, ctx.buffer_size,
+                        session=ctx.session, decompress=decompress, verify=args.verify,
+                    ):
+                        out.write(block)
+                        report.bytes += len(block)
+                    out.flush()
+
+                reports.append(_timed(report, action))
+                progress.file_done(report.status == OK)
+                if report.status != OK:
+                    print(f"failed: {file_id}: {report.error}", file=sys.stderr, flush=True)
+                    break
+        return reports
+
+    os.makedirs(args.output, exist_ok=True)
+    names: Dict[str, str] = {}
+    if args.original_paths:
+        names = {
+            str(entry.get("fileId", entry.get("id"))): entry["originalPath"]
+            for entry in list_files(ctx.token, ctx.base_url, ctx.session)
+            if entry.get("originalPath")
+        }
+
+    def get_one(file_id: str) -> FileReport:
+        report = FileReport("", OK, file_id=file_id, remote_path=names.get(str(file_id)))
+
+        def action() -> None:
+            report.path = _safe_join(args.output, report.remote_path or str(file_id))
+            os.makedirs(os.path.dirname(report.path) or ".", exist_ok=True)
+            report.bytes = download_to_file(
+                file_id, report.path, ctx.token, ctx.base_url, ctx.buffer_size,
+                session=ctx.session, decompress=decompress, verify=args.verify,
+            )
+
+        return _timed(report, action)
+
+    def show(report: FileReport) -> None:
+        if report.status == OK:
+            print(report.path, file=ctx.out, flush=True)
+        else:
+            print(f"failed: {report.file_id}: {report.error}", file=sys.stderr, flush=True)
+
+    with Progress(args.progress, len(file_ids)) as progress:
+        return _run_parallel(file_ids, get_one, ctx.jobs, progress, show)
+
+
+# ----------------------------------------------------------------------
+# sync, ls, meta
+# ----------------------------------------------------------------------
+
+def cmd_sync(ctx: Context, args: argparse.Namespace) -> List[FileReport]:
+    with Progress(args.progress) as progress:
+        result = sync_directory(
+            args.local_dir, args.remote_prefix, ctx.token, ctx.base_url,
+            manifest_path=args.manifest, max_workers=ctx.jobs,
+            compare_remote=args.compare_remote, follow_symlinks=args.follow_symlinks,
+            buffer_size=ctx.buffer_size, session=ctx.session,
+        )
+        progress.files_done = sum(result.counts.values())
+        progress.failed = len(result.failed)
+
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(result.counts.items())) or "nothing to do"
+    print(f"{counts}; {result.uploaded_bytes / 1e6:,.1f} MB uploaded in {result.seconds:,.1f}s", file=ctx.out)
+    for path in result.conflicts:
+        print(f"conflict: {path}", file=sys.stderr)
+    for path, error in result.failed:
+        print(f"failed: {path}: {error}", file=sys.stderr)
+    for path in result.remote_only:
+        print(f"remote only: {path}", file=ctx.out)
+
+    # sync_directory はファイル単位の所要時間を返さないため、状態のみ記録する
+    reports = [
+        FileReport(
+            path, OK, remote_path=_remote_path(args.remote_prefix, path),
+            bytes=os.path.getsize(os.path.join(args.local_dir, path)),
+        )
+        for path in result.uploaded
+    ]
+    reports += [FileReport(path, EXISTS, error="conflict") for path in result.conflicts]
+    reports += [FileReport(path, FAILED, error=f"{type(e).__name__}: {e}") for path, e in result.failed]
+    return reports
+
+
+def cmd_ls(ctx: Context, args: argparse.Namespace) -> List[FileReport]:
+    prefix = args.prefix.strip("/")
+    entries = [
+        entry for entry in list_files(ctx.token, ctx.base_url, ctx.session)
+        if not prefix or (entry.get("originalPath") or "").startswith(prefix + "/")
+        or entry.get("originalPath") == prefix
+    ]
+    if args.json:
+        json.dump(entries, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return []
+    for entry in entries:
+        if args.long:
+            print(
+                f"{entry.get('fileId', entry.get('id'))}\t{entry.get('filesize', '')}\t"
+                f"{entry.get('md5', '')}\t{entry.get('originalPath', '')}"
+            )
+        else:
+            print(entry.get("originalPath", ""))
+    return []
+
+
+def _load_json_arg(text: str, what: str) -> dict:
+    try:
+        return json.loads(sys.stdin.read() if text == "-" else text)
+    except ValueError as e:
+        raise CLIError(f"{what} is not valid JSON: {e}") from e
+
+
+def cmd_meta_query(ctx: Context, args: argparse.Namespace) -> List[FileReport]:
+    query = _load_json_arg(args.query, "query")
+    select = _load_json_arg(args.select, "--select") if args.select else None
+    for record in iter_metadata(ctx.token, query, ctx.base_url, select, args.page_size, ctx.session):
+        sys.stdout.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return []
+
+
+# ----------------------------------------------------------------------
+# main
+# ----------------------------------------------------------------------
+
+def _write_summary(path: str, command: str, reports: List[FileReport], seconds: float) -> None:
+    total_bytes = sum(r.bytes for r in reports if r.status != FAILED)
+    summary = {
+        "command": command,
+        "ok": all(r.status != FAILED for r in reports),
+        "seconds": seconds,
+        "totals": {
+            "files": len(reports),
+            "failed": sum(1 for r in reports if r.status == FAILED),
+            "bytes": total_bytes,
+            "mbPerSecond": total_bytes / seconds / 1e6 if seconds else 0.0,
+        },
+        "files": [
+            {
+                "path": r.path, "remotePath": r.remote_path, "fileId": r.file_id, "status": r.status,
+                "bytes": r.bytes, "seconds": r.seconds, "error": r.error,
+            }
+            for r in reports
+        ],
+    }
+    if path == "-":
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+def _configure_logging() -> None:
+    level = "DEBUG" if _env_bool("DEBUG", False) else (_env("LOG_LEVEL") or "WARNING").upper()
+    log_file = _env("LOG_FILE")
+    logging.basicConfig(
+        level=getattr(logging, level, logging.WARNING),
+        filename=log_file,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        force=True,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--base-url", help="server URL (default: PYTSFILER_BASE_URL)")
+    common.add_argument("-j", "--jobs", type=int, default=8, help="files transferred concurrently (default: 8)")
+    common.add_argument("--summary", metavar="FILE", help="write a JSON summary with per-file timings ('-' for stdout)")
+    progress = common.add_mutually_exclusive_group()
+    progress.add_argument(
+        "--progress", action="store_true", default=None,
+        help="show live throughput on stderr (default: PYTSFILER_SHOW_PROGRESS, or when stderr is a terminal)",
+    )
+    progress.add_argument("--no-progress", dest="progress", action="store_false")
+
+    parser = argparse.ArgumentParser(prog="pytsfiler", description="Bulk transfers against a TSF server.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    put = commands.add_parser("put", parents=[common], help="upload files, globs or stdin")
+    put.add_argument("paths", nargs="+", metavar="PATH", help="files, directories (with -r), globs, or '-' for stdin")
+    put.add_argument("-r", "--recursive", action="store_true", help="upload directories recursively")
+    put.add_argument("--prefix", default="", help="remote path prefix")
+    put.add_argument("--name", help="remote path for stdin")
+    put.add_argument(
+        "--compress", nargs="?", const="auto", choices=("auto", "zlib", "zstd"),
+        help="compress before encrypting (reads each file into memory)",
+    )
+    put.set_defaults(handler=cmd_put)
+
+    get = commands.add_parser("get", parents=[common], help="download files by id")
+    get.add_argument("file_ids", nargs="+", metavar="FILE_ID", help="file ids, or '-' to read them from stdin")
+    get.add_argument("-o", "--output", default=".", help="output directory, or '-' for stdout (default: .)")
+    get.add_argument("--original-paths", action="store_true", help="save under each file's original path")
+    get.add_argument("--decompress", action="store_true", help="undo compression recorded at upload")
+    get.add_argument("--verify", action="store_true", help="check the data against the MD5s recorded at upload")
+    get.set_defaults(handler=cmd_get)
+
+    sync = commands.add_parser("sync", parents=[common], help="upload new and changed files in a directory")
+    sync.add_argument("local_dir")
+    sync.add_argument("remote_prefix")
+    sync.add_argument("--manifest", help="manifest path (default: LOCAL_DIR/.tsfsync.json)")
+    sync.add_argument("--compare-remote", action="store_true", help="reconcile against the server's file list")
+    sync.add_argument("--follow-symlinks", action="store_true")
+    sync.set_defaults(handler=cmd_sync)
+
+    ls = commands.add_parser("ls", parents=[common], help="list stored files")
+    ls.add_argument("prefix", nargs="?", default="", help="only paths under this prefix")
+    output = ls.add_mutually_exclusive_group()
+    output.add_argument("-l", "--long", action="store_true", help="show id, size and md5")
+    output.add_argument("--json", action="store_true", help="print the raw listing as JSON")
+    ls.set_defaults(handler=cmd_ls)
+
+    meta = commands.add_parser("meta", help="metadata operations")
+    meta_commands = meta.add_subparsers(dest="meta_command", metavar="COMMAND", required=True)
+    query = meta_commands.add_parser("query", parents=[common], help="print matching records as JSON lines")
+    query.add_argument("query", help="query as JSON, or '-' to read it from stdin")
+    query.add_argument("--select", help="projection as JSON")
+    query.add_argument("--page-size", type=int, default=1000)
+    query.set_defaults(handler=cmd_meta_query)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    try:
+        from dotenv import load_dotenv
+    except ImportError:  # pragma: no cover - python-dotenv is a dependency
+        pass
+    else:
+        load_dotenv()
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    _configure_logging()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.progress is None:
+        args.progress = _env_bool("SHOW_PROGRESS", sys.stderr.isatty())
+    if args.summary == "-" and (args.command in ("ls", "meta") or getattr(args, "output", None) == "-"):
+        # これらは標準出力にデータそのものを書く (put・sync・get -o DIR の一覧は標準エラーに回す)
+        parser.error(f"--summary - cannot be used with {args.command}{' -o -' if args.command == 'get' else ''}")
+
+    ctx: Optional[Context] = None
+    started = time.perf_counter()
+    try:
+        ctx = Context(args)
+        reports = args.handler(ctx, args)
+    except CLIError as e:
+        print(f"pytsfiler: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        logger.debug("command failed", exc_info=True)
+        print(f"pytsfiler: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if ctx is not None:
+            ctx.close()
+
+    if args.summary:
+        _write_summary(args.summary, args.command, reports, time.perf_counter() - started)
+    return 1 if any(r.status == FAILED for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
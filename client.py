@@ -0,0 +1,397 @@
+"""
+Enhanced asyncio client for the TSF server.
+
+TSFClient keeps one aiohttp connector for its whole lifetime, caps the number
+of connections per host, and bounds in-flight chunk transfers with a
+semaphore, so thousands of uploads and downloads can be awaited from a single
+event loop. AES encryption, decryption and MD5 hashing run on a thread pool
+so large payloads never stall the loop.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import aiohttp
+
+from .config import DEFAULT_CONFIG, SSL_VERIFY
+from .crypto import _decrypt_chunk, _encrypt_padded
+from .exceptions import AuthenticationError, DownloadError, TSFError, UploadError
+from .upload import get_md5
+
+# progress(done, total): bytes for uploads, chunks for downloads
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class TSFConfig:
+    """Connection and concurrency settings for TSFClient."""
+
+    base_url: str = DEFAULT_CONFIG["base_url"]
+    verify_ssl: bool = SSL_VERIFY
+    timeout: float = DEFAULT_CONFIG["timeout"]
+    chunk_size: int = 1 << 20
+    max_connections: int = 100
+    max_connections_per_host: int = 32
+    max_concurrent_transfers: int = 64
+    crypto_workers: Optional[int] = None
+
+
+@dataclass
+class UploadResult:
+    """Outcome of a single upload."""
+
+    file_id: Any
+    original_path: str
+    uploaded_size: int
+    final_filesize: int
+    md5: Optional[str] = None
+    success: bool = True
+    elapsed: float = 0.0
+
+
+@dataclass
+class FileInfo:
+    """One entry of the server's /files listing."""
+
+    file_id: Any
+    original_path: Optional[str] = None
+    size: Optional[int] = None
+    md5: Optional[str] = None
+    created_at: Optional[str] = None
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FileInfo":
+        return cls(
+            file_id=data.get("fileId", data.get("id")),
+            original_path=data.get("originalPath"),
+            size=data.get("filesize", data.get("size")),
+            md5=data.get("md5"),
+            created_at=data.get("createdAt"),
+            raw=data,
+        )
+
+
+def progress_printer(label: str = "", stream: Any = None) -> ProgressCallback:
+    """Return a progress callback that prints a one-line percentage."""
+    out = stream or sys.stderr
+
+    def report(done: int, total: int) -> None:
+        percent = 100.0 * done / total if total else 100.0
+        end = "\n" if done >= total else ""
+        out.write(f"\r{label}{done}/{total} ({percent:5.1f}%)" + end)
+        out.flush()
+
+    return report
+
+
+def _encrypt(data: bytes, meta: Dict[str, Any]) -> bytearray:
+    return _encrypt_padded(data, meta["aesKeyBase64"], meta["ivBase64"], meta["algorithm"])
+
+
+class TSFClient:
+    """
+    Asyncio client for the TSF server API.
+
+    Usage::
+
+        async with TSFClient(TSFConfig(base_url="https://tsf.example.com")) as client:
+            await client.authenticate("user@example.com", "password")
+            result = await client.upload_file("large_file.zip")
+            data = await client.download(result.file_id)
+
+    Args:
+        config: Connection and concurrency settings
+        token: Existing JWT token, skips authenticate()
+    """
+
+    def __init__(self, config: Optional[TSFConfig] = None, token: Optional[str] = None) -> None:
+        self.config = config or TSFConfig()
+        self.token = token
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # ループに束縛されるため (Python 3.9 以前)、open() の中で作る
+        self._transfers: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "TSFClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        if self._session is not None:
+            return
+        # 検証する場合は aiohttp の既定に任せる (3.8 では ssl=True が「検証しない」を意味する)
+        ssl_options: Dict[str, Any] = {} if self.config.verify_ssl else {"ssl": False}
+        connector = aiohttp.TCPConnector(
+            limit=self.config.max_connections,
+            limit_per_host=self.config.max_connections_per_host,
+            **ssl_options,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=self.config.timeout),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.crypto_workers, thread_name_prefix="tsf-crypto"
+        )
+        self._transfers = asyncio.Semaphore(self.config.max_concurrent_transfers)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._transfers = None
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise TSFError("Client is not open; use 'async with TSFClient(...)'")
+        return self._session
+
+    @property
+    def _slots(self) -> asyncio.Semaphore:
+        if self._transfers is None:
+            raise TSFError("Client is not open; use 'async with TSFClient(...)'")
+        return self._transfers
+
+    def _url(self, path: str) -> str:
+        return f"{self.config.base_url.rstrip('/')}/{path.lstrip('/')}"
+
+    def _auth_headers(self) -> Dict[str, str]:
+        if not self.token:
+            raise AuthenticationError("Not authenticated; call authenticate() first")
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def _run_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _json(self, resp: aiohttp.ClientResponse, error: type) -> Any:
+        if resp.status == 401:
+            raise AuthenticationError(f"Unauthorized: {await resp.text()}")
+        if resp.status >= 400:
+            raise error(f"HTTP {resp.status} from {resp.url}: {await resp.text()}")
+        result = await resp.json(content_type=None)
+        if isinstance(result, dict) and "error" in result:
+            raise error(result["error"])
+        return result
+
+    # ------------------------------------------------------------------
+    # Authentication
+    # ------------------------------------------------------------------
+
+    async def authenticate(self, email: str, password: str) -> str:
+        """Log in and keep the JWT token for subsequent calls."""
+        payload = {"email": email, "password": password}
+        async with self.session.post(self._url("auth/login"), json=payload) as resp:
+            if resp.status >= 400:
+                raise AuthenticationError(f"Authentication failed: HTTP {resp.status}")
+            result = await resp.json(content_type=None)
+        if "error" in result:
+            raise AuthenticationError(f"Authentication failed: {result['error']}")
+        self.token = result["token"]
+        return self.token
+
+    # ------------------------------------------------------------------
+    # Upload
+    # ------------------------------------------------------------------
+
+    async def _put(self, url: str, body: bytes, progress: Optional[ProgressCallback]) -> None:
+        step = self.config.chunk_size
+
+        async def pieces() -> AsyncIterator[bytes]:
+            view = memoryview(body)
+            for offset in range(0, len(body), step):
+                yield bytes(view[offset:offset + step])
+                if progress:
+                    progress(min(offset + step, len(body)), len(body))
+
+        headers = {"Content-Type": "application/octet-stream", "Content-Length": str(len(body))}
+        async with self._slots:
+            async with self.session.put(url, data=pieces(), headers=headers) as resp:
+                if resp.status >= 400:
+                    raise UploadError(f"Signed PUT failed: HTTP {resp.status}")
+
+    async def upload_bytes(
+        self,
+        data: bytes,
+        original_path: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> UploadResult:
+        """Encrypt and upload ``data`` through /upload/signed and confirm it."""
+        started = time.perf_counter()
+        md5_hex = await self._run_sync(get_md5, data)
+        payload = {"originalPath": original_path, "md5": md5_hex}
+        async with self.session.post(
+            self._url("upload/signed"), json=payload, headers=self._auth_headers()
+        ) as resp:
+            if resp.status == 409:
+                error_data = await resp.json(content_type=None)
+                raise FileExistsError(f"File already exists: {error_data.get('error', 'Unknown error')}")
+            meta = await self._json(resp, UploadError)
+
+        encrypted = await self._run_sync(_encrypt, data, meta)
+        await self._put(meta["signedUrl"], encrypted, progress)
+        confirmation = await self.confirm_upload(meta["fileId"])
+
+        return UploadResult(
+            file_id=meta["fileId"],
+            original_path=original_path,
+            uploaded_size=len(encrypted),
+            final_filesize=confirmation.get("filesize", len(encrypted)),
+            md5=md5_hex,
+            success=confirmation.get("success", True),
+            elapsed=time.perf_counter() - started,
+        )
+
+    async def upload_file(
+        self,
+        file_path: str,
+        original_path: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> UploadResult:
+        """Upload a local file; ``original_path`` defaults to its basename."""
+        data = await self._run_sync(_read_file, file_path)
+        return await self.upload_bytes(data, original_path or os.path.basename(file_path), progress)
+
+    async def confirm_upload(self, file_id: Any) -> Dict[str, Any]:
+        async with self.session.post(
+            self._url("upload/signed/confirm"), json={"fileId": file_id}, headers=self._auth_headers()
+        ) as resp:
+            return await self._json(resp, UploadError)
+
+    async def upload_direct(self, data: bytes, filename: str, upload_token: str) -> Dict[str, Any]:
+        """Upload ``data`` through /upload/direct with an upload token."""
+        form = aiohttp.FormData()
+        form.add_field("filename", filename)
+        form.add_field("file", data, filename=filename, content_type="application/octet-stream")
+        async with self._slots:
+            async with self.session.post(
+                self._url("upload/direct"), data=form, headers={"Authorization": f"Bearer {upload_token}"}
+            ) as resp:
+                return await self._json(resp, UploadError)
+
+    async def upload_file_direct(self, file_path: str, upload_token: str) -> Dict[str, Any]:
+        data = await self._run_sync(_read_file, file_path)
+        return await self.upload_direct(data, os.path.basename(file_path), upload_token)
+
+    # ------------------------------------------------------------------
+    # Download
+    # ------------------------------------------------------------------
+
+    async def _fetch_chunk(self, url: str, key: str, iv: str, algorithm: str) -> bytes:
+        async with self._slots:
+            async with self.session.get(url) as resp:
+                if resp.status >= 400:
+                    raise DownloadError(f"Chunk GET failed: HTTP {resp.status}")
+                encrypted = await resp.read()
+        return await self._run_sync(_decrypt_chunk, encrypted, key, iv, algorithm)
+
+    async def download(self, file_id: Any, progress: Optional[ProgressCallback] = None) -> bytes:
+        """Download and decrypt a file; chunks are fetched concurrently."""
+        async with self.session.get(self._url(f"download/{file_id}"), headers=self._auth_headers()) as resp:
+            meta = await self._json(resp, DownloadError)
+
+        urls, keys, ivs = meta.get("urls", []), meta.get("keys", []), meta.get("ivs", [])
+        algorithm = meta.get("algorithm", "aes-256-cbc")
+        if not urls:
+            raise DownloadError("No 'urls' in response.")
+        if len(urls) != len(keys) or len(urls) != len(ivs):
+            raise DownloadError("Mismatch in lengths of urls, keys, and ivs.")
+
+        done = 0
+
+        async def fetch(i: int) -> bytes:
+            nonlocal done
+            chunk = await self._fetch_chunk(urls[i], keys[i], ivs[i], algorithm)
+            done += 1
+            if progress:
+                progress(done, len(urls))
+            return chunk
+
+        chunks = await asyncio.gather(*(fetch(i) for i in range(len(urls))))
+        return b"".join(chunks)
+
+    async def download_to_file(self, file_id: Any, path: str) -> int:
+        data = await self.download(file_id)
+        await self._run_sync(_write_file, path, data)
+        return len(data)
+
+    # ------------------------------------------------------------------
+    # Files and metadata
+    # ------------------------------------------------------------------
+
+    async def list_files(self) -> List[FileInfo]:
+        async with self.session.get(self._url("files"), headers=self._auth_headers()) as resp:
+            result = await self._json(resp, TSFError)
+        entries = result.get("files", []) if isinstance(result, dict) else result
+        return [FileInfo.from_dict(entry) for entry in entries]
+
+    async def put_metadata(self, metadata: Dict[str, Any]) -> Any:
+        async with self.session.post(self._url("metadata"), json=metadata, headers=self._auth_headers()) as resp:
+            return await self._json(resp, TSFError)
+
+    async def query_metadata(self, query: Dict[str, Any], select: Optional[Dict[str, Any]] = None) -> Any:
+        payload: Dict[str, Any] = {"query": query}
+        if select:
+            payload["select"] = select
+        async with self.session.post(
+            self._url("metadata/query"), json=payload, headers=self._auth_headers()
+        ) as resp:
+            return await self._json(resp, TSFError)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+async def create_client(
+    base_url: str = DEFAULT_CONFIG["base_url"],
+    email: Optional[str] = None,
+    password: Optional[str] = None,
+    token: Optional[str] = None,
+    **config: Any,
+) -> TSFClient:
+    """
+    Open a TSFClient and, if credentials are given, authenticate it.
+
+    The caller owns the returned client and must ``await client.close()``
+    (or use it as an async context manager).
+    """
+    client = TSFClient(TSFConfig(base_url=base_url, **config), token=token)
+    await client.open()
+    if email is not None and password is not None:
+        try:
+            await client.authenticate(email, password)
+        except BaseException:
+            await client.close()
+            raise
+    return client
+
+
+__all__ = [
+    "TSFClient", "TSFConfig", "UploadResult", "FileInfo",
+    "TSFError", "AuthenticationError", "UploadError", "DownloadError",
+    "create_client", "progress_printer",
+]
@@ -0,0 +1,121 @@
+"""
+Optional compression applied to plaintext before it is encrypted.
+
+Compression must happen before AES, because ciphertext does not compress.
+Supported codecs are ``zlib`` (always available) and ``zstd`` (when the
+``zstandard`` package is installed). The codec used for an object is stored
+as a metadata record, so readers can find and undo it automatically:
+
+    {"type": "tsf.compression", "fileId": "<id>", "codec": "zstd", "originalSize": 1234}
+
+The codec is also sent to /upload/signed as ``compression``. A server that
+stores it with the object and returns it from /download saves
+``decompress="auto"`` the metadata query; otherwise the record is looked up.
+Decompression is opt-in, so plain downloads never make that query.
+"""
+
+import zlib
+from typing import Any, Iterable, Iterator, Optional
+
+from .exceptions import DownloadError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore[assignment]
+
+_ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+METADATA_TYPE = "tsf.compression"
+# /upload/signed と /download で使うコーデックのフィールド名
+DOWNLOAD_FIELD = "compression"
+CODECS = ("zlib", "zstd")
+
+# Objects smaller than this are never compressed: the saving cannot pay for
+# the metadata round trip
+MIN_SIZE = 512
+# Bytes taken from the start, middle and end of the data for the sample
+SAMPLE_SIZE = 64 * 1024
+# Compression is skipped when the sample does not shrink below this ratio
+MAX_RATIO = 0.9
+
+
+def available_codecs() -> list:
+    return [codec for codec in CODECS if codec != "zstd" or zstandard is not None]
+
+
+def resolve_codec(codec: str) -> str:
+    """Map ``"auto"`` to the best available codec and validate explicit names."""
+    if codec == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if codec not in CODECS:
+        raise ValueError(f"Unsupported compression codec: {codec!r}")
+    if codec == "zstd" and zstandard is None:
+        raise ImportError("zstd compression requires the 'zstandard' package")
+    return codec
+
+
+def compress(data: bytes, codec: str, level: Optional[int] = None) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6 if level is None else level)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise ValueError(f"Unsupported compression codec: {codec!r}")
+
+
+def _sample(data: bytes) -> bytes:
+    if len(data) <= 3 * SAMPLE_SIZE:
+        return data
+    view = memoryview(data)
+    middle = (len(data) - SAMPLE_SIZE) // 2
+    return b"".join((view[:SAMPLE_SIZE], view[middle:middle + SAMPLE_SIZE], view[-SAMPLE_SIZE:]))
+
+
+def is_compressible(data: bytes, codec: str) -> bool:
+    """
+    Guess from a sample whether compressing ``data`` is worth it.
+
+    Up to three slices of SAMPLE_SIZE bytes are compressed at the fastest
+    level; already-compressed media (JPEG, video, archives) rarely shrink below
+    MAX_RATIO and are sent as they are.
+    """
+    if len(data) < MIN_SIZE:
+        return False
+    sample = _sample(data)
+    return len(compress(sample, codec, level=1)) < len(sample) * MAX_RATIO
+
+
+def decompressor(codec: str) -> Any:
+    """Return a streaming decompressor with ``decompress(data)``, ``flush()`` and ``eof``."""
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd decompression requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported compression codec: {codec!r}")
+
+
+def iter_decompressed(blocks: Iterable[bytes], codec: str) -> Iterator[bytes]:
+    """Decompress an iterable of compressed blocks, yielding plaintext as it appears."""
+    stream = decompressor(codec)
+    try:
+        for block in blocks:
+            out = stream.decompress(block)
+            if out:
+                yield out
+        out = stream.flush()
+    except _ERRORS as e:
+        raise DownloadError(f"Failed to decompress {codec} data: {e}") from e
+    if out:
+        yield out
+    if not stream.eof:
+        raise DownloadError(f"Truncated {codec} data")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    return b"".join(iter_decompressed((data,), codec))
+
+
+def metadata_record(file_id: Any, codec: str, original_size: int) -> dict:
+    return {"type": METADATA_TYPE, "fileId": str(file_id), "codec": codec, "originalSize": original_size}
@@ -0,0 +1,25 @@
+import os
+from typing import TypedDict
+
+# SSL verification setting from environment
+SSL_VERIFY = os.getenv("SSL_VERIFY", "true").lower() in ("true", "1", "yes")
+
+
+class _DefaultConfig(TypedDict):
+    base_url: str
+    verify_ssl: bool
+    timeout: float
+    chunk_size: int
+    max_retries: int
+    retry_backoff: float
+
+
+# Default configuration
+DEFAULT_CONFIG: _DefaultConfig = {
+    "base_url": "https://localhost:3000",  # Changed to HTTPS
+    "verify_ssl": False,  # Can be changed to True in production
+    "timeout": 60,  # Increased timeout for network stability
+    "chunk_size": 8192,
+    "max_retries": 3,  # Number of retry attempts
+    "retry_backoff": 2  # Exponential backoff base
+}
@@ -0,0 +1,249 @@
+"""
+AES-256-CBC backends.
+
+Two implementations of the same cipher are supported: ``cryptography``
+(OpenSSL, uses AES-NI and is several times faster on large buffers) and
+``pycryptodome``. The fastest installed backend is selected automatically;
+set_backend() or the PYTSFILER_CRYPTO_BACKEND environment variable can force
+one.
+
+Besides a streaming cipher (new_cipher), each backend offers one-shot
+helpers that pad and unpad without copying the whole buffer:
+encrypt_padded() encrypts the block-aligned body of the input straight into a
+preallocated output and only copies the last partial block, and decrypt()
+plus strip_padding() produce a bytearray whose padding is removed by
+truncating it in place.
+"""
+
+import base64
+import os
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from . import metrics
+from .exceptions import PaddingError
+
+BLOCK_SIZE = 16
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def pkcs7_tail(data: BytesLike) -> bytes:
+    """Return the last partial block of ``data`` with PKCS7 padding appended."""
+    remainder = len(data) % BLOCK_SIZE
+    fill = BLOCK_SIZE - remainder
+    return bytes(memoryview(data)[len(data) - remainder:]) + bytes([fill]) * fill
+
+
+def padded_length(size: int) -> int:
+    """Ciphertext size of ``size`` plaintext bytes after PKCS7 padding."""
+    return (size // BLOCK_SIZE + 1) * BLOCK_SIZE
+
+
+def strip_padding(buffer: bytearray) -> bytearray:
+    """Validate and remove PKCS7 padding from ``buffer`` in place."""
+    if not buffer or len(buffer) % BLOCK_SIZE:
+        raise PaddingError("Padding error. Possibly incorrect key/IV or corrupted data.")
+    fill = buffer[-1]
+    if not 1 <= fill <= BLOCK_SIZE or buffer[-fill:] != bytes([fill]) * fill:
+        raise PaddingError("Padding error. Possibly incorrect key/IV or corrupted data.")
+    del buffer[-fill:]
+    return buffer
+
+
+class CipherBackend:
+    """AES-256-CBC implementation; subclasses wrap one crypto library."""
+
+    name = ""
+    # Spare bytes the output buffer needs beyond the input length
+    _headroom = 0
+
+    def new_cipher(self, key: bytes, iv: bytes) -> Any:
+        """Return a streaming CBC cipher with ``encrypt(data)``/``decrypt(data)``."""
+        raise NotImplementedError
+
+    def _cbc_into(self, cipher: Any, encrypt: bool, data: memoryview, out: memoryview) -> None:
+        raise NotImplementedError
+
+    def encrypt_padded(self, key: bytes, iv: bytes, data: BytesLike) -> bytearray:
+        """PKCS7-pad and encrypt ``data`` into a single new buffer."""
+        view = memoryview(data)
+        aligned = len(view) - len(view) % BLOCK_SIZE
+        total = padded_length(len(view))
+        out = bytearray(total + self._headroom)
+        target = memoryview(out)
+        cipher = self.new_cipher(key, iv)
+        if aligned:
+            self._cbc_into(cipher, True, view[:aligned], target[:aligned + self._headroom])
+        self._cbc_into(cipher, True, memoryview(pkcs7_tail(view)), target[aligned:])
+        target.release()
+        del out[total:]
+        return out
+
+    def decrypt(self, key: bytes, iv: bytes, data: BytesLike) -> bytearray:
+        """Decrypt ``data`` into a new bytearray (padding left in place)."""
+        view = memoryview(data)
+        if len(view) % BLOCK_SIZE:
+            raise PaddingError("Padding error. Possibly incorrect key/IV or corrupted data.")
+        out = bytearray(len(view) + self._headroom)
+        if view:
+            target = memoryview(out)
+            self._cbc_into(self.new_cipher(key, iv), False, view, target)
+            target.release()
+        del out[len(view):]
+        return out
+
+
+class PycryptodomeBackend(CipherBackend):
+    name = "pycryptodome"
+
+    def __init__(self) -> None:
+        from Crypto.Cipher import AES
+        self._aes = AES
+
+    def new_cipher(self, key: bytes, iv: bytes) -> Any:
+        return self._aes.new(key, self._aes.MODE_CBC, iv)
+
+    def _cbc_into(self, cipher: Any, encrypt: bool, data: memoryview, out: memoryview) -> None:
+        if encrypt:
+            cipher.encrypt(data, output=out)
+        else:
+            cipher.decrypt(data, output=out)
+
+
+class _OpenSSLCBC:
+    """pycryptodome-style ``encrypt``/``decrypt`` over a cryptography Cipher."""
+
+    def __init__(self, cipher: Any) -> None:
+        self._cipher = cipher
+        self._context: Any = None
+        self._encrypting: Optional[bool] = None
+
+    def context(self, encrypt: bool) -> Any:
+        if self._context is None:
+            self._context = self._cipher.encryptor() if encrypt else self._cipher.decryptor()
+            self._encrypting = encrypt
+        elif self._encrypting != encrypt:
+            raise TypeError("encrypt() and decrypt() cannot be mixed on one cipher")
+        return self._context
+
+    def encrypt(self, data: BytesLike) -> bytes:
+        return self.context(True).update(data)
+
+    def decrypt(self, data: BytesLike) -> bytes:
+        return self.context(False).update(data)
+
+
+class CryptographyBackend(CipherBackend):
+    name = "cryptography"
+    # update_into() requires len(data) + block_size - 1 bytes of output space
+    _headroom = BLOCK_SIZE - 1
+
+    def __init__(self) -> None:
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        self._cipher_type = Cipher
+        self._aes = algorithms.AES
+        self._cbc = modes.CBC
+
+    def new_cipher(self, key: bytes, iv: bytes) -> Any:
+        return _OpenSSLCBC(self._cipher_type(self._aes(key), self._cbc(iv)))
+
+    def _cbc_into(self, cipher: Any, encrypt: bool, data: memoryview, out: memoryview) -> None:
+        cipher.context(encrypt).update_into(data, out)
+
+
+# Preference order for automatic selection
+_BACKEND_TYPES = (CryptographyBackend, PycryptodomeBackend)
+
+_backends: Dict[str, CipherBackend] = {}
+_active: Optional[CipherBackend] = None
+
+
+def _load(backend_type: Type[CipherBackend]) -> Optional[CipherBackend]:
+    if backend_type.name not in _backends:
+        try:
+            _backends[backend_type.name] = backend_type()
+        except ImportError:
+            return None
+    return _backends[backend_type.name]
+
+
+def available_backends() -> List[str]:
+    """Names of the installed backends, fastest first."""
+    return [t.name for t in _BACKEND_TYPES if _load(t) is not None]
+
+
+def set_backend(name: Optional[str]) -> CipherBackend:
+    """Force the backend by name, or pass None to pick the fastest installed one."""
+    global _active
+    for backend_type in _BACKEND_TYPES:
+        if name is not None and backend_type.name != name:
+            continue
+        backend = _load(backend_type)
+        if backend is not None:
+            _active = backend
+            return backend
+        if name is not None:
+            raise ImportError(f"Crypto backend {name!r} is not installed")
+    if name is not None:
+        raise ValueError(f"Unknown crypto backend: {name!r}")
+    raise ImportError("No AES backend available; install cryptography or pycryptodome")
+
+
+def get_backend(name: Optional[str] = None) -> CipherBackend:
+    """Return the backend called ``name``, or the active one."""
+    if name is not None:
+        for backend_type in _BACKEND_TYPES:
+            if backend_type.name == name:
+                backend = _load(backend_type)
+                if backend is None:
+                    raise ImportError(f"Crypto backend {name!r} is not installed")
+                return backend
+        raise ValueError(f"Unknown crypto backend: {name!r}")
+    if _active is None:
+        return set_backend(os.environ.get("PYTSFILER_CRYPTO_BACKEND") or None)
+    return _active
+
+
+# Helpers taking the Base64 key/IV and algorithm name as sent by the server
+def _decode_key(key_b64: str, iv_b64: str, algorithm: str) -> Tuple[bytes, bytes]:
+    """Base64 のキーとIVをデコードする。対応していないアルゴリズムは ValueError"""
+    # 本例では "aes-256-cbc" を想定
+    if algorithm.lower() != "aes-256-cbc":
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    return base64.b64decode(key_b64), base64.b64decode(iv_b64)
+
+
+def _new_cipher(key_b64: str, iv_b64: str, algorithm: str) -> Any:
+    """Base64デコードしたキーとIVを使ってAES暗号器/復号器を初期化する"""
+    return get_backend().new_cipher(*_decode_key(key_b64, iv_b64, algorithm))
+
+
+def _unpad_chunk(decrypted: Union[bytes, bytearray]) -> bytearray:
+    """
+    各チャンクが独立してパディングされている想定とし、PKCS7 パディングを除去する
+    bytearray はコピーせずにその場で切り詰める
+    """
+    buffer = decrypted if isinstance(decrypted, bytearray) else bytearray(decrypted)
+    return strip_padding(buffer)
+
+
+def _encrypt_padded(data: bytes, key_b64: str, iv_b64: str, algorithm: str) -> bytearray:
+    """data を PKCS7 パディングして暗号化する (平文全体のコピーは作らない)"""
+    started = metrics.start()
+    encrypted = get_backend().encrypt_padded(*_decode_key(key_b64, iv_b64, algorithm), data)
+    metrics.record(metrics.ENCRYPT, started, len(data))
+    return encrypted
+
+
+def _decrypt_chunk(encrypted_chunk: bytes, key_b64: str, iv_b64: str, algorithm: str) -> bytearray:
+    """
+    1チャンク分の暗号化データを keys[i], ivs[i] で復号し、パディングを除去して返す
+    """
+    started = metrics.start()
+    decrypted = get_backend().decrypt(*_decode_key(key_b64, iv_b64, algorithm), encrypted_chunk)
+    metrics.record(metrics.DECRYPT, started, len(encrypted_chunk))
+
+    started = metrics.start()
+    plaintext = _unpad_chunk(decrypted)
+    metrics.record(metrics.UNPAD, started, len(decrypted))
+    return plaintext
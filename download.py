@@ -0,0 +1,422 @@
+"""
+Downloading stored files: the /download metadata request, chunk GETs and
+decryption, whole-object (decode2binary), streaming (decode2stream) and
+to-disk (download_to_file) variants, and the /files listing.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from time import perf_counter
+from typing import Iterator, List, Optional, Tuple, Union, cast
+from urllib.parse import urljoin
+
+from . import compression, metrics
+from .cache import DownloadCache
+from .config import DEFAULT_CONFIG
+from .crypto import BLOCK_SIZE, _decrypt_chunk, _new_cipher, _unpad_chunk
+from .exceptions import PaddingError
+from .integrity import _Verifier, _update
+from .metadata import _PAGE_KEYS, queryMetaData
+from .scheduler import _transfer
+from .session import TSFSession, _http, _ssl_verify
+
+
+def _fetch_download_data(
+    file_id: str,
+    jwt_token: str,
+    base_url: str,
+    session: Optional[TSFSession] = None
+) -> dict:
+    """
+    /download/:fileId にアクセスしてメタデータを取得し、urls・keys・ivs の
+    整合性を確認したうえでレスポンスの JSON をそのまま返す
+    (md5 や chunkMd5s など、アップロード時に記録された値も含む)
+    """
+    endpoint = f"{base_url}/download/{file_id}"
+    headers = {
+        "Authorization": f"Bearer {jwt_token}"
+    }
+    started = metrics.start()
+    resp = _http(session).get(endpoint, headers=headers, verify=_ssl_verify(session))
+    resp.raise_for_status()  # ステータスコードが200以外なら例外を投げる
+
+    data = resp.json()
+    metrics.record(metrics.METADATA, started, len(resp.content))
+
+    urls = data.get("urls", [])       # ["https://.../chunk1", "https://.../chunk2", ...]
+    keys = data.get("keys", [])       # ["<Base64Key1>", "<Base64Key2>", ...]
+    ivs  = data.get("ivs", [])        # ["<Base64Iv1>", "<Base64Iv2>", ...]
+
+    # 念のためチェック
+    if not urls:
+        raise ValueError("No 'urls' in response.")
+    if len(urls) != len(keys) or len(urls) != len(ivs):
+        raise ValueError("Mismatch in lengths of urls, keys, and ivs.")
+
+    return data
+
+
+def _fetch_download_info(
+    file_id: str,
+    jwt_token: str,
+    base_url: str,
+    session: Optional[TSFSession] = None
+) -> Tuple[List[str], List[str], List[str], str]:
+    """
+    /download/:fileId にアクセスしてメタデータを取得し、
+    (urls, keys, ivs, algorithm) を返す
+    """
+    data = _fetch_download_data(file_id, jwt_token, base_url, session)
+    return data["urls"], data["keys"], data["ivs"], data.get("algorithm", "aes-256-cbc")
+
+
+def _fetch_chunk(url: str, session: Optional[TSFSession] = None) -> bytes:
+    """暗号化ファイルチャンクをHTTP GETで取得し、暗号文をそのまま返す"""
+    started = metrics.start()
+    chunk_resp = _transfer(session, "GET", url)
+    chunk_resp.raise_for_status()
+    metrics.record(metrics.CHUNK_GET, started, len(chunk_resp.content))
+    return chunk_resp.content
+
+
+def _fetch_and_decrypt_chunk(
+    url: str,
+    key_b64: str,
+    iv_b64: str,
+    algorithm: str,
+    session: Optional[TSFSession] = None
+) -> bytearray:
+    """暗号化ファイルチャンクをHTTP GETで取得し、復号したバイト列を返す"""
+    return _decrypt_chunk(_fetch_chunk(url, session), key_b64, iv_b64, algorithm)
+
+
+def _is_auto(decompress: Union[bool, str, None]) -> bool:
+    return decompress is True or decompress == "auto"
+
+
+def _resolve_decompress(
+    decompress: Union[bool, str, None],
+    file_id: str,
+    jwt_token: str,
+    base_url: str,
+    session: Optional[TSFSession],
+    recorded: Optional[str] = None
+) -> Optional[str]:
+    """
+    decompress 指定からコーデック名を決める。"auto" (または True) の場合は
+    recorded (/download のレスポンスやキャッシュに記録されたコーデック、"" は非圧縮) を使い、
+    それが無いときだけアップロード時に記録されたメタデータを検索する。記録が無ければ None を返す
+    """
+    if not decompress:
+        return None
+    if _is_auto(decompress):
+        if recorded is not None:
+            return recorded or None
+        query = {"type": compression.METADATA_TYPE, "fileId": str(file_id)}
+        response = queryMetaData(jwt_token, query, base_url.rstrip("/"), session=session)
+        response.raise_for_status()
+        records = response.json()
+        if isinstance(records, dict):
+            records = next((records[key] for key in _PAGE_KEYS if key in records), [])
+        return records[-1].get("codec") if records else None
+    if decompress not in compression.CODECS:
+        raise ValueError(f"Unsupported compression codec: {decompress!r}")
+    return decompress
+
+
+def decode2binary(
+    file_id: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    max_workers: int = 1,
+    session: Optional[TSFSession] = None,
+    cache: Optional[DownloadCache] = None,
+    decompress: Union[bool, str, None] = None,
+    verify: bool = False
+) -> bytes:
+    """
+    1. /download/:fileId にアクセスしてメタデータを取得
+    2. 返ってきた JSON から urls, keys, ivs, algorithm を取り出す
+    3. 各 url で暗号化されたファイルチャンクを GET
+    4. 対応する keys[i], ivs[i] で復号
+    5. 復号したチャンクを連結し、最終的なバイナリを返す
+
+    max_workers が 2 以上の場合は、最大 max_workers 個のスレッドで
+    チャンクの取得と復号を並列に行う。結果はチャンク順に連結されるため、
+    出力は逐次モードとバイト単位で同一になる。
+
+    session に TSFSession を渡すと、全リクエストがその接続プールを再利用する。
+    並列モードでは pool_maxsize を max_workers 以上にしておくこと。
+
+    cache に DownloadCache を渡すと、キャッシュ済みの file_id はネットワークに
+    アクセスせずに返し、新たに取得した内容はキャッシュに保存する。
+
+    decompress に "zlib" / "zstd" を渡すと復号後に展開する。"auto" の場合は
+    アップロード時にコーデックが記録されているときだけ展開する。コーデックは
+    /download のレスポンスにあればそれを使い、無ければ圧縮メタデータを検索する。
+    既定の None では展開しない (追加のリクエストも送らない)。
+    キャッシュには展開前のデータがコーデックと一緒に保存されるため、
+    キャッシュから返すときにコーデックを問い合わせ直すことはない。
+
+    verify=True の場合は、復号した各チャンクをアップロード時に記録された
+    MD5 (チャンクごとの chunkMd5s、無ければファイル全体の md5) と照合する。
+    壊れたチャンクはそれだけを 1 度取得し直し、それでも一致しなければ
+    IntegrityError を送出する。キャッシュには検証を通った内容だけが保存され、
+    キャッシュから返す内容は再検証しない。
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    if cache is not None:
+        entry = cache.get_entry(str(file_id))
+        if entry is not None:
+            cached, recorded = entry
+            codec = _resolve_decompress(decompress, file_id, jwt_token, base_url, session, recorded)
+            return compression.decompress(cached, codec) if codec else cached
+
+    # 1. ファイル情報メタデータを取得
+    info = _fetch_download_data(file_id, jwt_token, base_url, session)
+    recorded = info.get(compression.DOWNLOAD_FIELD)
+    codec = _resolve_decompress(decompress, file_id, jwt_token, base_url, session, recorded)
+    urls, keys, ivs = info["urls"], info["keys"], info["ivs"]
+    algorithm = info.get("algorithm", "aes-256-cbc")
+    verifier = _Verifier(file_id, info, len(urls), codec) if verify else None
+
+    def load(i: int) -> bytearray:
+        fetch = partial(_fetch_and_decrypt_chunk, urls[i], keys[i], ivs[i], algorithm, session)
+        return verifier.fetch_verified(i, fetch) if verifier is not None else fetch()
+
+    # 2. 復号済みチャンクをインデックス順に格納するスロット
+    #    (bytes の += による二乗オーダーのコピーを避け、最後に一度だけ連結する)
+    decrypted_chunks: List[Optional[bytearray]] = [None] * len(urls)
+    # 3. 各チャンクを取得して復号 → 対応するスロットに格納
+    #    (ファイル全体の MD5 は、揃ったチャンクから順に取得と並行して計算する)
+    if max_workers == 1 or len(urls) == 1:
+        for i in range(len(urls)):
+            decrypted_chunks[i] = load(i)
+            if verifier is not None and not codec:
+                verifier.feed(i, decrypted_chunks[i])
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            futures = {executor.submit(load, i): i for i in range(len(urls))}
+            for future in as_completed(futures):
+                i = futures[future]
+                decrypted_chunks[i] = future.result()
+                if verifier is not None and not codec:
+                    verifier.feed(i, decrypted_chunks[i])
+
+    # 4. 連結した結果をリターン (join は合計サイズのバッファを一度だけ確保する)
+    decrypted_data = b"".join(cast(List[bytearray], decrypted_chunks))
+    result = compression.decompress(decrypted_data, codec) if codec else decrypted_data
+    if verifier is not None:
+        if codec:
+            # 記録されている md5 は圧縮前の元データのもの
+            verifier.update(result)
+        verifier.finish()
+    if cache is not None:
+        # "auto" で解決したコーデックは確定しているので、非圧縮も "" として残す
+        cache.put(str(file_id), decrypted_data, (codec or "") if _is_auto(decompress) else recorded)
+    return result
+
+
+def _iter_decrypted_chunk(
+    url: str,
+    key_b64: str,
+    iv_b64: str,
+    algorithm: str,
+    buffer_size: int,
+    session: Optional[TSFSession] = None
+) -> Iterator[bytes]:
+    """
+    1チャンクを stream=True で少しずつ読み込み、CBC 復号した平文ブロックを順に返す。
+    パディングは最後のブロックにしか存在しないため、常に末尾 1 ブロックを保留し、
+    チャンクの終端でだけ unpad する。
+    """
+    cipher = _new_cipher(key_b64, iv_b64, algorithm)
+    block = BLOCK_SIZE
+    pending = b""   # 復号待ちの端数 (ブロック境界に満たない暗号文)
+    held = b""      # 復号済みだが、パディングの可能性があるため保留中の末尾ブロック
+    # 計測が有効な場合のみ、受信時間と復号時間を分けて集計する
+    # (yield 先の処理時間は含めない)
+    timing = metrics.start()
+    network_seconds = decrypt_seconds = 0.0
+    received = 0
+
+    with _transfer(session, "GET", url, stream=True) as chunk_resp:
+        chunk_resp.raise_for_status()
+        for piece in chunk_resp.iter_content(chunk_size=buffer_size):
+            if timing:
+                now = perf_counter()
+                network_seconds += now - timing
+                received += len(piece)
+            if pending:
+                piece = pending + piece
+            aligned = len(piece) - len(piece) % block
+            pending = piece[aligned:]
+            if not aligned:
+                timing = metrics.start()
+                continue
+            plain = held + cipher.decrypt(piece[:aligned])
+            if timing:
+                decrypt_seconds += perf_counter() - now
+            held = plain[-block:]
+            if len(plain) > block:
+                yield plain[:-block]
+            timing = metrics.start()
+
+    if timing:
+        metrics.emit(metrics.CHUNK_GET, network_seconds + perf_counter() - timing, received)
+        metrics.emit(metrics.DECRYPT, decrypt_seconds, received)
+    if pending or not held:
+        raise PaddingError("Padding error. Possibly incorrect key/IV or corrupted data.")
+    started = metrics.start()
+    tail = _unpad_chunk(held)
+    metrics.record(metrics.UNPAD, started, len(held))
+    if tail:
+        yield bytes(tail)
+
+
+def _iter_verified_chunk(
+    index: int,
+    url: str,
+    key_b64: str,
+    iv_b64: str,
+    algorithm: str,
+    buffer_size: int,
+    session: Optional[TSFSession],
+    verifier: _Verifier
+) -> Iterator[bytes]:
+    """
+    _iter_decrypted_chunk の出力をそのまま返しながらチャンクの MD5 を計算し、
+    チャンクの終端で記録値と照合する
+    """
+    md5_hash = verifier.chunk_hash()
+    try:
+        for block in _iter_decrypted_chunk(url, key_b64, iv_b64, algorithm, buffer_size, session):
+            if md5_hash is not None:
+                _update(md5_hash, block)
+            yield block
+    except PaddingError as e:
+        raise verifier.decrypt_failure(index, e) from e
+    if md5_hash is not None:
+        verifier.check_digest(index, md5_hash.hexdigest())
+
+
+def decode2stream(
+    file_id: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"],
+    session: Optional[TSFSession] = None,
+    decompress: Union[bool, str, None] = None,
+    verify: bool = False
+) -> Iterator[bytes]:
+    """
+    decode2binary のストリーミング版。復号済みの平文ブロックを順に yield する。
+
+    各チャンクは stream=True で buffer_size バイトずつ読み込まれ、逐次復号されるため、
+    ファイルサイズに関係なくメモリ使用量はおおよそ buffer_size に比例する。
+    連結した出力は decode2binary の戻り値と同一になる。
+    decompress は decode2binary と同じ。指定した場合は、復号したブロックを
+    逐次展開して yield する。
+
+    verify=True の場合は decode2binary と同じ MD5 を流しながら計算し、
+    各チャンクの終端 (チャンクごとの MD5 が無いファイルは最後) で照合する。
+    壊れたチャンクのブロックは照合前に yield 済みのため、取得し直さずに
+    そのチャンクを示す IntegrityError を送出する。
+    """
+    if buffer_size < BLOCK_SIZE:
+        raise ValueError(f"buffer_size must be at least {BLOCK_SIZE} bytes")
+
+    info = _fetch_download_data(file_id, jwt_token, base_url, session)
+    codec = _resolve_decompress(
+        decompress, file_id, jwt_token, base_url, session, info.get(compression.DOWNLOAD_FIELD)
+    )
+    urls, keys, ivs = info["urls"], info["keys"], info["ivs"]
+    algorithm = info.get("algorithm", "aes-256-cbc")
+
+    if not verify:
+        blocks = (
+            block
+            for i, url in enumerate(urls)
+            for block in _iter_decrypted_chunk(url, keys[i], ivs[i], algorithm, buffer_size, session)
+        )
+        if codec:
+            yield from compression.iter_decompressed(blocks, codec)
+        else:
+            yield from blocks
+        return
+
+    verifier = _Verifier(file_id, info, len(urls), codec)
+    blocks = (
+        block
+        for i, url in enumerate(urls)
+        for block in _iter_verified_chunk(i, url, keys[i], ivs[i], algorithm, buffer_size, session, verifier)
+    )
+    for block in compression.iter_decompressed(blocks, codec) if codec else blocks:
+        verifier.update(block)
+        yield block
+    verifier.finish()
+
+
+def download_to_file(
+    file_id: str,
+    path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"],
+    session: Optional[TSFSession] = None,
+    decompress: Union[bool, str, None] = None,
+    verify: bool = False
+) -> int:
+    """
+    Download and decrypt a file straight to disk with bounded memory.
+
+    The plaintext is written to a temporary file next to ``path`` and moved into
+    place only once every chunk has been decrypted, so a failed download never
+    leaves a truncated file behind.
+
+    Args:
+        file_id: ID of the file to download
+        path: Destination path
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        buffer_size: Number of bytes read from the network per step
+        session: Optional pooled session to send the requests through
+        decompress: Codec name, or "auto" to use the one recorded at upload
+            (default: None, no decompression)
+        verify: Check the data against the MD5s recorded at upload, as
+            decode2stream does; on a mismatch IntegrityError is raised and
+            ``path`` is left untouched
+
+    Returns:
+        Number of plaintext bytes written
+    """
+    tmp_path = f"{path}.part"
+    written = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in decode2stream(file_id, jwt_token, base_url, buffer_size, session, decompress, verify):
+                f.write(block)
+                written += len(block)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+
+def list_files(
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    session: Optional[TSFSession] = None
+) -> List[dict]:
+    """Return the entries of the server's /files listing (fileId/id, originalPath, md5, ...)."""
+    headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    response = _http(session).get(urljoin(base_url, "files"), headers=headers, verify=_ssl_verify(session))
+    response.raise_for_status()
+    result = response.json()
+    return result.get("files", []) if isinstance(result, dict) else result
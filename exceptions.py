@@ -0,0 +1,48 @@
+from typing import Optional
+
+
+class TSFError(Exception):
+    """Base class for errors raised by the TSF client."""
+
+
+class AuthenticationError(TSFError):
+    """Login failed or the server rejected the token."""
+
+
+class UploadError(TSFError):
+    """An upload request was rejected or could not be completed."""
+
+
+class DownloadError(TSFError):
+    """A download request was rejected or could not be completed."""
+
+
+class PaddingError(ValueError):
+    """A decrypted chunk did not end in valid PKCS7 padding (wrong key/IV or corrupt ciphertext)."""
+
+
+class CircuitOpenError(TSFError):
+    """Requests to a host are suspended after repeated failures."""
+
+
+class IntegrityError(DownloadError):
+    """
+    Downloaded data did not match the digest recorded at upload.
+
+    ``chunk_index`` names the corrupt chunk, or is None when only the
+    whole-file MD5 was available to check against.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        file_id: Optional[str] = None,
+        chunk_index: Optional[int] = None,
+        expected: Optional[str] = None,
+        actual: Optional[str] = None
+    ) -> None:
+        super().__init__(message)
+        self.file_id = file_id
+        self.chunk_index = chunk_index
+        self.expected = expected
+        self.actual = actual
@@ -0,0 +1,141 @@
+"""
+End-to-end integrity checks for downloads.
+
+/upload/signed stores the MD5 of the original data, and chunked uploads also
+send ``chunkMd5s``: the MD5 of each part's plaintext as it was encrypted.
+Both come back in the /download response. With verification on, every
+decrypted chunk is hashed as it comes out of decryption and compared with its
+digest, so a mismatch names the corrupt chunk and only that chunk has to be
+fetched again. When every chunk has a digest the whole-file MD5 adds nothing
+and is skipped, so the data is hashed once either way.
+
+Files stored without per-chunk digests are checked against the whole-file MD5
+instead, fed in order while the chunks are produced. A mismatch there can only
+be pinned to a chunk when the file has just one; a chunk whose padding does
+not decrypt is always reported by index.
+"""
+
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from . import metrics
+from .exceptions import IntegrityError, PaddingError
+
+logger = logging.getLogger(__name__)
+
+# /upload/signed と /download で使うチャンクごとの MD5 のフィールド名
+CHUNK_DIGESTS_FIELD = "chunkMd5s"
+
+# 検証に失敗したチャンクを取得し直す回数
+REFETCH_ATTEMPTS = 1
+
+
+def _update(md5_hash: Any, data: Any) -> None:
+    started = metrics.start()
+    md5_hash.update(data)
+    metrics.record(metrics.MD5, started, len(data))
+
+
+class _Verifier:
+    """Digests recorded for one file and the running whole-file MD5."""
+
+    def __init__(self, file_id: Any, info: Dict[str, Any], chunk_count: int, codec: Optional[str]) -> None:
+        self.file_id = file_id
+        self.chunk_count = chunk_count
+        self.chunk_md5s: Optional[List[str]] = None
+        self.md5: Optional[str] = None
+
+        digests = info.get(CHUNK_DIGESTS_FIELD)
+        md5 = info.get("md5")
+        if isinstance(digests, list) and len(digests) == chunk_count:
+            self.chunk_md5s = [str(d).lower() for d in digests]
+        elif md5 and chunk_count == 1 and not codec:
+            # 非圧縮の 1 チャンクのファイルでは、ファイル全体の MD5 がそのままチャンクの MD5
+            self.chunk_md5s = [str(md5).lower()]
+        elif md5:
+            self.md5 = str(md5).lower()
+        else:
+            logger.warning(f"File {file_id} has no stored md5; skipping integrity verification")
+
+        self._whole = hashlib.md5() if self.md5 else None
+        self._pending: Dict[int, Any] = {}
+        self._next_index = 0
+
+    @property
+    def whole_file(self) -> bool:
+        """True if the file is checked through the whole-file MD5 (no per-chunk digests)."""
+        return self._whole is not None
+
+    # --- per-chunk -------------------------------------------------------
+
+    def chunk_hash(self) -> Optional[Any]:
+        """A fresh MD5 object for streaming one chunk, or None if chunks have no digests."""
+        return hashlib.md5() if self.chunk_md5s is not None else None
+
+    def check_digest(self, index: int, actual: str) -> None:
+        if self.chunk_md5s is None:
+            return
+        expected = self.chunk_md5s[index]
+        if actual != expected:
+            raise IntegrityError(
+                f"Chunk {index} of file {self.file_id} is corrupt: md5 {actual}, expected {expected}",
+                self.file_id, index, expected, actual,
+            )
+
+    def check_chunk(self, index: int, plaintext: Any) -> None:
+        md5_hash = self.chunk_hash()
+        if md5_hash is not None:
+            _update(md5_hash, plaintext)
+            self.check_digest(index, md5_hash.hexdigest())
+
+    def decrypt_failure(self, index: int, error: PaddingError) -> IntegrityError:
+        """Turn a padding error for chunk ``index`` into an IntegrityError naming it."""
+        return IntegrityError(f"Chunk {index} of file {self.file_id} is corrupt: {error}", self.file_id, index)
+
+    def fetch_verified(self, index: int, fetch: Callable[[], Any]) -> Any:
+        """
+        fetch() で取得・復号したチャンクを検証して返す。
+        壊れていれば REFETCH_ATTEMPTS 回までそのチャンクだけ取得し直す
+        """
+        for attempt in range(REFETCH_ATTEMPTS + 1):
+            try:
+                plaintext = fetch()
+                self.check_chunk(index, plaintext)
+                return plaintext
+            except PaddingError as e:
+                # それ以外の ValueError (鍵の形式・アルゴリズムなど) は取得し直しても直らない
+                error = self.decrypt_failure(index, e)
+            except IntegrityError as e:
+                error = e
+            if attempt < REFETCH_ATTEMPTS:
+                logger.warning(f"{error}; fetching it again")
+        raise error
+
+    # --- whole file ------------------------------------------------------
+
+    def update(self, data: Any) -> None:
+        """Feed the next bytes of the output, in order, to the whole-file MD5."""
+        if self._whole is not None:
+            _update(self._whole, data)
+
+    def feed(self, index: int, plaintext: Any) -> None:
+        """Like update(), for chunks that arrive out of order; hashes each once its predecessors have."""
+        if self._whole is None:
+            return
+        self._pending[index] = plaintext
+        while self._next_index in self._pending:
+            self.update(self._pending.pop(self._next_index))
+            self._next_index += 1
+
+    def finish(self) -> None:
+        """Compare the whole-file MD5 once all of the output has been fed."""
+        if self._whole is None:
+            return
+        actual = self._whole.hexdigest()
+        if actual != self.md5:
+            index = 0 if self.chunk_count == 1 else None
+            raise IntegrityError(
+                f"File {self.file_id} is corrupt: md5 {actual}, expected {self.md5}",
+                self.file_id, index, self.md5, actual,
+            )
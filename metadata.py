@@ -0,0 +1,308 @@
+"""
+Metadata records: single writes and queries, paged queries and bulk writes.
+
+putMetaData and queryMetaData send one /metadata or /metadata/query request.
+iter_metadata walks a /metadata/query result set one page at a time so
+neither the server response nor the client ever holds it whole.
+put_metadata_many packs records into size-bounded /metadata/bulk requests
+and keeps a few of them in flight at once. MetadataQueryCache memoizes
+queryMetaData responses for a TSFSession.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import requests
+
+from .cache import CacheStats
+from .exceptions import TSFError
+from .session import TSFSession, _http, _ssl_verify
+
+# Keys under which a paged /metadata/query response may carry its records
+_PAGE_KEYS = ("results", "records", "data", "items")
+
+
+def putMetaData(
+    jwt_token: str,
+    base_url: str,
+    metadata: dict,
+    session: Optional[TSFSession] = None
+) -> requests.Response:
+    """Store metadata associated with a file or record"""
+    headers = {"Authorization": f"Bearer {jwt_token}"}
+    
+    response = _http(session).post(f"{base_url}/metadata", json=metadata, headers=headers, verify=_ssl_verify(session))
+    if session is not None and session.metadata_cache is not None:
+        session.metadata_cache.invalidate()
+    return response
+
+
+def queryMetaData(
+    jwt_token: str,
+    query: dict,
+    base_url: str,
+    select: Optional[dict] = None,
+    session: Optional[TSFSession] = None
+) -> requests.Response:
+    """
+    Query metadata records with filtering
+
+    If ``session`` has a MetadataQueryCache, a cached response for the same
+    query and select is returned without a round trip.
+    """
+    cache = session.metadata_cache if session is not None else None
+    if cache is not None:
+        cache_key = cache.make_key(base_url, query, select)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    headers = {"Authorization": f"Bearer {jwt_token}"}
+    payload = {"query": query}
+    if select:
+        payload["select"] = select
+    
+    response = _http(session).post(f"{base_url}/metadata/query", json=payload, headers=headers, verify=_ssl_verify(session))
+    if cache is not None and response.status_code == 200:
+        cache.put(cache_key, response)
+    return response
+
+
+def iter_metadata(
+    jwt_token: str,
+    query: dict,
+    base_url: str,
+    select: Optional[dict] = None,
+    page_size: int = 1000,
+    session: Optional[TSFSession] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield metadata records matching ``query`` one page at a time.
+
+    Each request adds ``limit`` and, after the first page, ``cursor`` to the
+    /metadata/query payload. A page is parsed on its own and its records are
+    yielded before the next page is requested. Paging continues while the
+    response is an object carrying a ``nextCursor``; a server that ignores
+    ``limit`` and answers with a plain list is treated as a single page.
+
+    Args:
+        jwt_token: JWT token for authentication
+        query: Filter passed to /metadata/query
+        base_url: Server base URL
+        select: Optional projection passed to /metadata/query
+        page_size: Records requested per page
+        session: Optional pooled session to send the requests through
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+
+    headers = {"Authorization": f"Bearer {jwt_token}"}
+    cursor: Optional[str] = None
+    while True:
+        payload: Dict[str, Any] = {"query": query, "limit": page_size}
+        if select:
+            payload["select"] = select
+        if cursor is not None:
+            payload["cursor"] = cursor
+
+        response = _http(session).post(f"{base_url}/metadata/query", json=payload, headers=headers, verify=_ssl_verify(session))
+        response.raise_for_status()
+        page = response.json()
+        response.close()
+
+        if isinstance(page, list):
+            yield from page
+            return
+        if "error" in page:
+            raise TSFError(f"Metadata query failed: {page['error']}")
+
+        records: List[Dict[str, Any]] = next((page[key] for key in _PAGE_KEYS if key in page), [])
+        yield from records
+        cursor = page.get("nextCursor")
+        if not cursor or not records:
+            return
+
+
+class MetadataQueryCache:
+    """
+    In-process TTL + LRU cache for queryMetaData responses.
+
+    Attach it to a session with ``TSFSession(metadata_cache=...)``. Queries
+    sent through that session are keyed by base URL plus a canonical JSON form
+    of ``query`` and ``select`` (key order does not matter), and successful
+    responses are reused until ``ttl`` seconds have passed. Any metadata write
+    through the same session (putMetaData, put_metadata_many) clears the cache,
+    since a write can change the result of any query. Only use one cache per
+    account: the token is not part of the key.
+
+    Args:
+        ttl: Seconds an entry stays valid
+        max_entries: Entries kept before the least recently used is evicted
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024) -> None:
+        if ttl <= 0 or max_entries < 1:
+            raise ValueError("ttl must be positive and max_entries at least 1")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._stats = CacheStats()
+
+    @staticmethod
+    def make_key(base_url: str, query: dict, select: Optional[dict] = None) -> str:
+        return json.dumps(
+            [base_url.rstrip("/"), query, select or None],
+            sort_keys=True, separators=(",", ":"), default=str,
+        )
+
+    def get(self, key: str) -> Any:
+        """Return the cached response for ``key``, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._stats.misses += 1
+            return None
+
+    def put(self, key: str, response: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drop every entry; called after writes through the owning session."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=len(self._entries),
+                bytes=sum(len(r.content) for _, r in self._entries.values()),
+            )
+
+
+@dataclass
+class BulkWriteResult:
+    """Summary of put_metadata_many."""
+
+    written: int = 0
+    batches: int = 0
+    failed: List[Tuple[List[Dict[str, Any]], BaseException]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def _batches(records: Iterable[Dict[str, Any]], batch_size: int, max_batch_bytes: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group records into batches bounded by count and by encoded JSON size."""
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for record in records:
+        size = len(json.dumps(record, separators=(",", ":"))) + 1
+        if batch and (len(batch) >= batch_size or batch_bytes + size > max_batch_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(record)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def _post_batch(
+    batch: List[Dict[str, Any]],
+    jwt_token: str,
+    base_url: str,
+    session: Optional[TSFSession],
+    bulk_supported: List[bool]
+) -> int:
+    if bulk_supported[0]:
+        headers = {"Authorization": f"Bearer {jwt_token}"}
+        response = _http(session).post(
+            f"{base_url}/metadata/bulk", json={"records": batch}, headers=headers, verify=_ssl_verify(session)
+        )
+        if session is not None and session.metadata_cache is not None:
+            session.metadata_cache.invalidate()
+        if response.status_code not in (404, 405):
+            response.raise_for_status()
+            return len(batch)
+        # バルクAPIが無いサーバーでは1件ずつの書き込みに切り替える
+        bulk_supported[0] = False
+    for record in batch:
+        putMetaData(jwt_token, base_url, record, session=session).raise_for_status()
+    return len(batch)
+
+
+def put_metadata_many(
+    jwt_token: str,
+    base_url: str,
+    records: Iterable[Dict[str, Any]],
+    batch_size: int = 500,
+    max_batch_bytes: int = 1024 * 1024,
+    max_workers: int = 4,
+    session: Optional[TSFSession] = None
+) -> BulkWriteResult:
+    """
+    Write many metadata records with few round trips.
+
+    Records are consumed lazily and grouped into batches of at most
+    ``batch_size`` records and ``max_batch_bytes`` of JSON, each sent as one
+    POST /metadata/bulk ``{"records": [...]}``. Up to ``max_workers`` batches
+    are in flight at once. If the server has no bulk endpoint (404/405), the
+    remaining records fall back to one putMetaData call each, still spread
+    over the workers. A failed batch is reported in the result instead of
+    aborting the rest.
+
+    Args:
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        records: Iterable of metadata dicts
+        batch_size: Maximum records per request
+        max_batch_bytes: Maximum encoded JSON bytes per request
+        max_workers: Number of concurrent requests
+        session: Optional pooled session to send the requests through
+    """
+    if batch_size < 1 or max_workers < 1:
+        raise ValueError("batch_size and max_workers must be at least 1")
+
+    result = BulkWriteResult()
+    bulk_supported = [True]
+    pending: Dict[Future, List[Dict[str, Any]]] = {}
+
+    def collect(done: Set[Future]) -> None:
+        for future in done:
+            batch = pending.pop(future)
+            try:
+                result.written += future.result()
+            except Exception as e:
+                result.failed.append((batch, e))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch in _batches(records, batch_size, max_batch_bytes):
+            # 未完了のリクエスト数を制限して、入力全体をメモリに載せないようにする
+            if len(pending) >= max_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[executor.submit(_post_batch, batch, jwt_token, base_url, session, bulk_supported)] = batch
+            result.batches += 1
+        collect(set(wait(pending).done))
+
+    return result
@@ -0,0 +1,152 @@
+"""
+Per-phase timing hooks for transfers.
+
+The transfer functions report how long each phase took, and how many bytes it
+handled, to a single process-wide sink registered with set_metrics_sink().
+With no sink registered every hook is one global lookup and a comparison, so
+the instrumentation can stay compiled in and switched on only when needed.
+
+Usage::
+
+    from pytsfiler.metrics import PhaseAggregator, set_metrics_sink
+
+    aggregator = PhaseAggregator()
+    set_metrics_sink(aggregator)
+    decode2binary(file_id, token)
+    print(aggregator.summary())
+"""
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# sink(phase, seconds, nbytes)
+MetricsSink = Callable[[str, float, int], None]
+
+# Phase names
+METADATA = "metadata"        # GET /download/:fileId
+CHUNK_GET = "chunk_get"      # network time of one chunk GET
+DECRYPT = "decrypt"
+UNPAD = "unpad"
+MD5 = "md5"
+SIGNED_URL = "signed_url"    # POST /upload/signed
+ENCRYPT = "encrypt"
+SIGNED_PUT = "signed_put"
+CONFIRM = "confirm"          # POST /upload/signed/confirm
+
+_sink: Optional[MetricsSink] = None
+
+
+def set_metrics_sink(sink: Optional[MetricsSink]) -> Optional[MetricsSink]:
+    """Register ``sink`` (or None to disable) and return the previous one."""
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def get_metrics_sink() -> Optional[MetricsSink]:
+    return _sink
+
+
+def start() -> float:
+    """Start timing a phase; returns 0.0 when no sink is registered."""
+    return perf_counter() if _sink is not None else 0.0
+
+
+def record(phase: str, started: float, nbytes: int = 0) -> None:
+    """Report the time since ``started`` for ``phase``; no-op when disabled."""
+    sink = _sink
+    if sink is not None and started:
+        sink(phase, perf_counter() - started, nbytes)
+
+
+def emit(phase: str, seconds: float, nbytes: int = 0) -> None:
+    """Report an already measured duration for ``phase``; no-op when disabled."""
+    sink = _sink
+    if sink is not None:
+        sink(phase, seconds, nbytes)
+
+
+# Histogram bucket upper bounds in seconds: 100us .. ~105s, doubling
+_BOUNDS: Tuple[float, ...] = tuple(0.0001 * 2 ** i for i in range(21))
+
+
+@dataclass
+class PhaseStats:
+    """Aggregated durations for one phase."""
+
+    count: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+    max_seconds: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(_BOUNDS) + 1))
+
+    @property
+    def mean(self) -> float:
+        return self.seconds / self.count if self.count else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second spent in this phase."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the histogram bucket holding the ``pct`` percentile."""
+        if not self.count:
+            return 0.0
+        target = pct / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return _BOUNDS[index] if index < len(_BOUNDS) else self.max_seconds
+        return self.max_seconds
+
+
+class PhaseAggregator:
+    """
+    Thread-safe metrics sink that keeps a duration histogram per phase.
+
+    Register an instance with set_metrics_sink(); read ``phases`` or call
+    summary() for a table of counts, totals, throughput and p50/p99.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._phases: Dict[str, PhaseStats] = {}
+
+    def __call__(self, phase: str, seconds: float, nbytes: int) -> None:
+        index = bisect.bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            stats = self._phases.get(phase)
+            if stats is None:
+                stats = self._phases[phase] = PhaseStats()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.bytes += nbytes
+            stats.buckets[index] += 1
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+
+    @property
+    def phases(self) -> Dict[str, PhaseStats]:
+        with self._lock:
+            return {
+                name: PhaseStats(s.count, s.seconds, s.bytes, s.max_seconds, list(s.buckets))
+                for name, s in self._phases.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases.clear()
+
+    def summary(self) -> str:
+        lines = [f"{'phase':<12}{'count':>8}{'total s':>10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'MB/s':>10}"]
+        for name, s in sorted(self.phases.items()):
+            lines.append(
+                f"{name:<12}{s.count:>8}{s.seconds:>10.3f}{s.mean * 1000:>10.2f}"
+                f"{s.percentile(50) * 1000:>10.2f}{s.percentile(99) * 1000:>10.2f}{s.throughput / 1e6:>10.1f}"
+            )
+        return "\n".join(lines)
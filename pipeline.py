@@ -0,0 +1,289 @@
+"""
+Pipelined download engine.
+
+decode2binary with max_workers threads runs fetch and decrypt back to back on
+each worker, so a worker's connection is idle while it decrypts and its CPU is
+idle while it waits on the GET. Here the two are separate stages:
+
+    fetch threads --(bounded queue)--> decrypt workers --(bounded queue)--> ordered output
+
+Fetch threads keep the network busy while decrypt workers drain their queue,
+so throughput approaches max(network, decrypt) rather than their sum. Decrypt
+workers are threads; chunks of at least ``process_min_size`` bytes are handed
+to a process pool instead, which gets past the GIL when the crypto backend
+holds it while decrypting. A window of ``max_buffered_chunks`` bounds how far
+fetching may run ahead of the consumer, so memory stays at about that many
+chunks however slowly the output is consumed.
+
+With ``verify=True`` the decrypt workers also check each chunk against the
+MD5 recorded at upload (see integrity). A corrupt chunk has not been output
+yet, so the worker fetches that chunk again before passing it on.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from . import compression, metrics
+from .crypto import _decrypt_chunk
+from .download import _fetch_chunk, _fetch_download_data, _resolve_decompress
+from .integrity import _Verifier
+from .session import TSFSession
+
+# Seconds between checks of the stop flag while a stage is blocked
+_POLL = 0.1
+
+
+class _Pipeline:
+    """Stage threads and queues for one download."""
+
+    def __init__(
+        self,
+        urls: List[str],
+        keys: List[str],
+        ivs: List[str],
+        algorithm: str,
+        fetch_workers: int,
+        decrypt_workers: int,
+        max_buffered_chunks: int,
+        process_min_size: Optional[int],
+        process_pool: Optional[Executor],
+        session: Optional[TSFSession],
+        verifier: Optional[_Verifier] = None,
+    ) -> None:
+        self.urls, self.keys, self.ivs, self.algorithm = urls, keys, ivs, algorithm
+        self.verifier = verifier
+        self.fetch_workers = min(fetch_workers, len(urls))
+        self.decrypt_workers = min(decrypt_workers, len(urls))
+        self.process_min_size = process_min_size
+        self.process_pool = process_pool
+        self.session = session
+
+        self._stop = threading.Event()
+        # 出力済みでないチャンク数の上限 (取得中・復号待ち・並べ替え待ちを含む)
+        self._window = threading.Semaphore(max_buffered_chunks)
+        self._lock = threading.Lock()
+        self._next_index = 0
+        self._active_fetchers = self.fetch_workers
+        self._fetched: "queue.Queue[Optional[Tuple[int, bytes]]]" = queue.Queue(maxsize=self.decrypt_workers * 2)
+        self._decrypted: "queue.Queue[Tuple[int, Any, Optional[BaseException]]]" = queue.Queue(
+            maxsize=max_buffered_chunks
+        )
+        self._threads: List[threading.Thread] = []
+
+    def _put(self, q: "queue.Queue[Any]", item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, error: BaseException) -> None:
+        self._put(self._decrypted, (-1, None, error))
+        self._stop.set()
+
+    def _fetch_loop(self) -> None:
+        try:
+            while not self._stop.is_set():
+                if not self._window.acquire(timeout=_POLL):
+                    continue
+                with self._lock:
+                    index = self._next_index
+                    self._next_index += 1
+                if index >= len(self.urls):
+                    self._window.release()
+                    return
+                if not self._put(self._fetched, (index, _fetch_chunk(self.urls[index], self.session))):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._active_fetchers -= 1
+                last = self._active_fetchers == 0
+            if last:
+                for _ in range(self.decrypt_workers):
+                    self._put(self._fetched, None)
+
+    def _decrypt(self, index: int, data: bytes) -> Any:
+        if self.process_pool is not None and len(data) >= (self.process_min_size or 0):
+            # 子プロセス内の計測は親のシンクに届かないため、待ち時間ごと親で記録する
+            started = metrics.start()
+            future = self.process_pool.submit(_decrypt_chunk, data, self.keys[index], self.ivs[index], self.algorithm)
+            plaintext = future.result()
+            metrics.record(metrics.DECRYPT, started, len(data))
+            return plaintext
+        return _decrypt_chunk(data, self.keys[index], self.ivs[index], self.algorithm)
+
+    def _decrypt_verified(self, index: int, data: bytes) -> Any:
+        if self.verifier is None:
+            return self._decrypt(index, data)
+        fetched = [data]
+
+        def fetch() -> Any:
+            # 1 回目は取得済みの暗号文を使い、取り直しのときだけ GET する
+            ciphertext = fetched.pop() if fetched else _fetch_chunk(self.urls[index], self.session)
+            return self._decrypt(index, ciphertext)
+
+        return self.verifier.fetch_verified(index, fetch)
+
+    def _decrypt_loop(self) -> None:
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._fetched.get(timeout=_POLL)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    return
+                index, data = item
+                if not self._put(self._decrypted, (index, self._decrypt_verified(index, data), None)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self) -> Iterator[Any]:
+        """Start the stages and yield decrypted chunks in index order."""
+        for target, count in ((self._fetch_loop, self.fetch_workers), (self._decrypt_loop, self.decrypt_workers)):
+            for _ in range(count):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+        reorder = {}
+        try:
+            for wanted in range(len(self.urls)):
+                while wanted not in reorder:
+                    index, plaintext, error = self._decrypted.get()
+                    if error is not None:
+                        raise error
+                    reorder[index] = plaintext
+                plaintext = reorder.pop(wanted)
+                self._window.release()
+                yield plaintext
+        finally:
+            self._stop.set()
+            for thread in self._threads:
+                thread.join()
+
+
+def iter_pipelined(
+    file_id: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    fetch_workers: int = 4,
+    decrypt_workers: int = 2,
+    max_buffered_chunks: Optional[int] = None,
+    process_min_size: Optional[int] = None,
+    process_pool: Optional[Executor] = None,
+    session: Optional[TSFSession] = None,
+    decompress: Union[bool, str, None] = None,
+    verify: bool = False
+) -> Iterator[bytes]:
+    """
+    Download a file through the fetch / decrypt / ordered-output pipeline.
+
+    Yields the plaintext one chunk at a time, in order; the concatenation is
+    identical to decode2binary's result. Stop iterating (or close the
+    generator) to cancel: the stage threads are stopped and joined.
+
+    Args:
+        file_id: ID of the file to download
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        fetch_workers: Concurrent chunk GETs
+        decrypt_workers: Threads decrypting and unpadding fetched chunks
+        max_buffered_chunks: Chunks allowed between fetch and output
+            (default: fetch_workers + decrypt_workers + 2); memory use is
+            about this many chunks
+        process_min_size: Decrypt chunks of at least this many ciphertext
+            bytes in a process pool. A pool of decrypt_workers processes is
+            created for the download unless ``process_pool`` is given.
+        process_pool: Existing executor to use for process decryption (with
+            process_min_size unset, every chunk goes to it)
+        session: Optional pooled session; its pool_maxsize should be at least
+            fetch_workers
+        decompress: Codec name, or "auto" to use the one recorded at upload
+            (default: None, no decompression)
+        verify: Check each chunk against the MD5 recorded at upload and fetch
+            a corrupt one again; IntegrityError if it is still wrong. Files
+            without per-chunk digests are checked against the whole-file MD5
+            after the last chunk has been yielded.
+
+    Yields:
+        Plaintext chunks as bytes-like objects
+    """
+    if fetch_workers < 1 or decrypt_workers < 1:
+        raise ValueError("fetch_workers and decrypt_workers must be at least 1")
+    if max_buffered_chunks is None:
+        max_buffered_chunks = fetch_workers + decrypt_workers + 2
+    if max_buffered_chunks < 1:
+        raise ValueError("max_buffered_chunks must be at least 1")
+
+    info = _fetch_download_data(file_id, jwt_token, base_url, session)
+    codec = _resolve_decompress(
+        decompress, file_id, jwt_token, base_url, session, info.get(compression.DOWNLOAD_FIELD)
+    )
+    urls, keys, ivs = info["urls"], info["keys"], info["ivs"]
+    verifier = _Verifier(file_id, info, len(urls), codec) if verify else None
+
+    own_pool: Optional[ProcessPoolExecutor] = None
+    if process_pool is None and process_min_size is not None:
+        # ステージのスレッドが動いている最中に fork しないよう spawn で起動する
+        own_pool = process_pool = ProcessPoolExecutor(
+            max_workers=decrypt_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    try:
+        pipeline = _Pipeline(
+            urls, keys, ivs, info.get("algorithm", "aes-256-cbc"), fetch_workers, decrypt_workers,
+            max_buffered_chunks, process_min_size, process_pool, session, verifier,
+        )
+        chunks = pipeline.run()
+        blocks = compression.iter_decompressed(chunks, codec) if codec else chunks
+        if verifier is None:
+            yield from blocks
+        else:
+            for block in blocks:
+                verifier.update(block)
+                yield block
+            verifier.finish()
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def download_pipelined(
+    file_id: str,
+    path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    **kwargs: Any
+) -> int:
+    """
+    Download a file to ``path`` through iter_pipelined.
+
+    Chunks are written in order as they come out of the pipeline, to a
+    temporary file that replaces ``path`` only once the download is complete.
+    Keyword arguments are passed to iter_pipelined.
+
+    Returns:
+        Number of plaintext bytes written
+    """
+    tmp_path = f"{path}.part"
+    written = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in iter_pipelined(file_id, jwt_token, base_url, **kwargs):
+                f.write(block)
+                written += len(block)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
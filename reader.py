@@ -0,0 +1,246 @@
+"""
+Random-access, file-like reads over a stored TSF object.
+
+Each chunk of a TSF object is padded and encrypted on its own, so any chunk
+can be fetched and decrypted without the others. TSFFile maps byte offsets
+onto chunks and only downloads the chunks a read touches, which lets zipfile,
+tarfile, PIL, pyarrow and friends read a slice of a large object without
+transferring all of it.
+"""
+
+import io
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .crypto import BLOCK_SIZE, _decode_key, _decrypt_chunk, get_backend
+from .download import _fetch_and_decrypt_chunk, _fetch_download_info
+from .exceptions import DownloadError
+from .scheduler import _transfer
+from .session import TSFSession
+
+# Bytes requested from the end of a chunk to learn its plaintext size: the
+# last ciphertext block and the block before it, which is its CBC IV
+_PROBE_BYTES = 2 * BLOCK_SIZE
+
+
+class TSFFile(io.RawIOBase):
+    """
+    Read-only, seekable file object over a stored TSF object.
+
+    Usage::
+
+        with TSFFile(file_id, token, base_url, session=session) as f:
+            with zipfile.ZipFile(f) as archive:
+                names = archive.namelist()
+
+    Chunks are fetched on demand and kept in a small LRU of decrypted chunks.
+    When reads move forward chunk by chunk, the next ``prefetch`` chunks are
+    fetched in the background. Chunk sizes are learned from the chunks read so
+    far; seeking past them sends one ``Range: bytes=-32`` request per unknown
+    chunk and decrypts only its last block to find the padding length. If
+    the storage server ignores Range, the probe downloads the whole chunk,
+    which is then cached.
+
+    Wrap it in io.BufferedReader for many small reads. Like a regular file it
+    must not be shared between threads.
+
+    Args:
+        file_id: ID of the file to read
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        cache_chunks: Decrypted chunks kept in memory
+        prefetch: Chunks fetched ahead during sequential reads (0 disables)
+        session: Optional pooled session to send the requests through
+    """
+
+    def __init__(
+        self,
+        file_id: str,
+        jwt_token: str,
+        base_url: str = "https://localhost:3000",
+        cache_chunks: int = 4,
+        prefetch: int = 2,
+        session: Optional[TSFSession] = None
+    ) -> None:
+        super().__init__()
+        if cache_chunks < 1 or prefetch < 0:
+            raise ValueError("cache_chunks must be at least 1 and prefetch non-negative")
+        self.file_id = file_id
+        self.cache_chunks = cache_chunks
+        self.prefetch = prefetch
+        self.session = session
+        self._urls, self._keys, self._ivs, self._algorithm = _fetch_download_info(
+            file_id, jwt_token, base_url, session
+        )
+        self._sizes: List[Optional[int]] = [None] * len(self._urls)
+        # Plaintext end offset of each chunk whose predecessors' sizes are all known
+        self._ends: List[int] = []
+        self._chunks: "OrderedDict[int, bytearray]" = OrderedDict()
+        self._inflight: Dict[int, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._last_index = -1
+        self._pos = 0
+
+    # ------------------------------------------------------------------
+    # io.RawIOBase
+    # ------------------------------------------------------------------
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        self._checkClosed()
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._checkClosed()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._pos = position
+        return position
+
+    def readinto(self, buffer: Any) -> int:
+        self._checkClosed()
+        target = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(target):
+            location = self._locate(self._pos)
+            if location is None:
+                break
+            index, within = location
+            chunk = self._chunk(index)
+            n = min(len(target) - filled, len(chunk) - within)
+            target[filled:filled + n] = memoryview(chunk)[within:within + n]
+            filled += n
+            self._pos += n
+        return filled
+
+    def close(self) -> None:
+        if not self.closed:
+            for future in self._inflight.values():
+                future.cancel()
+            self._inflight.clear()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._chunks.clear()
+        super().close()
+
+    # ------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        """Plaintext size of the object; probes any chunk sizes not yet known."""
+        self._probe_sizes()
+        return self._ends[-1]
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(4, self.prefetch), thread_name_prefix="tsf-file"
+            )
+        return self._executor
+
+    def _set_size(self, index: int, size: int) -> None:
+        self._sizes[index] = size
+        while len(self._ends) < len(self._sizes) and self._sizes[len(self._ends)] is not None:
+            start = self._ends[-1] if self._ends else 0
+            self._ends.append(start + self._sizes[len(self._ends)])  # type: ignore[operator]
+
+    def _locate(self, position: int) -> Optional[Tuple[int, int]]:
+        """Return (chunk index, offset within chunk) for ``position``, or None at EOF."""
+        while True:
+            known_end = self._ends[-1] if self._ends else 0
+            if position < known_end:
+                index = bisect_right(self._ends, position)
+                return index, position - (self._ends[index - 1] if index else 0)
+            if len(self._ends) == len(self._sizes):
+                return None
+            if position == known_end:
+                # 順次読み込み: 次のチャンクはどうせ必要なので、取得してサイズを知る
+                self._chunk(len(self._ends))
+            else:
+                self._probe_sizes()
+
+    def _chunk(self, index: int) -> bytearray:
+        cached = self._chunks.get(index)
+        if cached is not None:
+            self._chunks.move_to_end(index)
+        else:
+            future = self._inflight.pop(index, None)
+            cached = future.result() if future is not None else self._fetch(index)
+            self._remember(index, cached)
+        if index == self._last_index + 1:
+            self._prefetch_after(index)
+        self._last_index = index
+        return cached
+
+    def _fetch(self, index: int) -> bytearray:
+        try:
+            return _fetch_and_decrypt_chunk(
+                self._urls[index], self._keys[index], self._ivs[index], self._algorithm, self.session
+            )
+        except ValueError as e:
+            raise DownloadError(f"Chunk {index} of {self.file_id}: {e}") from e
+
+    def _remember(self, index: int, plaintext: bytearray) -> None:
+        self._set_size(index, len(plaintext))
+        self._chunks[index] = plaintext
+        self._chunks.move_to_end(index)
+        while len(self._chunks) > self.cache_chunks:
+            self._chunks.popitem(last=False)
+
+    def _prefetch_after(self, index: int) -> None:
+        for ahead in range(index + 1, min(index + 1 + self.prefetch, len(self._urls))):
+            if ahead not in self._chunks and ahead not in self._inflight:
+                self._inflight[ahead] = self._pool().submit(self._fetch, ahead)
+
+    def _probe_sizes(self) -> None:
+        """Learn every unknown chunk size, probing the chunks concurrently."""
+        unknown = [i for i, size in enumerate(self._sizes) if size is None and i not in self._inflight]
+        for index, (size, plaintext) in zip(unknown, self._pool().map(self._probe, unknown)):
+            if plaintext is not None:
+                self._remember(index, plaintext)
+            else:
+                self._set_size(index, size)
+        for index in [i for i in self._inflight if self._sizes[i] is None]:
+            self._remember(index, self._inflight.pop(index).result())
+
+    def _probe(self, index: int) -> Tuple[int, Optional[bytearray]]:
+        """Return (plaintext size, whole plaintext if the server ignored Range)."""
+        # チャンクの GET と同じくスケジューラ経由で送る (リトライ・同時実行数・401 の再送)
+        response = _transfer(self.session, "GET", self._urls[index], headers={"Range": f"bytes=-{_PROBE_BYTES}"})
+        response.raise_for_status()
+        if response.status_code != 206:
+            plaintext = self._fetch_full(index, response.content)
+            return len(plaintext), plaintext
+
+        total = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+        tail = response.content
+        if total % BLOCK_SIZE or len(tail) < BLOCK_SIZE:
+            raise DownloadError(f"Chunk {index} of {self.file_id} is not a whole number of AES blocks")
+        key, iv = _decode_key(self._keys[index], self._ivs[index], self._algorithm)
+        previous = tail[-2 * BLOCK_SIZE:-BLOCK_SIZE] if len(tail) >= 2 * BLOCK_SIZE else iv
+        last_block = get_backend().new_cipher(key, previous).decrypt(tail[-BLOCK_SIZE:])
+        fill = last_block[-1]
+        if not 1 <= fill <= BLOCK_SIZE:
+            raise DownloadError(f"Chunk {index} of {self.file_id}: Padding error. Possibly incorrect key/IV or corrupted data.")
+        return total - fill, None
+
+    def _fetch_full(self, index: int, encrypted: bytes) -> bytearray:
+        try:
+            return _decrypt_chunk(encrypted, self._keys[index], self._ivs[index], self._algorithm)
+        except ValueError as e:
+            raise DownloadError(f"Chunk {index} of {self.file_id}: {e}") from e
@@ -0,0 +1,368 @@
+"""
+Resumable downloads and uploads backed by an on-disk checkpoint journal.
+
+Each transfer appends one JSON line per completed chunk (index, byte range,
+SHA-256) to a small journal file next to the file being written or read.
+Running the same call again after a failure reads the journal, checks the
+recorded ranges against the data on disk and only transfers what is left.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from . import compression
+from .config import DEFAULT_CONFIG
+from .download import _fetch_download_data, _iter_decrypted_chunk, _iter_verified_chunk, _resolve_decompress
+from .exceptions import IntegrityError, UploadError
+from .integrity import _Verifier
+from .session import TSFSession
+from .upload import _file_md5s, _request_part_urls, _send_parts, confirm_upload
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_JOURNAL_SUFFIX = ".tsfjournal"
+UPLOAD_JOURNAL_SUFFIX = ".tsfupload"
+
+
+class _Journal:
+    """Append-only JSON-lines journal: a header line followed by chunk records."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None, []
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # 書き込み途中で中断された最終行は無視する
+                break
+        if not records:
+            return None, []
+        return records[0], records[1:]
+
+    def start(self, header: Dict[str, Any]) -> None:
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _hash_range(path: str, offset: int, length: int, buffer_size: int, digest: Any = None) -> str:
+    digest = hashlib.sha256() if digest is None else digest
+    with open(path, "rb") as f:
+        f.seek(offset)
+        remaining = length
+        while remaining:
+            block = f.read(min(buffer_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _iter_file(path: str, buffer_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(buffer_size)
+            if not block:
+                return
+            yield block
+
+
+def _finish_download(
+    part_path: str,
+    path: str,
+    codec: Optional[str],
+    verifier: Optional[_Verifier],
+    buffer_size: int
+) -> int:
+    """
+    完成した部分ファイルを展開し (codec がある場合)、ファイル全体の MD5 を照合してから
+    path に置く。書き出した平文のバイト数を返す
+    """
+    whole = verifier if verifier is not None and verifier.whole_file else None
+    if not codec:
+        size = os.path.getsize(part_path)
+        if whole is not None:
+            for block in _iter_file(part_path, buffer_size):
+                whole.update(block)
+            whole.finish()
+        os.replace(part_path, path)
+        return size
+
+    tmp_path = f"{path}.tmp"
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in compression.iter_decompressed(_iter_file(part_path, buffer_size), codec):
+                if whole is not None:
+                    whole.update(block)
+                f.write(block)
+                size += len(block)
+        if whole is not None:
+            whole.finish()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.remove(part_path)
+    return size
+
+
+def _keys_fingerprint(keys: List[str]) -> str:
+    return hashlib.sha256("\n".join(keys).encode()).hexdigest()
+
+
+def download_resumable(
+    file_id: str,
+    path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"],
+    verify_all: bool = False,
+    session: Optional[TSFSession] = None,
+    decompress: Union[bool, str, None] = None,
+    verify: bool = False
+) -> int:
+    """
+    Download a file to ``path``, resuming from the last completed chunk.
+
+    Plaintext is appended to ``path + ".part"`` and every finished chunk is
+    recorded in ``path + ".tsfjournal"``. On a retry the recorded chunks are
+    checked against the partial file and skipped: by default every range's
+    size is checked and the last chunk's SHA-256 is recomputed (catching a
+    torn final write); ``verify_all`` rehashes every recorded chunk. The first
+    chunk that fails the check and everything after it are downloaded again.
+    The journal is discarded if the object's chunk keys changed.
+
+    The partial file holds the data as stored. With ``decompress`` it is
+    decompressed into ``path`` once every chunk is on disk; with ``verify``
+    each chunk, including the recorded ones, is checked against the MD5s
+    recorded at upload, so a corrupt chunk fails with IntegrityError and is
+    downloaded again on the next call. A file with only a whole-file MD5 is
+    checked at the end, and on a mismatch the partial file and journal are
+    discarded.
+
+    Args:
+        file_id: ID of the file to download
+        path: Destination path
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        buffer_size: Number of bytes read from the network per step
+        verify_all: Rehash every recorded chunk instead of only the last one
+        session: Optional pooled session to send the requests through
+        decompress: Codec name, or "auto" to use the one recorded at upload
+            (default: None, no decompression)
+        verify: Check the data against the MD5s recorded at upload
+
+    Returns:
+        Total number of plaintext bytes in the finished file
+    """
+    info = _fetch_download_data(file_id, jwt_token, base_url, session)
+    codec = _resolve_decompress(
+        decompress, file_id, jwt_token, base_url, session, info.get(compression.DOWNLOAD_FIELD)
+    )
+    urls, keys, ivs = info["urls"], info["keys"], info["ivs"]
+    algorithm = info.get("algorithm", "aes-256-cbc")
+    verifier = _Verifier(file_id, info, len(urls), codec) if verify else None
+    chunk_md5s = verifier.chunk_md5s if verifier is not None else None
+    part_path = f"{path}.part"
+    journal = _Journal(path + DOWNLOAD_JOURNAL_SUFFIX)
+    header = {"fileId": str(file_id), "chunks": len(urls), "keys": _keys_fingerprint(keys)}
+
+    saved_header, records = journal.load()
+    done: List[Dict[str, Any]] = []
+    if saved_header == header and os.path.exists(part_path):
+        on_disk = os.path.getsize(part_path)
+        offset = 0
+        for position, record in enumerate(records):
+            if record.get("index") != position or record.get("offset") != offset:
+                break
+            end = offset + record["length"]
+            if end > on_disk:
+                break
+            is_last = position == len(records) - 1
+            if (verify_all or is_last) and _hash_range(part_path, offset, record["length"], buffer_size) != record["sha256"]:
+                break
+            if chunk_md5s is not None and _hash_range(
+                part_path, offset, record["length"], buffer_size, hashlib.md5()
+            ) != chunk_md5s[position]:
+                break
+            done.append(record)
+            offset = end
+    else:
+        journal.start(header)
+        records = []
+
+    resume_offset = done[-1]["offset"] + done[-1]["length"] if done else 0
+    if done:
+        logger.info(f"Resuming download of {file_id} at chunk {len(done)}/{len(urls)} ({resume_offset} bytes)")
+    if len(done) != len(records):
+        # 検証に失敗した記録以降を捨てて書き直す (有効な記録が無い場合も古い記録を残さない)
+        journal.start(header)
+        for record in done:
+            journal.append(record)
+
+    with open(part_path, "r+b" if os.path.exists(part_path) else "wb") as f:
+        f.truncate(resume_offset)
+        f.seek(resume_offset)
+        offset = resume_offset
+        for index in range(len(done), len(urls)):
+            digest = hashlib.sha256()
+            length = 0
+            if verifier is not None:
+                blocks = _iter_verified_chunk(
+                    index, urls[index], keys[index], ivs[index], algorithm, buffer_size, session, verifier
+                )
+            else:
+                blocks = _iter_decrypted_chunk(urls[index], keys[index], ivs[index], algorithm, buffer_size, session)
+            for block in blocks:
+                f.write(block)
+                digest.update(block)
+                length += len(block)
+            f.flush()
+            os.fsync(f.fileno())
+            journal.append({"index": index, "offset": offset, "length": length, "sha256": digest.hexdigest()})
+            offset += length
+
+    try:
+        size = _finish_download(part_path, path, codec, verifier, buffer_size)
+    except IntegrityError:
+        # ファイル全体の MD5 が合わない場合はどのチャンクが壊れたか分からないため、最初からやり直す
+        os.remove(part_path)
+        journal.remove()
+        raise
+    journal.remove()
+    return size
+
+
+def upload_file_resumable(
+    file_path: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    part_size: int = 8 * 1024 * 1024,
+    max_workers: int = 4,
+    max_retries: int = DEFAULT_CONFIG["max_retries"],
+    retry_backoff: float = DEFAULT_CONFIG["retry_backoff"],
+    session: Optional[TSFSession] = None
+) -> dict:
+    """
+    Multi-part upload (see upload_file_chunked) that can resume after a failure.
+
+    The signed part URLs, keys and IVs, and every part that was PUT
+    successfully, are recorded in ``file_path + ".tsfupload"`` (created with
+    mode 0600, since it holds the part keys). Calling this again with the same
+    arguments reuses the same fileId and only sends the missing parts; parts
+    already sent are checked by re-hashing their local bytes. The journal is
+    deleted once the upload is confirmed.
+
+    Resuming requires the signed URLs to still be valid. If the local file
+    changed since the first attempt, UploadError is raised; delete the journal
+    to start over under a new original path.
+
+    Returns:
+        Dict with upload result, as upload_file_chunked
+    """
+    st = os.stat(file_path)
+    journal = _Journal(file_path + UPLOAD_JOURNAL_SUFFIX)
+    saved_header, records = journal.load()
+
+    if saved_header is not None:
+        if saved_header.get("originalPath") != original_path or saved_header.get("partSize") != part_size:
+            raise UploadError(f"{journal.path} belongs to a different upload; delete it to start over")
+        if saved_header.get("size") != st.st_size or saved_header.get("mtimeNs") != st.st_mtime_ns:
+            raise UploadError(f"{file_path} changed since the interrupted upload; delete {journal.path} to start over")
+        meta = saved_header["meta"]
+    else:
+        md5_hex, part_md5s = _file_md5s(file_path, part_size)
+        meta = _request_part_urls(
+            st.st_size, md5_hex, original_path, jwt_token, base_url, part_size, session, part_md5s
+        )
+        journal.start({
+            "originalPath": original_path,
+            "size": st.st_size,
+            "mtimeNs": st.st_mtime_ns,
+            "partSize": part_size,
+            "meta": meta,
+        })
+
+    part_count = len(meta["signedUrls"])
+    completed: Dict[int, int] = {}
+    valid: List[Dict[str, Any]] = []
+    for record in records:
+        index = record.get("index")
+        if not isinstance(index, int) or not 0 <= index < part_count:
+            continue
+        expected_length = min(part_size, st.st_size - index * part_size)
+        if record.get("length") != expected_length:
+            continue
+        if _hash_range(file_path, index * part_size, expected_length, DEFAULT_CONFIG["chunk_size"]) != record.get("sha256"):
+            continue
+        completed[index] = record["encryptedSize"]
+        valid.append(record)
+    if completed:
+        logger.info(f"Resuming upload of {original_path}: {len(completed)}/{part_count} parts already sent")
+    if saved_header is not None and len(valid) != len(records):
+        # 検証に失敗した記録を捨てて書き直し、次の再開で再検証しない
+        journal.start(saved_header)
+        for record in valid:
+            journal.append(record)
+
+    def read_part(index: int) -> bytes:
+        with open(file_path, "rb") as f:
+            f.seek(index * part_size)
+            return f.read(part_size)
+
+    def record_part(index: int, plaintext: bytes, encrypted_size: int) -> None:
+        journal.append({
+            "index": index,
+            "offset": index * part_size,
+            "length": len(plaintext),
+            "sha256": hashlib.sha256(plaintext).hexdigest(),
+            "encryptedSize": encrypted_size,
+        })
+
+    pending = [i for i in range(part_count) if i not in completed]
+    uploaded_size = sum(completed.values()) + _send_parts(
+        read_part, meta, pending, max_workers, max_retries, retry_backoff, session, record_part
+    )
+
+    confirmation = confirm_upload(meta["fileId"], jwt_token, base_url, session)
+    journal.remove()
+
+    return {
+        "fileId": meta["fileId"],
+        "uploadedSize": uploaded_size,
+        "finalFilesize": confirmation.get("filesize", uploaded_size),
+        "success": confirmation.get("success", True),
+        "parts": part_count,
+        "resumedParts": len(completed)
+    }
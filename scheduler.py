@@ -0,0 +1,378 @@
+"""
+Shared scheduler for chunk and part transfers.
+
+Every chunk GET, signed PUT and direct-upload POST goes through a
+TransferScheduler, which keeps three pieces of state per host:
+
+* an adaptive concurrency limit (AIMD): each success adds about one slot
+  per limit's worth of requests, while a 429, 5xx, timeout or connection
+  error halves it. Latency rising well above the best seen also trims it;
+* retries with jittered exponential backoff (``retry_backoff ** attempt``
+  seconds, the same schedule as DEFAULT_CONFIG) that wait at least as long
+  as a ``Retry-After`` header asks;
+* a circuit breaker that fails fast with CircuitOpenError after
+  ``failure_threshold`` consecutive failures, and lets a single probe
+  through once ``reset_timeout`` has passed.
+
+Callers never pick a concurrency level that is "safe" for the backend; they
+can submit as much work as they like and the scheduler admits it at the rate
+the host sustains.
+"""
+
+import email.utils
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import DEFAULT_CONFIG
+from .exceptions import CircuitOpenError
+from .session import Timeout, _http
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+_CONGESTION_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Statuses a non-idempotent request may be retried on: the server refused it
+# without processing it
+_REFUSED_STATUSES = frozenset((429, 503))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+@dataclass
+class HostStats:
+    """Snapshot of one host's scheduler state."""
+
+    host: str
+    limit: float
+    in_flight: int
+    state: str
+    successes: int
+    failures: int
+    retries: int
+    latency: Optional[float]
+
+
+class _Host:
+    def __init__(self, name: str, limit: float) -> None:
+        self.name = name
+        self.cond = threading.Condition()
+        self.limit = limit
+        self.in_flight = 0
+        self.latency: Optional[float] = None       # EWMA of successful requests
+        self.best_latency: Optional[float] = None
+        self.last_decrease = 0.0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+
+
+class TransferScheduler:
+    """
+    Per-host adaptive concurrency, retry and circuit-breaker policy.
+
+    One instance is shared process-wide by default (see
+    get_default_scheduler()); attach another to a TSFSession with
+    ``TSFSession(scheduler=...)`` to give its transfers their own limits.
+
+    A TSFSession without a scheduler of its own also retries 502/503/504 for
+    GET and PUT at the transport level; attach the scheduler, or pass
+    ``TSFSession(max_retries=0)``, to leave those retries to the scheduler.
+
+    Args:
+        max_retries: Retries per request after the first attempt
+        retry_backoff: Exponential backoff base in seconds
+        initial_concurrency: Starting concurrency limit per host
+        min_concurrency: Lowest the limit may fall
+        max_concurrency: Highest the limit may grow
+        latency_factor: Latency above this multiple of the best observed
+            counts as congestion
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds the circuit stays open before a probe
+        max_backoff: Upper bound on a single backoff sleep, including Retry-After
+        timeout: Default timeout for requests that do not pass their own and
+            are not sent through a TSFSession
+    """
+
+    def __init__(
+        self,
+        max_retries: int = DEFAULT_CONFIG["max_retries"],
+        retry_backoff: float = DEFAULT_CONFIG["retry_backoff"],
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        latency_factor: float = 3.0,
+        failure_threshold: int = 8,
+        reset_timeout: float = 30.0,
+        max_backoff: float = 60.0,
+        timeout: Optional[Timeout] = DEFAULT_CONFIG["timeout"],
+    ) -> None:
+        if not 1 <= min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError("need 1 <= min_concurrency <= initial_concurrency <= max_concurrency")
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_factor = latency_factor
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _Host] = {}
+
+    # ------------------------------------------------------------------
+
+    def request(
+        self,
+        http: Any,
+        method: str,
+        url: str,
+        idempotent: Optional[bool] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Send ``method url`` through ``http`` (requests or a TSFSession).
+
+        Retries on 429/5xx, timeouts and connection errors until
+        ``max_retries`` is used up, then returns the last response or raises
+        the last exception. POST counts as non-idempotent and is only retried
+        when the server refused it outright (429/503) or the connection could
+        not be opened. Request bodies that are streams cannot be replayed and
+        get a single attempt.
+
+        With ``stream=True`` a successful response keeps its concurrency slot
+        until it is closed (use it as a context manager), so the body transfer
+        counts against the host's limit and its latency covers the whole body.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        backoff = self.retry_backoff if retry_backoff is None else retry_backoff
+        if idempotent is None:
+            idempotent = method.upper() != "POST"
+        if not _replayable(kwargs):
+            retries = 0
+        # TSFSession は自身の既定タイムアウトを持つ
+        kwargs.setdefault("timeout", getattr(http, "timeout", self.timeout))
+
+        host = self._host(url)
+        attempt = 0
+        while True:
+            probe = self._acquire(host)
+            started = time.monotonic()
+            response: Optional[requests.Response] = None
+            error: Optional[BaseException] = None
+            try:
+                response = http.request(method, url, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                error = e
+            except BaseException:
+                self._release(host, probe)
+                raise
+            elapsed = time.monotonic() - started
+
+            congested = error is not None or response.status_code in _CONGESTION_STATUSES  # type: ignore[union-attr]
+            if not congested and kwargs.get("stream"):
+                return self._hold_until_closed(response, host, probe, started)  # type: ignore[arg-type]
+            self._release(host, probe, elapsed, congested)
+            if not congested:
+                return response  # type: ignore[return-value]
+
+            retryable = idempotent or (
+                isinstance(error, requests.exceptions.ConnectTimeout)
+                or (response is not None and response.status_code in _REFUSED_STATUSES)
+            )
+            if attempt >= retries or not retryable:
+                if error is not None:
+                    raise error
+                return response  # type: ignore[return-value]
+
+            delay = self._backoff(attempt, backoff, response)
+            if response is not None:
+                response.close()
+            with host.cond:
+                host.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, HostStats]:
+        with self._lock:
+            hosts = list(self._hosts.values())
+        result = {}
+        for host in hosts:
+            with host.cond:
+                result[host.name] = HostStats(
+                    host.name, host.limit, host.in_flight, host.state,
+                    host.successes, host.failures, host.retries, host.latency,
+                )
+        return result
+
+    def reset(self) -> None:
+        """Forget every host's limits, latencies and breaker state."""
+        with self._lock:
+            self._hosts.clear()
+
+    # ------------------------------------------------------------------
+
+    def _host(self, url: str) -> _Host:
+        parts = urlsplit(url)
+        name = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            host = self._hosts.get(name)
+            if host is None:
+                host = self._hosts[name] = _Host(name, float(self.initial_concurrency))
+            return host
+
+    def _acquire(self, host: _Host) -> bool:
+        """Wait for a slot on ``host``; returns True if this request is the half-open probe."""
+        with host.cond:
+            while True:
+                if host.state == OPEN:
+                    if time.monotonic() - host.opened_at < self.reset_timeout:
+                        raise CircuitOpenError(
+                            f"Circuit open for {host.name} after {host.consecutive_failures} consecutive failures"
+                        )
+                    # 半開状態: 1 リクエストだけ通して回復を確認する
+                    host.state = HALF_OPEN
+                    host.probing = True
+                    host.in_flight += 1
+                    return True
+                # 他のリクエストはプローブの結果が出るまで待つ
+                if not (host.state == HALF_OPEN and host.probing) and \
+                        host.in_flight < max(self.min_concurrency, int(host.limit)):
+                    host.in_flight += 1
+                    return False
+                host.cond.wait()
+
+    def _release(
+        self, host: _Host, probe: bool, elapsed: Optional[float] = None, congested: bool = False
+    ) -> None:
+        with host.cond:
+            host.in_flight -= 1
+            if probe:
+                host.probing = False
+            if elapsed is not None:
+                now = time.monotonic()
+                if congested:
+                    host.failures += 1
+                    host.consecutive_failures += 1
+                    self._decrease(host, now, 0.5)
+                    if host.state == HALF_OPEN or host.consecutive_failures >= self.failure_threshold:
+                        host.state = OPEN
+                        host.opened_at = now
+                else:
+                    host.successes += 1
+                    host.consecutive_failures = 0
+                    host.state = CLOSED
+                    host.latency = elapsed if host.latency is None else 0.8 * host.latency + 0.2 * elapsed
+                    if host.best_latency is None or elapsed < host.best_latency:
+                        host.best_latency = elapsed
+                    if host.latency > host.best_latency * self.latency_factor:
+                        self._decrease(host, now, 0.9)
+                    else:
+                        # 加算的増加: limit 回の成功でおよそ 1 スロット増える
+                        host.limit = min(float(self.max_concurrency), host.limit + 1.0 / host.limit)
+            host.cond.notify_all()
+
+    def _hold_until_closed(
+        self, response: requests.Response, host: _Host, probe: bool, started: float
+    ) -> requests.Response:
+        """Release ``response``'s slot when it is closed (or garbage collected, if never closed)."""
+        lock = threading.Lock()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with lock:
+                if released:
+                    return
+                released = True
+            self._release(host, probe, time.monotonic() - started, False)
+
+        original_close = response.close
+
+        def close() -> None:
+            try:
+                original_close()
+            finally:
+                release()
+
+        response.close = close  # type: ignore[method-assign]
+        weakref.finalize(response, release)
+        return response
+
+    def _decrease(self, host: _Host, now: float, factor: float) -> None:
+        # 同じ輻輳の波で何度も半減しないよう、直近のレイテンシ 1 回分は再減少しない
+        if now - host.last_decrease < (host.latency or 0.0):
+            return
+        host.limit = max(float(self.min_concurrency), host.limit * factor)
+        host.last_decrease = now
+
+    def _backoff(self, attempt: int, base: float, response: Optional[requests.Response]) -> float:
+        delay = base ** attempt
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        retry_after = _retry_after(response) if response is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return min(delay, self.max_backoff)
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _replayable(kwargs: Dict[str, Any]) -> bool:
+    """A body can be sent again unless it is a file-like object or an iterator."""
+    data = kwargs.get("data")
+    return data is None or isinstance(data, (bytes, bytearray, memoryview, str, dict, list, tuple))
+
+
+_default_lock = threading.Lock()
+_default: Optional[TransferScheduler] = None
+
+
+def get_default_scheduler() -> TransferScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = TransferScheduler()
+    return _default
+
+
+def set_default_scheduler(scheduler: Optional[TransferScheduler]) -> None:
+    """Replace the process-wide scheduler (None recreates it with defaults on next use)."""
+    global _default
+    with _default_lock:
+        _default = scheduler
+
+
+def _transfer(session: Any, method: str, url: str, **kwargs: Any) -> requests.Response:
+    """Send a transfer request through the session's scheduler, or the default one."""
+    scheduler = getattr(session, "scheduler", None) or get_default_scheduler()
+    return scheduler.request(_http(session), method, url, **kwargs)
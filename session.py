@@ -0,0 +1,132 @@
+from typing import Any, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import DEFAULT_CONFIG, SSL_VERIFY
+
+# Seconds, or a (connect, read) tuple as accepted by requests
+Timeout = Union[float, tuple]
+
+
+class TSFSession:
+    """
+    Pooled HTTP session shared by the module-level functions.
+
+    Every function in this package opens a fresh connection per call when used
+    on its own. Passing ``session=TSFSession()`` instead routes the metadata
+    calls, chunk GETs, signed PUTs and confirmations through one
+    ``requests.Session`` whose keep-alive connection pool is reused, so only
+    the first request to each host pays for the TCP and TLS handshakes.
+
+    Usage::
+
+        with TSFSession(pool_maxsize=32) as session:
+            data = decode2binary(file_id, token, base_url, max_workers=16, session=session)
+
+    Args:
+        pool_connections: Number of per-host connection pools to cache
+        pool_maxsize: Maximum connections kept alive per host. Set this to at
+            least the number of threads sharing the session.
+        timeout: Default timeout applied when a call does not pass its own
+        max_retries: Transport-level retries for connection errors and
+            502/503/504 responses. When a scheduler is attached, 502/503/504
+            are left to it (the scheduler retries them and its circuit
+            breaker needs to see them), so only connection errors are retried
+            here. Without one, pass 0 to keep these retries from compounding
+            with the default scheduler's.
+        backoff_factor: Base delay for the exponential backoff between retries
+        token_manager: Optional TokenManager. When a request carrying one of
+            its tokens gets a 401, the session logs in again and replays the
+            request once with the new token.
+        metadata_cache: Optional MetadataQueryCache for queryMetaData calls
+            made through this session; writes through it invalidate the cache.
+        scheduler: Optional TransferScheduler for the chunk GETs, signed PUTs
+            and direct uploads made through this session. Defaults to the
+            process-wide scheduler.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: Optional[Timeout] = DEFAULT_CONFIG["timeout"],
+        max_retries: int = DEFAULT_CONFIG["max_retries"],
+        backoff_factor: float = DEFAULT_CONFIG["retry_backoff"] / 2,
+        token_manager: Optional[Any] = None,
+        metadata_cache: Optional[Any] = None,
+        scheduler: Optional[Any] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.token_manager = token_manager
+        self.metadata_cache = metadata_cache
+        self.scheduler = scheduler
+        # POST は冪等でないため urllib3 の既定どおりリトライ対象外。
+        # スケジューラがある場合はステータスによる再送をスケジューラに任せ、二重に再送しない
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=() if scheduler is not None else (502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+        )
+        self.http = requests.Session()
+        # 証明書の検証は http.verify で変えられる (CA バンドルのパスも可)。各関数は _ssl_verify() でこれに従う
+        self.http.verify = SSL_VERIFY
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.http.request(method, url, **kwargs)
+        if response.status_code == 401 and self.token_manager is not None:
+            response = self._replay_with_fresh_token(response, method, url, kwargs)
+        return response
+
+    def _replay_with_fresh_token(
+        self, response: requests.Response, method: str, url: str, kwargs: Any
+    ) -> requests.Response:
+        headers = kwargs.get("headers") or {}
+        auth = headers.get("Authorization", "")
+        # ストリーム本文は読み終えているため再送できない
+        if self.token_manager is None or not auth.startswith("Bearer ") or hasattr(kwargs.get("data"), "read"):
+            return response
+        fresh = self.token_manager.refresh(auth[len("Bearer "):])
+        if fresh is None:
+            return response
+        response.close()
+        kwargs["headers"] = {**headers, "Authorization": f"Bearer {fresh}"}
+        return self.http.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def close(self) -> None:
+        self.http.close()
+
+    def __enter__(self) -> "TSFSession":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _ssl_verify(session: Optional[TSFSession]) -> Union[bool, str]:
+    """The ``verify`` argument for a request: the session's setting, or SSL_VERIFY without a session."""
+    return SSL_VERIFY if session is None else session.http.verify
+
+
+def _http(session: Optional[TSFSession]) -> Any:
+    """Return ``session`` if given, otherwise the ``requests`` module itself."""
+    return requests if session is None else session
@@ -0,0 +1,294 @@
+"""
+Incremental directory sync driven by a local manifest.
+
+sync_directory walks a local tree and uploads only what changed since the
+last run. A JSON manifest records (size, mtime, md5, fileId) per file; a file
+whose size and mtime still match its manifest entry is skipped without being
+read, so a run where nothing changed costs one stat per file.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .config import DEFAULT_CONFIG
+from .download import list_files
+from .session import TSFSession
+from .upload import get_file_md5, upload_file_streaming
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".tsfsync.json"
+_MANIFEST_VERSION = 1
+
+# SyncResult per-file statuses
+UPLOADED = "uploaded"
+UNCHANGED = "unchanged"    # size and mtime match the manifest; not read
+TOUCHED = "touched"        # stat changed but the MD5 did not; not uploaded
+ADOPTED = "adopted"        # already on the server with the same MD5
+CONFLICT = "conflict"      # server answered 409: a different version holds the path
+FAILED = "failed"
+
+
+@dataclass
+class SyncResult:
+    """Summary of sync_directory."""
+
+    counts: Dict[str, int] = field(default_factory=dict)
+    uploaded: List[str] = field(default_factory=list)
+    conflicts: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, BaseException]] = field(default_factory=list)
+    remote_only: List[str] = field(default_factory=list)
+    removed: int = 0
+    hashed_bytes: int = 0
+    uploaded_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def _count(self, status: str) -> None:
+        self.counts[status] = self.counts.get(status, 0) + 1
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Read a sync manifest, returning an empty one if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": _MANIFEST_VERSION, "remotePrefix": None, "files": {}}
+    except ValueError:
+        logger.warning(f"Ignoring unreadable sync manifest {path}")
+        return {"version": _MANIFEST_VERSION, "remotePrefix": None, "files": {}}
+    if manifest.get("version") != _MANIFEST_VERSION:
+        return {"version": _MANIFEST_VERSION, "remotePrefix": None, "files": {}}
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    """Write the manifest atomically so an interrupted run never truncates it."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tsfsync-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _walk(root: str, skip: Set[str], follow_symlinks: bool) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield (POSIX relative path, stat) for every regular file below ``root``."""
+    stack = [""]
+    while stack:
+        relative_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, relative_dir))
+        except OSError as e:
+            logger.warning(f"Cannot list {os.path.join(root, relative_dir)}: {e}")
+            continue
+        with entries:
+            for entry in entries:
+                relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        stack.append(relative)
+                    elif entry.is_file(follow_symlinks=follow_symlinks) and os.path.abspath(entry.path) not in skip:
+                        yield relative, entry.stat(follow_symlinks=follow_symlinks)
+                except OSError as e:
+                    logger.warning(f"Cannot stat {entry.path}: {e}")
+
+
+def _sync_one(
+    local_path: str,
+    remote_path: str,
+    st: os.stat_result,
+    previous: Optional[Dict[str, Any]],
+    remote: Optional[Dict[str, Any]],
+    compare_remote: bool,
+    jwt_token: str,
+    base_url: str,
+    buffer_size: int,
+    session: Optional[TSFSession],
+) -> Tuple[str, Dict[str, Any], int]:
+    """Hash and, if needed, upload one file; returns (status, manifest entry, hashed bytes)."""
+    entry: Dict[str, Any] = {"size": st.st_size, "mtimeNs": st.st_mtime_ns, "md5": None, "fileId": None}
+    hashed = 0
+    if previous is not None and previous.get("size") == st.st_size and previous.get("mtimeNs") == st.st_mtime_ns:
+        # 内容は変わっていないがサーバー側から消えている
+        entry["md5"] = previous["md5"]
+    else:
+        entry["md5"] = get_file_md5(local_path, buffer_size)
+        hashed = st.st_size
+        if previous is not None and previous.get("md5") == entry["md5"] and previous.get("fileId") is not None:
+            entry["fileId"] = previous["fileId"]
+            if not compare_remote or (remote is not None and remote.get("md5") == entry["md5"]):
+                return TOUCHED, entry, hashed
+
+    if remote is not None and remote.get("md5") == entry["md5"]:
+        entry["fileId"] = remote.get("fileId", remote.get("id"))
+        return ADOPTED, entry, hashed
+
+    try:
+        result = upload_file_streaming(
+            local_path, remote_path, jwt_token, base_url,
+            buffer_size=buffer_size, md5_hex=entry["md5"], session=session,
+        )
+    except FileExistsError:
+        entry["conflict"] = True
+        return CONFLICT, entry, hashed
+    entry["fileId"] = result["fileId"]
+    return UPLOADED, entry, hashed
+
+
+def sync_directory(
+    local_root: str,
+    remote_prefix: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    manifest_path: Optional[str] = None,
+    max_workers: int = 8,
+    compare_remote: bool = False,
+    follow_symlinks: bool = False,
+    include: Optional[Callable[[str], bool]] = None,
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"],
+    session: Optional[TSFSession] = None
+) -> SyncResult:
+    """
+    Upload new and changed files under ``local_root`` to ``remote_prefix``.
+
+    Each file is uploaded as ``remote_prefix + "/" + relative path`` and
+    recorded in a manifest (by default ``local_root/.tsfsync.json``, which is
+    itself never uploaded). On later runs a file is only read again if its
+    size or mtime changed; it is only uploaded if its MD5 changed too. The
+    MD5 work and uploads run on ``max_workers`` threads while the tree is
+    still being walked.
+
+    The server refuses to overwrite an existing path (409), so a changed file
+    whose path was already uploaded is reported in ``conflicts`` and not
+    retried until it changes again.
+
+    With ``compare_remote`` the /files listing is fetched once first. Files
+    the manifest says are synced but that are missing on the server are
+    uploaded again. New files that already exist remotely with the same MD5
+    are adopted without uploading. Remote paths under the prefix with no local
+    file are reported in ``remote_only``.
+
+    Args:
+        local_root: Directory to sync
+        remote_prefix: Original-path prefix on the server
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        manifest_path: Where to keep the manifest
+        max_workers: Number of concurrent hash/upload workers
+        compare_remote: Reconcile against the server's /files listing
+        follow_symlinks: Follow symlinked files and directories
+        include: Optional predicate on the relative POSIX path; False skips the file
+        buffer_size: Number of bytes read per step when hashing and encrypting
+        session: Optional pooled session; its pool_maxsize should be at least
+            max_workers
+
+    Returns:
+        SyncResult with per-status counts and the uploaded, conflicting and
+        failed paths
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    started = time.perf_counter()
+    local_root = os.path.abspath(local_root)
+    manifest_path = manifest_path or os.path.join(local_root, MANIFEST_NAME)
+    prefix = remote_prefix.strip("/")
+
+    manifest = load_manifest(manifest_path)
+    previous_files: Dict[str, Dict[str, Any]] = manifest["files"] if manifest.get("remotePrefix") == prefix else {}
+    files: Dict[str, Dict[str, Any]] = {}
+    result = SyncResult()
+
+    remote_files: Dict[str, Dict[str, Any]] = {}
+    if compare_remote:
+        remote_files = {
+            entry["originalPath"]: entry
+            for entry in list_files(jwt_token, base_url, session)
+            if entry.get("originalPath")
+        }
+
+    def remote_path_of(relative: str) -> str:
+        return f"{prefix}/{relative}" if prefix else relative
+
+    pending: Dict[Future, Tuple[str, os.stat_result]] = {}
+
+    def collect(done: Set[Future]) -> None:
+        for future in done:
+            relative, st = pending.pop(future)
+            try:
+                status, entry, hashed = future.result()
+            except Exception as e:
+                result._count(FAILED)
+                result.failed.append((relative, e))
+                continue
+            files[relative] = entry
+            result._count(status)
+            result.hashed_bytes += hashed
+            if status == UPLOADED:
+                result.uploaded.append(relative)
+                result.uploaded_bytes += st.st_size
+            elif status == CONFLICT:
+                result.conflicts.append(relative)
+
+    seen: Set[str] = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for relative, st in _walk(local_root, {os.path.abspath(manifest_path)}, follow_symlinks):
+                if include is not None and not include(relative):
+                    continue
+                remote_path = remote_path_of(relative)
+                seen.add(remote_path)
+                previous = previous_files.get(relative)
+                remote = remote_files.get(remote_path)
+
+                if (
+                    previous is not None
+                    and previous.get("size") == st.st_size
+                    and previous.get("mtimeNs") == st.st_mtime_ns
+                    and not (compare_remote and remote is None and not previous.get("conflict"))
+                ):
+                    files[relative] = previous
+                    result._count(UNCHANGED)
+                    continue
+
+                # 入力全体をキューに積まないよう、未完了のタスク数を制限する
+                if len(pending) >= max_workers * 4:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(
+                    _sync_one, os.path.join(local_root, relative), remote_path, st, previous,
+                    remote, compare_remote, jwt_token, base_url, buffer_size, session,
+                )
+                pending[future] = (relative, st)
+            collect(set(wait(pending).done))
+    finally:
+        # 中断されても完了分は記録しておき、次回はそこから再開する
+        for relative, entry in previous_files.items():
+            if relative not in files and os.path.exists(os.path.join(local_root, relative)):
+                files.setdefault(relative, entry)
+        result.removed = sum(1 for relative in previous_files if relative not in files)
+        if files != previous_files or manifest.get("remotePrefix") != prefix:
+            save_manifest(manifest_path, {"version": _MANIFEST_VERSION, "remotePrefix": prefix, "files": files})
+
+    if compare_remote:
+        under_prefix = f"{prefix}/" if prefix else ""
+        result.remote_only = sorted(
+            path for path in remote_files if path.startswith(under_prefix) and path not in seen
+        )
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,459 @@
+"""
+In-process stand-in for the TSF server, for tests and benchmarks.
+
+FakeTSFServer speaks enough of the TSF HTTP API for the client functions in
+this package to run end to end without a live server or real credentials.
+Objects are encrypted with per-chunk AES-256-CBC keys exactly as the real
+server hands them out, so downloads exercise the same decrypt path.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def make_jwt(subject: str, ttl: float) -> str:
+    """Build an unsigned JWT whose ``exp`` claim is ``ttl`` seconds from now."""
+    header = _b64url(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+    claims = {"sub": subject, "exp": int(time.time() + ttl), "jti": os.urandom(8).hex()}
+    payload = _b64url(json.dumps(claims).encode())
+    return f"{header}.{payload}."
+
+
+def _encrypt_part(data: bytes) -> Tuple[bytes, str, str]:
+    key = os.urandom(32)
+    iv = os.urandom(16)
+    encrypted = AES.new(key, AES.MODE_CBC, iv).encrypt(pad(data, AES.block_size))
+    return encrypted, base64.b64encode(key).decode(), base64.b64encode(iv).decode()
+
+
+class _StoredFile:
+    def __init__(self, original_path: str, md5: str) -> None:
+        self.original_path = original_path
+        self.md5 = md5
+        self.parts: Dict[int, bytes] = {}
+        self.keys: List[str] = []
+        self.ivs: List[str] = []
+        self.part_count = 1
+        self.confirmed = False
+        self.extra: Dict[str, Any] = {}
+
+    def encrypted_size(self) -> int:
+        return sum(len(p) for p in self.parts.values())
+
+
+class FakeTSFServer:
+    """
+    Threaded HTTP server implementing the TSF endpoints used by this package.
+
+    Usage::
+
+        with FakeTSFServer() as server:
+            token = get_jwt_token("user", "pass", server.base_url)
+            ...
+
+    Args:
+        email: Accepted login email
+        password: Accepted login password
+        token_ttl: Lifetime of issued JWTs in seconds
+        latency: Seconds added before every response
+        bandwidth: Bytes per second each connection may send or receive
+            (None for unlimited); request and response bodies are throttled
+        upload_token: Token accepted by /upload/direct
+        direct_chunk_size: Chunk size used to store direct uploads
+    """
+
+    def __init__(
+        self,
+        email: str = "user@example.com",
+        password: str = "password",
+        token_ttl: float = 3600,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        upload_token: str = "upload-token",
+        direct_chunk_size: int = 1 << 20,
+    ) -> None:
+        self.email = email
+        self.password = password
+        self.token_ttl = token_ttl
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.upload_token = upload_token
+        self.direct_chunk_size = direct_chunk_size
+        self.files: Dict[int, _StoredFile] = {}
+        self.metadata: List[Dict[str, Any]] = []
+        self.login_count = 0
+        self.request_counts: Dict[str, int] = {}
+        self.fail_next: Dict[str, List[int]] = {}
+        self._tokens: Dict[str, float] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._host = host
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self._host}:{self._httpd.server_port}"
+
+    def start(self) -> "FakeTSFServer":
+        # 短いポーリング間隔で stop() をすぐ返す (テストごとにサーバーを立てるため)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeTSFServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Helpers for tests
+    # ------------------------------------------------------------------
+
+    def issue_token(self, ttl: Optional[float] = None) -> str:
+        token = make_jwt(self.email, self.token_ttl if ttl is None else ttl)
+        with self._lock:
+            self._tokens[token] = time.time() + (self.token_ttl if ttl is None else ttl)
+        return token
+
+    def revoke_tokens(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+    def add_file(self, data: bytes, original_path: str = "seeded.bin", chunk_size: int = 1 << 20) -> int:
+        """Store ``data`` split into independently encrypted chunks and return its fileId."""
+        with self._lock:
+            file_id = self._next_id
+            self._next_id += 1
+        stored = _StoredFile(original_path, hashlib.md5(data).hexdigest())
+        pieces = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b""]
+        for index, piece in enumerate(pieces):
+            encrypted, key, iv = _encrypt_part(piece)
+            stored.parts[index] = encrypted
+            stored.keys.append(key)
+            stored.ivs.append(iv)
+        stored.part_count = len(pieces)
+        stored.confirmed = True
+        with self._lock:
+            self.files[file_id] = stored
+        return file_id
+
+    def plaintext(self, file_id: int) -> bytes:
+        """Decrypt a stored object the way a correct client would."""
+        stored = self.files[file_id]
+        out = []
+        for index in range(stored.part_count):
+            key = base64.b64decode(stored.keys[index])
+            iv = base64.b64decode(stored.ivs[index])
+            out.append(unpad(AES.new(key, AES.MODE_CBC, iv).decrypt(stored.parts[index]), AES.block_size))
+        return b"".join(out)
+
+    def fail(self, route: str, *statuses: int) -> None:
+        """Make the next requests to ``route`` answer with ``statuses`` in order."""
+        with self._lock:
+            self.fail_next.setdefault(route, []).extend(statuses)
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def _make_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = bytearray()
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return bytes(body)
+                        body += self.rfile.read(size)
+                        self.rfile.readline()
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _throttle(self, nbytes: int) -> None:
+                if server.bandwidth:
+                    time.sleep(nbytes / server.bandwidth)
+
+            def _send(self, status: int, body: bytes = b"", content_type: str = "application/json",
+                      headers: Optional[Dict[str, str]] = None) -> None:
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command == "HEAD":
+                    return
+                view = memoryview(body)
+                step = 64 * 1024
+                for offset in range(0, len(body), step):
+                    piece = view[offset:offset + step]
+                    self._throttle(len(piece))
+                    self.wfile.write(piece)
+
+            def _json(self, status: int, obj: Any) -> None:
+                self._send(status, json.dumps(obj).encode())
+
+            def _authorized(self) -> bool:
+                auth = self.headers.get("Authorization", "")
+                token = auth[7:] if auth.startswith("Bearer ") else ""
+                with server._lock:
+                    expires = server._tokens.get(token)
+                if expires is None or expires < time.time():
+                    self._json(401, {"error": "Unauthorized"})
+                    return False
+                return True
+
+            def _dispatch(self) -> None:
+                path = self.path.split("?", 1)[0]
+                route = path.strip("/").split("/")
+                key = f"{self.command} /{route[0]}"
+                with server._lock:
+                    server.request_counts[key] = server.request_counts.get(key, 0) + 1
+                    pending = server.fail_next.get(key)
+                    forced = pending.pop(0) if pending else None
+                body = self._read_body() if self.command in ("POST", "PUT") else b""
+                self._throttle(len(body))
+                if forced is not None:
+                    self._json(forced, {"error": "injected failure"})
+                    return
+                handler = getattr(self, f"_{self.command.lower()}_{route[0].replace('-', '_')}", None)
+                if handler is None:
+                    self._json(404, {"error": "Not found"})
+                    return
+                handler(route[1:], body)
+
+            do_GET = do_POST = do_PUT = do_HEAD = _dispatch
+
+            # /auth/login
+            def _post_auth(self, rest: List[str], body: bytes) -> None:
+                payload = json.loads(body or b"{}")
+                if rest != ["login"]:
+                    self._json(404, {"error": "Not found"})
+                    return
+                with server._lock:
+                    server.login_count += 1
+                if payload.get("email") != server.email or payload.get("password") != server.password:
+                    self._json(401, {"error": "Invalid credentials"})
+                    return
+                self._json(200, {"token": server.issue_token()})
+
+            # /upload/signed, /upload/signed/confirm
+            def _post_upload(self, rest: List[str], body: bytes) -> None:
+                if rest == ["direct"]:
+                    self._upload_direct(body)
+                    return
+                if not self._authorized():
+                    return
+                payload = json.loads(body or b"{}")
+                if rest == ["signed"]:
+                    self._upload_signed(payload)
+                elif rest == ["signed", "confirm"]:
+                    self._upload_confirm(payload)
+                else:
+                    self._json(404, {"error": "Not found"})
+
+            def _upload_direct(self, body: bytes) -> None:
+                if self.headers.get("Authorization") != f"Bearer {server.upload_token}":
+                    self._json(401, {"error": "Invalid upload token"})
+                    return
+                head = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode()
+                form = BytesParser(policy=HTTP).parsebytes(head + body)
+                fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+                file_part = fields.get("file")
+                if file_part is None:
+                    self._json(400, {"error": "Missing file"})
+                    return
+                data = cast(bytes, file_part.get_payload(decode=True) or b"")
+                filename = file_part.get_filename() or "upload.bin"
+                file_id = server.add_file(data, filename, server.direct_chunk_size)
+                self._json(200, {"success": True, "fileId": file_id, "filename": filename, "size": len(data)})
+
+            def _upload_signed(self, payload: Dict[str, Any]) -> None:
+                original_path = str(payload.get("originalPath") or "")
+                with server._lock:
+                    if any(f.original_path == original_path for f in server.files.values()):
+                        conflict = True
+                    else:
+                        conflict = False
+                        file_id = server._next_id
+                        server._next_id += 1
+                if conflict:
+                    self._json(409, {"error": f"{original_path} already exists"})
+                    return
+                stored = _StoredFile(original_path, payload.get("md5", ""))
+                count = int(payload.get("chunkCount") or 1)
+                stored.part_count = count
+                stored.extra = {k: v for k, v in payload.items() if k not in ("originalPath", "md5", "chunkCount")}
+                for _ in range(count):
+                    stored.keys.append(base64.b64encode(os.urandom(32)).decode())
+                    stored.ivs.append(base64.b64encode(os.urandom(16)).decode())
+                with server._lock:
+                    server.files[file_id] = stored
+                urls = [f"{server.base_url}/storage/{file_id}/{i}" for i in range(count)]
+                response = {
+                    "fileId": file_id,
+                    "signedUrl": urls[0],
+                    "aesKeyBase64": stored.keys[0],
+                    "ivBase64": stored.ivs[0],
+                    "algorithm": "aes-256-cbc",
+                }
+                if "chunkCount" in payload:
+                    response.update({"signedUrls": urls, "aesKeysBase64": stored.keys, "ivsBase64": stored.ivs})
+                self._json(200, response)
+
+            def _upload_confirm(self, payload: Dict[str, Any]) -> None:
+                stored = server.files.get(int(payload.get("fileId", 0)))
+                if stored is None:
+                    self._json(404, {"error": "Unknown file"})
+                    return
+                if len(stored.parts) != stored.part_count:
+                    self._json(400, {"error": "Upload incomplete"})
+                    return
+                stored.confirmed = True
+                self._json(200, {"success": True, "filesize": stored.encrypted_size()})
+
+            # signed storage URLs
+            def _put_storage(self, rest: List[str], body: bytes) -> None:
+                stored = server.files.get(int(rest[0]))
+                if stored is None:
+                    self._json(404, {"error": "Unknown file"})
+                    return
+                stored.parts[int(rest[1])] = body
+                self._send(200)
+
+            def _get_storage(self, rest: List[str], body: bytes) -> None:
+                stored = server.files.get(int(rest[0]))
+                part = stored.parts.get(int(rest[1])) if stored else None
+                if part is None:
+                    self._json(404, {"error": "Unknown chunk"})
+                    return
+                byte_range = self._parse_range(len(part))
+                if byte_range is None:
+                    self._send(200, part, "application/octet-stream", {"Accept-Ranges": "bytes"})
+                    return
+                start, end = byte_range
+                if start > end:
+                    self._send(416, headers={"Content-Range": f"bytes */{len(part)}"})
+                    return
+                self._send(206, part[start:end + 1], "application/octet-stream",
+                           {"Content-Range": f"bytes {start}-{end}/{len(part)}", "Accept-Ranges": "bytes"})
+
+            def _parse_range(self, size: int) -> Optional[Tuple[int, int]]:
+                """Single ``bytes=`` range as inclusive (start, end); start > end if unsatisfiable."""
+                header = self.headers.get("Range", "")
+                if not header.startswith("bytes=") or "," in header:
+                    return None
+                first, _, last = header[6:].strip().partition("-")
+                try:
+                    if not first:
+                        return max(0, size - int(last)), size - 1
+                    start = int(first)
+                    end = min(int(last), size - 1) if last else size - 1
+                except ValueError:
+                    return None
+                return (start, end) if start < size else (1, 0)
+
+            _head_storage = _get_storage
+
+            # /download/:fileId
+            def _get_download(self, rest: List[str], body: bytes) -> None:
+                if not self._authorized():
+                    return
+                stored = server.files.get(int(rest[0]))
+                if stored is None or not stored.confirmed:
+                    self._json(404, {"error": "File not found"})
+                    return
+                response = {
+                    "urls": [f"{server.base_url}/storage/{rest[0]}/{i}" for i in range(stored.part_count)],
+                    "keys": stored.keys,
+                    "ivs": stored.ivs,
+                    "algorithm": "aes-256-cbc",
+                    "md5": stored.md5,
+                }
+                response.update(stored.extra)
+                self._json(200, response)
+
+            # /files
+            def _get_files(self, rest: List[str], body: bytes) -> None:
+                if not self._authorized():
+                    return
+                with server._lock:
+                    listing = [
+                        {"id": file_id, "originalPath": f.original_path, "md5": f.md5,
+                         "filesize": f.encrypted_size()}
+                        for file_id, f in server.files.items() if f.confirmed
+                    ]
+                self._json(200, listing)
+
+            # /metadata, /metadata/query, /metadata/bulk
+            def _post_metadata(self, rest: List[str], body: bytes) -> None:
+                if not self._authorized():
+                    return
+                payload = json.loads(body or b"{}")
+                if rest == []:
+                    self._json(200, {"id": server._store_metadata([payload])[0]})
+                elif rest == ["bulk"]:
+                    ids = server._store_metadata(payload.get("records", []))
+                    self._json(200, {"inserted": len(ids), "ids": ids})
+                elif rest == ["query"]:
+                    self._json(200, server._query_metadata(payload))
+                else:
+                    self._json(404, {"error": "Not found"})
+
+        return Handler
+
+    def _store_metadata(self, records: List[Dict[str, Any]]) -> List[int]:
+        with self._lock:
+            start = len(self.metadata)
+            for offset, record in enumerate(records):
+                self.metadata.append(dict(record, _id=start + offset + 1))
+            return list(range(start + 1, start + len(records) + 1))
+
+    def _query_metadata(self, payload: Dict[str, Any]) -> Any:
+        query = payload.get("query") or {}
+        select = payload.get("select")
+        with self._lock:
+            matches = [r for r in self.metadata if all(r.get(k) == v for k, v in query.items())]
+        if select:
+            matches = [{k: r[k] for k in r if k == "_id" or select.get(k)} for r in matches]
+        if "limit" not in payload:
+            return matches
+        start = int(payload.get("cursor") or 0)
+        end = start + int(payload["limit"])
+        return {"results": matches[start:end], "nextCursor": str(end) if end < len(matches) else None}
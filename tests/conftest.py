@@ -0,0 +1,27 @@
+"""Shared fixtures: an in-process FakeTSFServer and a token for it."""
+
+import pytest
+
+from pytsfiler import TransferScheduler, get_jwt_token
+from pytsfiler.scheduler import set_default_scheduler
+from pytsfiler.testing import FakeTSFServer
+
+
+@pytest.fixture
+def server():
+    with FakeTSFServer() as srv:
+        yield srv
+
+
+@pytest.fixture
+def token(server):
+    return get_jwt_token(server.email, server.password, server.base_url)
+
+
+@pytest.fixture(autouse=True)
+def fast_scheduler():
+    """Give every test a fresh default scheduler with millisecond backoff."""
+    scheduler = TransferScheduler(retry_backoff=0.001)
+    set_default_scheduler(scheduler)
+    yield scheduler
+    set_default_scheduler(None)
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+import requests
+
+from pytsfiler import TokenManager, TSFSession, decode2binary, get_jwt_token, jwt_expiry
+from pytsfiler.testing import make_jwt
+
+
+def test_get_jwt_token_rejects_bad_password(server):
+    with pytest.raises(requests.HTTPError):
+        get_jwt_token(server.email, "wrong", server.base_url)
+
+
+def test_jwt_expiry_reads_exp_claim():
+    assert jwt_expiry(make_jwt("u", 100)) == pytest.approx(time.time() + 100, abs=2)
+    assert jwt_expiry("not-a-jwt") is None
+
+
+def test_token_manager_caches_token(server):
+    tokens = TokenManager(server.email, server.password, server.base_url)
+    assert tokens.get_token() == tokens.get_token()
+    assert tokens.login_count == 1
+
+
+def test_token_manager_renews_near_expiry(server):
+    server.token_ttl = 30
+    tokens = TokenManager(server.email, server.password, server.base_url, refresh_margin=60)
+    first = tokens.get_token()
+    assert tokens.get_token() != first
+    assert tokens.login_count == 2
+
+
+def test_session_replays_401_with_fresh_token(server):
+    data = b"payload"
+    file_id = server.add_file(data)
+    tokens = TokenManager(server.email, server.password, server.base_url)
+    stale = tokens.get_token()
+    server.revoke_tokens()
+    with TSFSession(token_manager=tokens) as session:
+        assert decode2binary(file_id, stale, server.base_url, session=session) == data
+    assert tokens.login_count == 2
@@ -0,0 +1,58 @@
+import os
+
+from pytsfiler import download_many, upload_many
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_upload_many_dedups_by_md5(server, token, tmp_path):
+    same = os.urandom(3000)
+    items = [
+        (_write(tmp_path, "a", same), "a"),
+        (_write(tmp_path, "b", same), "b"),
+        (_write(tmp_path, "c", os.urandom(100)), "c"),
+    ]
+    results = upload_many(items, token, server.base_url, max_workers=3)
+    statuses = sorted(r.status for r in results)
+    assert statuses == ["duplicate", "uploaded", "uploaded"]
+    duplicate = next(r for r in results if r.status == "duplicate")
+    owner = next(r for r in results if r.original_path == duplicate.duplicate_of)
+    assert duplicate.ok and duplicate.file_id == owner.file_id
+    assert len(server.files) == 2
+
+
+def test_upload_many_failed_owner_hands_md5_to_duplicate(server, token, tmp_path):
+    same = os.urandom(3000)
+    items = [(_write(tmp_path, "ma", same), "ma"), (_write(tmp_path, "mb", same), "mb")]
+    # 最初のアップロードの PUT だけ失敗させる
+    server.fail("PUT /storage", 400)
+    results = upload_many(items, token, server.base_url, max_workers=1)
+    assert [(r.original_path, r.status, r.ok) for r in results] == [("ma", "failed", False), ("mb", "uploaded", True)]
+    assert server.plaintext(results[1].file_id) == same
+
+
+def test_upload_many_reports_409_as_exists(server, token, tmp_path):
+    server.add_file(b"old", "taken.txt")
+    results = upload_many([(_write(tmp_path, "t", b"new"), "taken.txt")], token, server.base_url)
+    assert results[0].status == "exists" and results[0].ok
+
+
+def test_download_many_returns_every_id(server, token):
+    files = {server.add_file(os.urandom(n), f"f{n}", chunk_size=1000): n for n in (10, 2500, 4000)}
+    results = list(download_many(list(files) + [next(iter(files))], token, server.base_url, max_workers=3))
+    assert len(results) == 4
+    assert all(r.ok for r in results)
+    assert sorted(len(r.data) for r in results) == sorted(list(files.values()) + [10])
+    assert sum(r.shared for r in results) == 1
+    assert server.request_counts["GET /download"] == 3
+
+
+def test_download_many_reports_failures_per_file(server, token):
+    good = server.add_file(b"fine", "good")
+    results = {r.file_id: r for r in download_many([good, 999], token, server.base_url)}
+    assert results[good].data == b"fine"
+    assert not results[999].ok and results[999].error is not None
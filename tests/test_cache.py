@@ -0,0 +1,72 @@
+import os
+
+from pytsfiler import DownloadCache, decode2binary
+
+
+def test_cache_hit_skips_network(server, token, tmp_path):
+    data = os.urandom(5000)
+    file_id = server.add_file(data, "a.bin")
+    cache = DownloadCache(str(tmp_path / "cache"), max_bytes=1 << 20)
+    assert decode2binary(file_id, token, server.base_url, cache=cache) == data
+    downloads = server.request_counts["GET /download"]
+    assert decode2binary(file_id, token, server.base_url, cache=cache) == data
+    assert server.request_counts["GET /download"] == downloads
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=250)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    assert cache.get("a") is not None
+    cache.put("c", b"c" * 100)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.stats.evictions == 1
+
+
+def test_cache_index_survives_reopen(tmp_path):
+    DownloadCache(str(tmp_path), max_bytes=1000).put("a", b"payload")
+    reopened = DownloadCache(str(tmp_path), max_bytes=1000)
+    assert reopened.get("a") == b"payload"
+    assert reopened.stats.bytes == len(b"payload")
+
+
+def test_cache_skips_oversized_payload(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"x" * 11)
+    assert cache.get("a") is None
+
+
+def test_cache_removes_stale_temp_files_on_open(tmp_path):
+    stale = tmp_path / "tmpdead.tmp"
+    live = tmp_path / "tmplive.tmp"
+    stale.write_bytes(b"partial")
+    live.write_bytes(b"partial")
+    old = os.path.getmtime(stale) - 3600
+    os.utime(stale, (old, old))
+    cache = DownloadCache(str(tmp_path), max_bytes=1000)
+    assert not stale.exists()
+    assert live.exists()
+    assert cache.stats.bytes == 0
+
+
+def test_cache_codec_never_read_from_the_payload(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=1000)
+    payload = b"TSFC1:zlib\nuser payload"
+    cache.put("a", payload)
+    cache.put("b", payload, codec="zstd")
+    cache.put("c", payload, codec="")
+    reopened = DownloadCache(str(tmp_path), max_bytes=1000)
+    assert reopened.get_entry("a") == (payload, None)
+    assert reopened.get_entry("b") == (payload, "zstd")
+    assert reopened.get_entry("c") == (payload, "")
+    assert reopened.stats.bytes == 3 * len(payload)
+
+
+def test_cache_replacing_an_entry_with_another_codec_keeps_one_file(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=1000)
+    cache.put("a", b"old")
+    cache.put("a", b"new", codec="zlib")
+    assert cache.get_entry("a") == (b"new", "zlib")
+    assert len(list(tmp_path.iterdir())) == 1
+    assert DownloadCache(str(tmp_path), max_bytes=1000).get_entry("a") == (b"new", "zlib")
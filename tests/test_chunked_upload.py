@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from pytsfiler import UploadError, decode2binary, upload_binary_chunked, upload_file_chunked
+
+
+def test_chunked_upload_round_trip(server, token):
+    data = os.urandom(10 * 1000 + 1)
+    result = upload_binary_chunked(data, "a.bin", token, server.base_url, part_size=1000, max_workers=4)
+    assert result["parts"] == 11
+    assert decode2binary(result["fileId"], token, server.base_url, max_workers=4) == data
+
+
+def test_chunked_file_upload(server, token, tmp_path):
+    data = os.urandom(3000)
+    path = tmp_path / "in.bin"
+    path.write_bytes(data)
+    result = upload_file_chunked(str(path), "a.bin", token, server.base_url, part_size=1000)
+    assert result["parts"] == 3
+    assert server.plaintext(result["fileId"]) == data
+
+
+def test_failed_part_is_retried_alone(server, token):
+    data = os.urandom(4000)
+    server.fail("PUT /storage", 503, 500)
+    result = upload_binary_chunked(data, "a.bin", token, server.base_url, part_size=1000, max_workers=1, retry_backoff=0.001)
+    assert server.request_counts["PUT /storage"] == 4 + 2
+    assert server.plaintext(result["fileId"]) == data
+
+
+def test_part_that_keeps_failing_raises(server, token):
+    server.fail("PUT /storage", *[503] * 10)
+    with pytest.raises(UploadError):
+        upload_binary_chunked(os.urandom(100), "a.bin", token, server.base_url, part_size=1000,
+                              max_retries=2, retry_backoff=0.001)
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from pytsfiler import cli
+
+
+@pytest.fixture
+def env(server, monkeypatch):
+    monkeypatch.setenv("PYTSFILER_BASE_URL", server.base_url)
+    monkeypatch.setenv("PYTSFILER_EMAIL", server.email)
+    monkeypatch.setenv("PYTSFILER_PASSWORD", server.password)
+    monkeypatch.setenv("PYTSFILER_RETRY_DELAY", "0.001")
+    return server
+
+
+def _run(*argv):
+    return cli.main(list(argv) + ["--no-progress"])
+
+
+def test_put_then_get(env, tmp_path, capsys):
+    source = tmp_path / "a.txt"
+    source.write_bytes(b"alpha")
+    assert _run("put", str(source), "--prefix", "docs") == 0
+    file_id, remote = capsys.readouterr().out.strip().split("\t")
+    assert remote == "docs/a.txt"
+
+    out_dir = tmp_path / "out"
+    assert _run("get", file_id, "-o", str(out_dir), "--original-paths", "--verify") == 0
+    assert (out_dir / "docs" / "a.txt").read_bytes() == b"alpha"
+
+
+def test_summary_on_stdout_moves_file_lines_to_stderr(env, tmp_path, capsys):
+    source = tmp_path / "a.txt"
+    source.write_bytes(b"alpha")
+    assert _run("put", str(source), "--summary", "-") == 0
+    captured = capsys.readouterr()
+    summary = json.loads(captured.out)
+    assert summary["ok"] and summary["totals"]["files"] == 1
+    assert captured.err.strip().endswith("\ta.txt")
+
+
+@pytest.mark.parametrize("argv", [["get", "1", "-o", "-"], ["ls"], ["meta", "query", "{}"]])
+def test_summary_on_stdout_rejected_when_stdout_carries_data(env, argv, capsys):
+    with pytest.raises(SystemExit) as info:
+        _run(*argv, "--summary", "-")
+    assert info.value.code == 2
+
+
+def test_malformed_env_number_is_reported_without_traceback(env, monkeypatch, capsys):
+    monkeypatch.setenv("PYTSFILER_RETRY_LIMIT", "three")
+    assert _run("ls") == 2
+    err = capsys.readouterr().err
+    assert "PYTSFILER_RETRY_LIMIT" in err and "Traceback" not in err
+
+
+def test_retry_delay_sets_the_backoff_base(env, monkeypatch):
+    monkeypatch.setenv("PYTSFILER_RETRY_DELAY", "0.25")
+    args = cli.build_parser().parse_args(["ls"])
+    ctx = cli.Context(args)
+    try:
+        assert ctx.session.scheduler.retry_backoff == 0.25
+    finally:
+        ctx.close()
+
+
+def test_verify_ssl_applies_to_login(env, monkeypatch):
+    monkeypatch.setenv("PYTSFILER_VERIFY_SSL", "false")
+    ctx = cli.Context(cli.build_parser().parse_args(["ls"]))
+    verify = []
+    request = ctx.session.http.request
+
+    def recording(method, url, **kwargs):
+        verify.append(kwargs.get("verify"))
+        return request(method, url, **kwargs)
+
+    monkeypatch.setattr(ctx.session.http, "request", recording)
+    try:
+        assert ctx.token
+        cli.cmd_ls(ctx, cli.build_parser().parse_args(["ls"]))
+    finally:
+        ctx.close()
+    assert verify and all(v is False for v in verify)
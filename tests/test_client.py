@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from pytsfiler.client import TSFClient, TSFConfig  # noqa: E402
+from pytsfiler.exceptions import TSFError  # noqa: E402
+
+
+def test_client_built_outside_event_loop(server):
+    # 構築時にはイベントループが無く、使うのは asyncio.run が作るループ
+    client = TSFClient(TSFConfig(base_url=server.base_url, max_concurrent_transfers=2))
+    data = os.urandom(50000)
+
+    async def main():
+        async with client:
+            await client.authenticate(server.email, server.password)
+            result = await client.upload_bytes(data, "a.bin")
+            return await client.download(result.file_id)
+
+    assert asyncio.run(main()) == data
+
+
+def test_client_reopened_in_another_loop(server):
+    data = os.urandom(10 * 1000)
+    file_id = server.add_file(data, "seeded.bin", chunk_size=1000)
+    client = TSFClient(TSFConfig(base_url=server.base_url, max_concurrent_transfers=2))
+
+    async def main():
+        async with client:
+            await client.authenticate(server.email, server.password)
+            return await client.download(file_id)
+
+    # 転送数の上限で待たされるため、セマフォが最初のループに束縛されていれば 2 回目で失敗する
+    assert asyncio.run(main()) == data
+    assert asyncio.run(main()) == data
+
+
+def test_client_requires_open():
+    client = TSFClient(token="t")
+    with pytest.raises(TSFError):
+        asyncio.run(client.download(1))
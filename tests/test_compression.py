@@ -0,0 +1,50 @@
+import pytest
+
+from pytsfiler import DownloadCache, decode2binary, decode2stream, iter_pipelined, putMetaData, upload_binary
+from pytsfiler import compression
+
+DATA = b"timestamp,value\n" + b"".join(b"%d,%d\n" % (i, i % 7) for i in range(20000))
+
+
+@pytest.fixture
+def compressed(server, token):
+    result = upload_binary(DATA, "day.csv", token, server.base_url, compress="zlib")
+    assert result["compression"] == "zlib"
+    return result["fileId"]
+
+
+def _metadata_queries(server):
+    return server.request_counts.get("POST /metadata", 0)
+
+
+def test_auto_uses_the_codec_from_the_download_info(server, token, compressed):
+    before = _metadata_queries(server)
+    assert decode2binary(compressed, token, server.base_url, decompress="auto") == DATA
+    assert b"".join(decode2stream(compressed, token, server.base_url, decompress="auto")) == DATA
+    assert b"".join(iter_pipelined(compressed, token, server.base_url, decompress="auto")) == DATA
+    assert _metadata_queries(server) == before
+
+
+def test_plain_download_is_not_decompressed_and_sends_no_query(server, token, compressed):
+    before = _metadata_queries(server)
+    stored = decode2binary(compressed, token, server.base_url)
+    assert _metadata_queries(server) == before
+    assert len(stored) < len(DATA)
+    assert compression.decompress(stored, "zlib") == DATA
+
+
+def test_files_without_recorded_codec_fall_back_to_metadata(server, token):
+    file_id = server.add_file(compression.compress(DATA, "zlib"), "old.csv")
+    record = compression.metadata_record(file_id, "zlib", len(DATA))
+    putMetaData(token, server.base_url, record).raise_for_status()
+    assert decode2binary(file_id, token, server.base_url, decompress="auto") == DATA
+
+
+def test_cache_hit_keeps_the_codec(server, token, compressed, tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=1 << 22)
+    assert decode2binary(compressed, token, server.base_url, cache=cache, decompress="auto") == DATA
+    downloads, queries = server.request_counts["GET /download"], _metadata_queries(server)
+    assert decode2binary(compressed, token, server.base_url, cache=cache, decompress="auto") == DATA
+    assert decode2binary(compressed, token, server.base_url, cache=cache) != DATA
+    assert (server.request_counts["GET /download"], _metadata_queries(server)) == (downloads, queries)
+    assert DownloadCache(str(tmp_path), max_bytes=1 << 22).get_entry(str(compressed))[1] == "zlib"
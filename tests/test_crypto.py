@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from pytsfiler import crypto
+
+
+@pytest.mark.parametrize("name", crypto.available_backends())
+@pytest.mark.parametrize("size", [0, 1, 15, 16, 17, 4096 + 5])
+def test_backend_round_trip(name, size):
+    backend = crypto.get_backend(name)
+    key, iv, data = os.urandom(32), os.urandom(16), os.urandom(size)
+    encrypted = backend.encrypt_padded(key, iv, data)
+    assert len(encrypted) == crypto.padded_length(size)
+    assert bytes(crypto.strip_padding(backend.decrypt(key, iv, bytes(encrypted)))) == data
+
+
+def test_backends_interoperate():
+    names = crypto.available_backends()
+    if len(names) < 2:
+        pytest.skip("needs both cryptography and pycryptodome")
+    key, iv, data = os.urandom(32), os.urandom(16), os.urandom(1000)
+    encrypted = bytes(crypto.get_backend(names[0]).encrypt_padded(key, iv, data))
+    assert bytes(crypto.strip_padding(crypto.get_backend(names[1]).decrypt(key, iv, encrypted))) == data
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        crypto.set_backend("rot13")
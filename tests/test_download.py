@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from pytsfiler import decode2binary, decode2stream, download_to_file
+
+
+@pytest.fixture
+def stored(server):
+    data = os.urandom(5 * 4096 + 123)
+    return server.add_file(data, "a.bin", chunk_size=4096), data
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_decode2binary_round_trip(server, token, stored, max_workers):
+    file_id, data = stored
+    assert decode2binary(file_id, token, server.base_url, max_workers=max_workers) == data
+
+
+def test_decode2binary_empty_file(server, token):
+    file_id = server.add_file(b"", "empty.bin")
+    assert decode2binary(file_id, token, server.base_url) == b""
+
+
+def test_decode2binary_rejects_bad_max_workers(server, token, stored):
+    with pytest.raises(ValueError):
+        decode2binary(stored[0], token, server.base_url, max_workers=0)
+
+
+def test_decode2stream_matches_decode2binary(server, token, stored):
+    file_id, data = stored
+    blocks = list(decode2stream(file_id, token, server.base_url, buffer_size=1000))
+    assert b"".join(blocks) == data
+    assert max(len(b) for b in blocks) <= 1000 + 16
+
+
+def test_decode2stream_rejects_small_buffer(server, token, stored):
+    with pytest.raises(ValueError):
+        list(decode2stream(stored[0], token, server.base_url, buffer_size=8))
+
+
+def test_download_to_file(server, token, stored, tmp_path):
+    file_id, data = stored
+    path = tmp_path / "out.bin"
+    assert download_to_file(file_id, str(path), token, server.base_url) == len(data)
+    assert path.read_bytes() == data
+    assert not (tmp_path / "out.bin.part").exists()
+
+
+def test_download_to_file_failure_leaves_nothing(server, token, stored, tmp_path):
+    file_id, _ = stored
+    server.files[file_id].parts[2] = b"x" * 17
+    path = tmp_path / "out.bin"
+    with pytest.raises(ValueError):
+        download_to_file(file_id, str(path), token, server.base_url)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import pytsfiler
+
+HEAVY_MODULES = ("requests", "urllib3", "Crypto", "cryptography", "aiohttp", "zstandard")
+
+
+def _loaded_after(statement):
+    code = (
+        "import json, sys\n"
+        f"{statement}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, env=env)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def test_plain_import_loads_no_heavy_module():
+    assert _loaded_after("import pytsfiler") == []
+
+
+def test_exceptions_and_config_stay_light():
+    assert _loaded_after("from pytsfiler import TSFError, IntegrityError, DEFAULT_CONFIG") == []
+
+
+def test_first_use_imports_the_submodule():
+    assert "requests" in _loaded_after("from pytsfiler import decode2binary")
+
+
+@pytest.mark.parametrize("name", pytsfiler.__all__)
+def test_every_exported_name_resolves(name):
+    assert getattr(pytsfiler, name) is not None
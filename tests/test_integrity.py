@@ -0,0 +1,102 @@
+import pytest
+
+from pytsfiler import (
+    IntegrityError, PaddingError, TSFSession, decode2binary, decode2stream, iter_pipelined, upload_binary_chunked,
+)
+from pytsfiler.integrity import _Verifier
+
+
+def _verifier():
+    return _Verifier("f", {"chunkMd5s": ["0" * 32]}, 1, None)
+
+
+def test_padding_error_is_fetched_again_then_reported():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        raise PaddingError("Padding error. Possibly incorrect key/IV or corrupted data.")
+
+    with pytest.raises(IntegrityError) as info:
+        _verifier().fetch_verified(0, fetch)
+    assert info.value.chunk_index == 0
+    assert len(calls) == 2
+
+
+def test_other_value_errors_are_not_integrity_failures():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        raise ValueError("Unsupported algorithm: rot13")
+
+    with pytest.raises(ValueError, match="Unsupported algorithm") as info:
+        _verifier().fetch_verified(0, fetch)
+    assert not isinstance(info.value, IntegrityError)
+    assert len(calls) == 1
+
+
+DATA = bytes(range(256)) * 40
+
+
+def _corrupt(ciphertext):
+    # 先頭ブロックを壊す: パディングは無事なので復号は通り、MD5 だけが合わなくなる
+    return bytes([ciphertext[0] ^ 0xFF]) + ciphertext[1:]
+
+
+@pytest.fixture
+def chunked(server, token):
+    return upload_binary_chunked(DATA, "v.bin", token, server.base_url, part_size=1024)["fileId"]
+
+
+def test_corrupt_chunk_is_named(server, token, chunked):
+    server.files[chunked].parts[2] = _corrupt(server.files[chunked].parts[2])
+    before = server.request_counts.get("GET /storage", 0)
+    with pytest.raises(IntegrityError) as info:
+        decode2binary(chunked, token, server.base_url, verify=True)
+    assert info.value.chunk_index == 2
+    assert info.value.expected != info.value.actual
+    # 逐次モードではチャンク 0-2 を 1 回ずつと、壊れたチャンク 2 の取り直し 1 回で止まる
+    assert server.request_counts["GET /storage"] - before == 3 + 1
+
+
+def test_corruption_passes_unnoticed_without_verify(server, token, chunked):
+    server.files[chunked].parts[2] = _corrupt(server.files[chunked].parts[2])
+    assert decode2binary(chunked, token, server.base_url) != DATA
+
+
+def test_streaming_raises_without_refetch(server, token, chunked):
+    server.files[chunked].parts[1] = _corrupt(server.files[chunked].parts[1])
+    with pytest.raises(IntegrityError) as info:
+        b"".join(decode2stream(chunked, token, server.base_url, verify=True))
+    assert info.value.chunk_index == 1
+
+
+def test_whole_file_md5_without_chunk_digests(server, token):
+    file_id = server.add_file(DATA, "w.bin", chunk_size=1024)
+    server.files[file_id].parts[3] = _corrupt(server.files[file_id].parts[3])
+    with pytest.raises(IntegrityError) as info:
+        decode2binary(file_id, token, server.base_url, verify=True)
+    assert info.value.chunk_index is None
+
+
+@pytest.mark.parametrize("download", [
+    lambda *args, **kwargs: decode2binary(*args, max_workers=4, **kwargs),
+    lambda *args, **kwargs: b"".join(bytes(c) for c in iter_pipelined(*args, fetch_workers=4, **kwargs)),
+])
+def test_transient_corruption_is_fetched_again(server, token, chunked, monkeypatch, download):
+    bad_url = f"{server.base_url}/storage/{chunked}/2"
+    with TSFSession() as session:
+        request = session.http.request
+        corrupted = []
+
+        def flaky(method, url, **kwargs):
+            response = request(method, url, **kwargs)
+            if url == bad_url and not corrupted:
+                corrupted.append(url)
+                response._content = _corrupt(response.content)
+            return response
+
+        monkeypatch.setattr(session.http, "request", flaky)
+        assert download(chunked, token, server.base_url, session=session, verify=True) == DATA
+    assert corrupted == [bad_url]
@@ -0,0 +1,64 @@
+import time
+
+import requests
+
+from pytsfiler import MetadataQueryCache, TSFSession, iter_metadata, putMetaData, put_metadata_many, queryMetaData
+
+
+def test_put_and_query(server, token):
+    putMetaData(token, server.base_url, {"type": "t", "n": 1}).raise_for_status()
+    response = queryMetaData(token, {"type": "t"}, server.base_url)
+    assert [r["n"] for r in response.json()] == [1]
+
+
+def test_iter_metadata_pages(server, token):
+    result = put_metadata_many(token, server.base_url, ({"type": "t", "n": i} for i in range(25)), batch_size=10)
+    assert result.ok and result.written == 25 and result.batches == 3
+    records = list(iter_metadata(token, {"type": "t"}, server.base_url, page_size=7))
+    assert sorted(r["n"] for r in records) == list(range(25))
+    assert server.request_counts["POST /metadata"] == 3 + 4
+
+
+def test_every_call_follows_the_session_verify_setting(monkeypatch):
+    calls = []
+    with TSFSession() as session:
+        session.http.verify = "/path/to/ca.pem"
+        monkeypatch.setattr(session.http, "request", lambda method, url, **kwargs: calls.append(kwargs) or _ok())
+        base_url = "https://tsf.invalid"
+        putMetaData("jwt", base_url, {"type": "t"}, session=session)
+        queryMetaData("jwt", {"type": "t"}, base_url, session=session)
+        list(iter_metadata("jwt", {"type": "t"}, base_url, session=session))
+        put_metadata_many("jwt", base_url, [{"type": "t"}], session=session)
+    assert [call["verify"] for call in calls] == ["/path/to/ca.pem"] * 4
+
+
+def _ok():
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"[]"
+    return response
+
+
+def test_query_cache_hits_and_write_invalidates(server, token):
+    cache = MetadataQueryCache(ttl=60)
+    with TSFSession(metadata_cache=cache) as session:
+        putMetaData(token, server.base_url, {"type": "t", "n": 1}, session=session)
+        first = queryMetaData(token, {"type": "t"}, server.base_url, session=session)
+        again = queryMetaData(token, {"type": "t"}, server.base_url, session=session)
+        assert again.json() == first.json()
+        assert server.request_counts["POST /metadata"] == 2
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+        putMetaData(token, server.base_url, {"type": "t", "n": 2}, session=session)
+        fresh = queryMetaData(token, {"type": "t"}, server.base_url, session=session)
+        assert [r["n"] for r in fresh.json()] == [1, 2]
+        assert server.request_counts["POST /metadata"] == 4
+
+
+def test_query_cache_expires_and_evicts():
+    cache = MetadataQueryCache(ttl=0.01, max_entries=2)
+    for i in range(3):
+        cache.put(str(i), _ok())
+    assert cache.get("0") is None and cache.stats.evictions == 1
+    time.sleep(0.02)
+    assert cache.get("2") is None
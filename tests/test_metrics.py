@@ -0,0 +1,28 @@
+import pytest
+
+from pytsfiler import PhaseAggregator, decode2binary, set_metrics_sink, upload_binary
+
+
+@pytest.fixture
+def aggregator():
+    aggregator = PhaseAggregator()
+    set_metrics_sink(aggregator)
+    yield aggregator
+    set_metrics_sink(None)
+
+
+def test_transfer_phases_are_recorded(server, token, aggregator):
+    data = b"m" * 10000
+    result = upload_binary(data, "m.bin", token, server.base_url)
+    decode2binary(result["fileId"], token, server.base_url)
+    phases = aggregator.phases
+    for phase in ("signed_url", "encrypt", "signed_put", "confirm", "metadata", "chunk_get", "decrypt", "unpad"):
+        assert phases[phase].count >= 1, phase
+    assert phases["encrypt"].bytes == len(data)
+    assert "chunk_get" in aggregator.summary()
+
+
+def test_nothing_is_recorded_without_a_sink(server, token):
+    aggregator = PhaseAggregator()
+    upload_binary(b"x", "x.bin", token, server.base_url)
+    assert aggregator.phases == {}
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from pytsfiler import download_pipelined, iter_pipelined
+
+
+@pytest.fixture
+def stored(server):
+    data = os.urandom(20 * 1000 + 11)
+    return server.add_file(data, "p.bin", chunk_size=1000), data
+
+
+@pytest.mark.parametrize("fetch_workers,decrypt_workers,buffered", [(1, 1, 1), (8, 2, None), (4, 3, 2)])
+def test_iter_pipelined_matches_input(server, token, stored, fetch_workers, decrypt_workers, buffered):
+    file_id, data = stored
+    chunks = iter_pipelined(
+        file_id, token, server.base_url, fetch_workers=fetch_workers,
+        decrypt_workers=decrypt_workers, max_buffered_chunks=buffered,
+    )
+    assert b"".join(bytes(c) for c in chunks) == data
+
+
+def test_download_pipelined_to_file(server, token, stored, tmp_path):
+    file_id, data = stored
+    target = tmp_path / "out.bin"
+    assert download_pipelined(file_id, str(target), token, server.base_url, fetch_workers=4) == len(data)
+    assert target.read_bytes() == data
+
+
+def test_failure_leaves_no_file(server, token, stored, tmp_path):
+    file_id, _ = stored
+    server.files[file_id].parts[7] = b"x" * 17
+    target = tmp_path / "out.bin"
+    with pytest.raises(ValueError):
+        download_pipelined(file_id, str(target), token, server.base_url, fetch_workers=4)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_closing_early_stops_the_stages(server, token, stored):
+    file_id, data = stored
+    chunks = iter_pipelined(file_id, token, server.base_url, fetch_workers=4, max_buffered_chunks=2)
+    assert bytes(next(chunks)) == data[:1000]
+    chunks.close()
+    assert server.request_counts["GET /storage"] < 20
@@ -0,0 +1,42 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from pytsfiler import TSFFile
+
+
+@pytest.fixture
+def stored(server):
+    data = os.urandom(10 * 1000 + 7)
+    return server.add_file(data, "r.bin", chunk_size=1000), data
+
+
+def test_seek_and_read(server, token, stored):
+    file_id, data = stored
+    with TSFFile(file_id, token, server.base_url, prefetch=0) as f:
+        f.seek(5500)
+        assert f.read(1000) == data[5500:6500]
+        assert f.seek(0, io.SEEK_END) == len(data)
+        f.seek(-3, io.SEEK_END)
+        assert f.read() == data[-3:]
+
+
+def test_zipfile_over_tsffile(server, token):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.txt", "alpha")
+        archive.writestr("b.txt", os.urandom(5000))
+    file_id = server.add_file(buffer.getvalue(), "a.zip", chunk_size=1024)
+    with TSFFile(file_id, token, server.base_url) as f:
+        with zipfile.ZipFile(io.BufferedReader(f)) as archive:
+            assert archive.namelist() == ["a.txt", "b.txt"]
+            assert archive.read("a.txt") == b"alpha"
+
+
+def test_size_probe_is_retried_by_the_scheduler(server, token, stored):
+    file_id, data = stored
+    server.fail("GET /storage", 503)
+    with TSFFile(file_id, token, server.base_url) as f:
+        assert f.size == len(data)
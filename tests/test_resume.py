@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+import requests
+
+from pytsfiler import IntegrityError, download_resumable, upload_binary_chunked, upload_file_resumable
+
+
+def _records(journal_path):
+    with open(journal_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f][1:]
+
+
+def test_download_resumes_after_failure(server, token, tmp_path):
+    data = os.urandom(4 * 1000)
+    file_id = server.add_file(data, chunk_size=1000)
+    path = str(tmp_path / "out.bin")
+
+    # 3 チャンク目が取得できない状態で中断させる
+    missing = server.files[file_id].parts.pop(2)
+    with pytest.raises(requests.HTTPError):
+        download_resumable(file_id, path, token, server.base_url)
+    assert [r["index"] for r in _records(path + ".tsfjournal")] == [0, 1]
+
+    server.files[file_id].parts[2] = missing
+    gets = server.request_counts["GET /storage"]
+    assert download_resumable(file_id, path, token, server.base_url) == len(data)
+    assert open(path, "rb").read() == data
+    assert server.request_counts["GET /storage"] - gets == 2
+    assert not os.path.exists(path + ".tsfjournal")
+
+
+def test_download_drops_stale_records(server, token, tmp_path):
+    data = os.urandom(3 * 1000)
+    file_id = server.add_file(data, chunk_size=1000)
+    path = str(tmp_path / "out.bin")
+    parts = server.files[file_id].parts
+    second = parts.pop(1)
+    with pytest.raises(requests.HTTPError):
+        download_resumable(file_id, path, token, server.base_url)
+    assert len(_records(path + ".tsfjournal")) == 1
+
+    # 部分ファイルが壊れ、有効な記録が 1 つも無い場合も古い記録は消える
+    with open(path + ".part", "r+b") as f:
+        f.write(b"\0" * 10)
+    first = parts.pop(0)
+    with pytest.raises(requests.HTTPError):
+        download_resumable(file_id, path, token, server.base_url)
+    assert _records(path + ".tsfjournal") == []
+
+    parts[0], parts[1] = first, second
+    download_resumable(file_id, path, token, server.base_url)
+    assert open(path, "rb").read() == data
+
+
+def test_upload_resumes_missing_parts(server, token, tmp_path):
+    data = os.urandom(4 * 1000)
+    path = tmp_path / "in.bin"
+    path.write_bytes(data)
+    server.fail("PUT /storage", 400)
+    with pytest.raises(requests.HTTPError):
+        upload_file_resumable(str(path), "a.bin", token, server.base_url, part_size=1000, max_workers=4)
+    puts = server.request_counts["PUT /storage"]
+    result = upload_file_resumable(str(path), "a.bin", token, server.base_url, part_size=1000)
+    assert result["resumedParts"] == 3
+    assert server.request_counts["PUT /storage"] - puts == 1
+    assert server.plaintext(result["fileId"]) == data
+    assert not os.path.exists(str(path) + ".tsfupload")
+
+
+def test_download_decompresses_when_asked(server, token, tmp_path):
+    data = b"row,value\n" * 5000
+    file_id = upload_binary_chunked(data, "rows.csv", token, server.base_url, part_size=1024, compress="zlib")["fileId"]
+    path = str(tmp_path / "rows.csv")
+    assert download_resumable(file_id, path, token, server.base_url, decompress="auto", verify=True) == len(data)
+    assert open(path, "rb").read() == data
+    assert not os.path.exists(path + ".part")
+
+
+def test_download_verify_refetches_only_the_corrupt_chunk(server, token, tmp_path):
+    data = os.urandom(4 * 1024)
+    file_id = upload_binary_chunked(data, "v.bin", token, server.base_url, part_size=1024)["fileId"]
+    parts = server.files[file_id].parts
+    good = parts[2]
+    parts[2] = bytes([good[0] ^ 0xFF]) + good[1:]
+    path = str(tmp_path / "out.bin")
+    with pytest.raises(IntegrityError) as info:
+        download_resumable(file_id, path, token, server.base_url, verify=True)
+    assert info.value.chunk_index == 2
+    assert [r["index"] for r in _records(path + ".tsfjournal")] == [0, 1]
+
+    parts[2] = good
+    gets = server.request_counts["GET /storage"]
+    assert download_resumable(file_id, path, token, server.base_url, verify=True) == len(data)
+    assert open(path, "rb").read() == data
+    assert server.request_counts["GET /storage"] - gets == 2
@@ -0,0 +1,68 @@
+import gc
+
+import pytest
+import requests
+
+from pytsfiler import CircuitOpenError, TransferScheduler, TSFSession, decode2binary
+
+
+@pytest.fixture
+def url(server):
+    file_id = server.add_file(b"s" * 5000, "s.bin", chunk_size=1000)
+    return f"{server.base_url}/storage/{file_id}/0"
+
+
+def test_backoff_is_base_to_the_attempt_with_jitter_and_cap():
+    scheduler = TransferScheduler(retry_backoff=2.0, max_backoff=10.0)
+    for attempt, full in enumerate([1.0, 2.0, 4.0, 8.0]):
+        for _ in range(20):
+            assert full / 2 <= scheduler._backoff(attempt, 2.0, None) <= full
+    assert scheduler._backoff(10, 2.0, None) <= 10.0
+
+
+def test_backoff_honours_retry_after():
+    response = requests.Response()
+    response.headers["Retry-After"] = "3"
+    assert TransferScheduler(retry_backoff=0.001)._backoff(0, 0.001, response) == 3.0
+
+
+def test_retries_server_errors(server, token, url, fast_scheduler):
+    file_id = url.split("/")[-2]
+    server.fail("GET /storage", 503, 502)
+    assert decode2binary(file_id, token, server.base_url) == b"s" * 5000
+    assert fast_scheduler.stats()[server.base_url].retries == 2
+
+
+def test_circuit_opens_after_repeated_failures(server, url):
+    scheduler = TransferScheduler(max_retries=0, failure_threshold=2, reset_timeout=60)
+    server.fail("GET /storage", 500, 500)
+    with requests.Session() as http:
+        for _ in range(2):
+            assert scheduler.request(http, "GET", url).status_code == 500
+        with pytest.raises(CircuitOpenError):
+            scheduler.request(http, "GET", url)
+    assert server.request_counts["GET /storage"] == 2
+
+
+def test_streamed_response_holds_its_slot_until_closed(server, url):
+    scheduler = TransferScheduler()
+    with requests.Session() as http:
+        with scheduler.request(http, "GET", url, stream=True) as response:
+            assert scheduler.stats()[server.base_url].in_flight == 1
+            assert len(response.content) > 0
+        assert scheduler.stats()[server.base_url].in_flight == 0
+
+        scheduler.request(http, "GET", url, stream=True)
+        gc.collect()
+        assert scheduler.stats()[server.base_url].in_flight == 0
+
+
+def test_session_leaves_status_retries_to_its_scheduler(server, url):
+    scheduler = TransferScheduler(max_retries=0)
+    with TSFSession(scheduler=scheduler) as session:
+        assert session.http.get_adapter(url).max_retries.status_forcelist in ((), set())
+        server.fail("GET /storage", 503)
+        assert scheduler.request(session.http, "GET", url).status_code == 503
+    assert server.request_counts["GET /storage"] == 1
+    with TSFSession() as session:
+        assert 503 in session.http.get_adapter(url).max_retries.status_forcelist
@@ -0,0 +1,10 @@
+import os
+
+from pytsfiler import TSFSession, decode2binary, upload_binary
+
+
+def test_session_round_trip_reuses_connections(server, token):
+    data = os.urandom(20000)
+    with TSFSession(pool_maxsize=4) as session:
+        result = upload_binary(data, "a.bin", token, server.base_url, session=session)
+        assert decode2binary(result["fileId"], token, server.base_url, max_workers=4, session=session) == data
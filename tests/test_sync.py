@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from pytsfiler import sync_directory
+from pytsfiler.sync import MANIFEST_NAME
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "docs"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_bytes(b"alpha")
+    (root / "sub" / "b.txt").write_bytes(b"beta")
+    return root
+
+
+def _sync(server, token, root, **kwargs):
+    return sync_directory(str(root), "docs", token, server.base_url, max_workers=2, **kwargs)
+
+
+def test_first_sync_uploads_everything(server, token, tree):
+    result = _sync(server, token, tree)
+    assert result.ok and result.counts == {"uploaded": 2}
+    assert sorted(result.uploaded) == ["a.txt", "sub/b.txt"]
+    assert (tree / MANIFEST_NAME).exists()
+    paths = sorted(f.original_path for f in server.files.values())
+    assert paths == ["docs/a.txt", "docs/sub/b.txt"]
+
+
+def test_second_sync_reads_nothing(server, token, tree):
+    _sync(server, token, tree)
+    result = _sync(server, token, tree)
+    assert result.counts == {"unchanged": 2}
+    assert result.hashed_bytes == 0
+
+
+def test_touched_file_is_not_uploaded_again(server, token, tree):
+    _sync(server, token, tree)
+    st = os.stat(tree / "a.txt")
+    os.utime(tree / "a.txt", ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    result = _sync(server, token, tree)
+    assert result.counts == {"touched": 1, "unchanged": 1}
+
+
+def test_changed_file_conflicts(server, token, tree):
+    _sync(server, token, tree)
+    (tree / "a.txt").write_bytes(b"alpha, edited")
+    result = _sync(server, token, tree)
+    assert result.conflicts == ["a.txt"]
+
+
+def test_compare_remote(server, token, tree):
+    server.add_file(b"alpha", "docs/a.txt")
+    server.add_file(b"gone", "docs/old.txt")
+    result = _sync(server, token, tree, compare_remote=True)
+    assert result.counts == {"adopted": 1, "uploaded": 1}
+    assert result.remote_only == ["docs/old.txt"]
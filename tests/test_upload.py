@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from pytsfiler import decode2binary, get_md5, upload_binary, upload_file
+
+
+def test_upload_binary_round_trip(server, token):
+    data = os.urandom(10000)
+    result = upload_binary(data, "a.bin", token, server.base_url)
+    assert result["success"]
+    assert server.files[result["fileId"]].md5 == get_md5(data)
+    assert decode2binary(result["fileId"], token, server.base_url) == data
+
+
+@pytest.mark.parametrize("size", [0, 15, 16, 8192 * 3 + 5])
+def test_upload_file_streaming(server, token, tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "in.bin"
+    path.write_bytes(data)
+    result = upload_file(str(path), "streamed.bin", token, server.base_url, stream=True)
+    assert server.plaintext(result["fileId"]) == data
+
+
+def test_upload_existing_path_raises(server, token):
+    upload_binary(b"one", "same.txt", token, server.base_url)
+    with pytest.raises(FileExistsError):
+        upload_binary(b"two", "same.txt", token, server.base_url)
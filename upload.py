@@ -0,0 +1,665 @@
+"""
+Uploading files: signed single-PUT uploads (in memory or streamed from disk),
+chunked parallel uploads with per-part retries, upload confirmation, and the
+token-authenticated direct upload endpoint.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+import requests
+
+from . import compression, metrics
+from .config import DEFAULT_CONFIG
+from .crypto import BLOCK_SIZE, _encrypt_padded, _new_cipher, pkcs7_tail
+from .exceptions import UploadError
+from .integrity import CHUNK_DIGESTS_FIELD
+from .metadata import putMetaData
+from .scheduler import _transfer
+from .session import TSFSession, _http, _ssl_verify
+
+
+def _compress_for_upload(data: bytes, compress: Union[bool, str, None]) -> Tuple[bytes, Optional[str]]:
+    """compress 指定に従って圧縮し、(送信するデータ, コーデック名 or None) を返す"""
+    if not compress:
+        return data, None
+    codec = compression.resolve_codec("auto" if compress is True else compress)
+    if not compression.is_compressible(data, codec):
+        return data, None
+    return compression.compress(data, codec), codec
+
+
+def _record_compression(
+    file_id: Any,
+    codec: str,
+    original_size: int,
+    jwt_token: str,
+    base_url: str,
+    session: Optional[TSFSession]
+) -> None:
+    """使用したコーデックをメタデータAPIに記録する"""
+    record = compression.metadata_record(file_id, codec, original_size)
+    putMetaData(jwt_token, base_url.rstrip("/"), record, session=session).raise_for_status()
+
+
+def get_md5(data: bytes) -> str:
+    """
+    バイナリデータのMD5を計算し、16進文字列として返す
+    """
+    started = metrics.start()
+    md5_hash = hashlib.md5(data).hexdigest()
+    metrics.record(metrics.MD5, started, len(data))
+    return md5_hash
+
+
+def _request_signed_upload(
+    original_path: str,
+    md5_hex: str,
+    jwt_token: str,
+    base_url: str,
+    session: Optional[TSFSession] = None,
+    extra: Optional[dict] = None
+) -> dict:
+    """
+    /upload/signed に originalPath と md5 を POST し、signedUrl・鍵・IV を含むメタデータを返す
+    extra を渡した場合はペイロードに追加する
+    """
+    payload = {
+        "originalPath": original_path,
+        "md5": md5_hex
+    }
+    if extra:
+        payload.update(extra)
+    headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    started = metrics.start()
+    resp = _http(session).post(urljoin(base_url, "upload/signed"), json=payload, headers=headers, verify=_ssl_verify(session))
+    metrics.record(metrics.SIGNED_URL, started)
+
+    # Handle 409 Conflict (file already exists)
+    if resp.status_code == 409:
+        error_data = resp.json()
+        raise FileExistsError(f"File already exists: {error_data.get('error', 'Unknown error')}")
+
+    resp.raise_for_status()
+    meta = resp.json()
+
+    if "error" in meta:
+        raise FileExistsError(f"Upload error: {meta['error']}")
+    return meta
+
+
+def upload_binary(
+    data: bytes,
+    original_path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    session: Optional[TSFSession] = None,
+    compress: Union[bool, str, None] = None
+) -> dict:
+    """
+    1. /upload/signed エンドポイントに POST して、signedUrlなどの暗号化情報を取得
+    2. 得られた鍵・IVで data を暗号化
+    3. signedUrl に PUT リクエストを送信
+    4. 成功したら fileId 等を返す
+
+    compress に "zlib" / "zstd" / "auto" (True と同じ) を渡すと、暗号化の前に圧縮する。
+    サンプルが十分に縮まないデータ (圧縮済みの画像・動画など) はそのまま送る。
+    圧縮した場合はコーデックを /upload/signed とメタデータAPIに記録するので、
+    decode2binary(..., decompress="auto") で元のデータに戻せる。
+    md5 は圧縮前のデータのものを送る。
+
+    戻り値:
+      {
+        "fileId": number,
+        "uploadedSize": number,  # アップロードしたバイト数
+        "compression": str | None,  # 使用したコーデック
+      }
+    """
+    original_size = len(data)
+    md5_hex = get_md5(data)
+    data, codec = _compress_for_upload(data, compress)
+
+    # (1) メタデータ取得: originalPath, md5を含むペイロードを送信
+    extra = {compression.DOWNLOAD_FIELD: codec} if codec else None
+    meta = _request_signed_upload(original_path, md5_hex, jwt_token, base_url, session, extra=extra)
+
+    # signedUrl等を取得
+    signed_url = meta["signedUrl"]
+    file_id = meta["fileId"]
+
+    # (2) 得られた鍵・IVで暗号化
+    #     ※ サーバー側で "aes-256-cbc" と言っているなら 16バイトIV のCBCモードを想定
+    #     CBCモードの場合、ブロックサイズに合わせてパディング
+    encrypted_data = _encrypt_padded(data, meta["aesKeyBase64"], meta["ivBase64"], meta["algorithm"])
+
+    # (3) PUT でアップロード (Content-Type は任意。binaryとして送信)
+    started = metrics.start()
+    put_resp = _transfer(session, "PUT", signed_url, data=encrypted_data, headers={"Content-Type": "application/octet-stream"})
+    put_resp.raise_for_status()
+    metrics.record(metrics.SIGNED_PUT, started, len(encrypted_data))
+
+    # (4) アップロード完了を確認
+    confirmation = confirm_upload(file_id, jwt_token, base_url, session)
+    if codec:
+        _record_compression(file_id, codec, original_size, jwt_token, base_url, session)
+
+    return {
+        "fileId": file_id,
+        "uploadedSize": len(encrypted_data),
+        "finalFilesize": confirmation.get("filesize", len(encrypted_data)),
+        "success": confirmation.get("success", True),
+        "compression": codec
+    }
+
+
+def get_file_md5(file_path: str, buffer_size: int = DEFAULT_CONFIG["chunk_size"]) -> str:
+    """
+    ファイルを buffer_size バイトずつ読み込みながらMD5を計算し、16進文字列として返す
+    """
+    started = metrics.start()
+    md5_hash = hashlib.md5()
+    size = 0
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            md5_hash.update(block)
+            size += len(block)
+    metrics.record(metrics.MD5, started, size)
+    return md5_hash.hexdigest()
+
+
+def _part_md5s(data: bytes, part_size: int) -> List[str]:
+    """data を part_size ごとに区切った各パートのMD5を返す (空データは 1 パート)"""
+    started = metrics.start()
+    view = memoryview(data)
+    digests = [
+        hashlib.md5(view[offset:offset + part_size]).hexdigest()
+        for offset in range(0, max(len(data), 1), part_size)
+    ]
+    metrics.record(metrics.MD5, started, len(data))
+    return digests
+
+
+def _file_md5s(
+    file_path: str,
+    part_size: int,
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"]
+) -> Tuple[str, List[str]]:
+    """
+    ファイルを 1 度だけ読みながら、ファイル全体のMD5と part_size ごとの
+    各パートのMD5を同時に計算し、(全体, [パート...]) を返す
+    """
+    if part_size <= 0:
+        raise ValueError("part_size must be positive")
+    started = metrics.start()
+    md5_hash = hashlib.md5()
+    part_hashes = [hashlib.md5()]
+    part_filled = size = 0
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(buffer_size), b""):
+            md5_hash.update(block)
+            size += len(block)
+            view = memoryview(block)
+            while view:
+                if part_filled == part_size:
+                    part_hashes.append(hashlib.md5())
+                    part_filled = 0
+                piece = view[:part_size - part_filled]
+                part_hashes[-1].update(piece)
+                part_filled += len(piece)
+                view = view[len(piece):]
+    metrics.record(metrics.MD5, started, size)
+    return md5_hash.hexdigest(), [h.hexdigest() for h in part_hashes]
+
+
+class _EncryptingReader:
+    """
+    File-like request body that AES-CBC encrypts a local file on the fly.
+
+    ``len()`` reports the padded ciphertext size up front so the PUT carries a
+    Content-Length (signed storage URLs generally reject chunked bodies), while
+    ``read()`` only ever holds about ``buffer_size`` bytes in memory.
+    """
+
+    def __init__(self, f: BinaryIO, size: int, cipher: Any, buffer_size: int) -> None:
+        block = BLOCK_SIZE
+        self._file = f
+        self._size = size
+        self._cipher = cipher
+        self._read_size = max(block, buffer_size - buffer_size % block)
+        self._length = (size // block + 1) * block
+        self._consumed = 0
+        self._carry = b""
+        self._out = bytearray()
+        self._eof = False
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(self._read_size), b"")
+
+    def _fill(self) -> None:
+        raw = self._file.read(self._read_size)
+        if raw:
+            self._consumed += len(raw)
+            if self._consumed > self._size:
+                raise ValueError("File grew while it was being uploaded")
+            data = self._carry + raw if self._carry else raw
+            aligned = len(data) - len(data) % BLOCK_SIZE
+            self._carry = data[aligned:]
+            if aligned:
+                self._out += self._cipher.encrypt(data[:aligned])
+            return
+        if self._consumed != self._size:
+            raise ValueError("File shrank while it was being uploaded")
+        # 最後の端数だけをパディングして暗号化
+        self._out += self._cipher.encrypt(pkcs7_tail(self._carry))
+        self._carry = b""
+        self._eof = True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        while not self._eof and (size is None or size < 0 or len(self._out) < size):
+            self._fill()
+        if size is None or size < 0:
+            size = len(self._out)
+        data = bytes(self._out[:size])
+        del self._out[:size]
+        return data
+
+
+def upload_file_streaming(
+    file_path: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    buffer_size: int = DEFAULT_CONFIG["chunk_size"],
+    md5_hex: Optional[str] = None,
+    session: Optional[TSFSession] = None
+) -> dict:
+    """
+    Upload a local file with memory bounded by ``buffer_size``.
+
+    The MD5 is computed in one streaming read of the file, then the file is
+    read again and encrypted block by block directly into the signed PUT body.
+    Neither the plaintext nor the ciphertext is ever held in memory as a whole.
+
+    Args:
+        file_path: Path to file to upload
+        original_path: Path recorded on the server
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        buffer_size: Number of bytes read and encrypted per step
+        md5_hex: Precomputed MD5 of the file, skips the hashing pass
+        session: Optional pooled session to send the requests through
+
+    Returns:
+        Dict with upload result, same shape as upload_binary
+    """
+    if md5_hex is None:
+        md5_hex = get_file_md5(file_path, buffer_size)
+    meta = _request_signed_upload(original_path, md5_hex, jwt_token, base_url, session)
+
+    file_id = meta["fileId"]
+    cipher = _new_cipher(meta["aesKeyBase64"], meta["ivBase64"], meta["algorithm"])
+
+    # 暗号化は送信と交互に行われるため、signed_put の時間に含まれる
+    started = metrics.start()
+    with open(file_path, "rb") as f:
+        body = _EncryptingReader(f, os.fstat(f.fileno()).st_size, cipher, buffer_size)
+        # 本文はストリームのため再送できず、スケジューラは並列度の制御のみ行う
+        put_resp = _transfer(session, "PUT", meta["signedUrl"], data=body, headers={"Content-Type": "application/octet-stream"})
+    put_resp.raise_for_status()
+    metrics.record(metrics.SIGNED_PUT, started, len(body))
+
+    confirmation = confirm_upload(file_id, jwt_token, base_url, session)
+
+    return {
+        "fileId": file_id,
+        "uploadedSize": len(body),
+        "finalFilesize": confirmation.get("filesize", len(body)),
+        "success": confirmation.get("success", True)
+    }
+
+
+def _put_part(
+    url: str,
+    encrypted: Union[bytes, bytearray],
+    index: int,
+    max_retries: int,
+    retry_backoff: float,
+    session: Optional[TSFSession]
+) -> None:
+    """暗号化済みパートを PUT する。失敗したパートだけをスケジューラが指数バックオフで再送する"""
+    started = metrics.start()
+    try:
+        put_resp = _transfer(
+            session, "PUT", url, data=encrypted, headers={"Content-Type": "application/octet-stream"},
+            max_retries=max_retries, retry_backoff=retry_backoff,
+        )
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+        raise UploadError(f"Part {index} failed after {max_retries + 1} attempts: {e}") from e
+    if put_resp.status_code >= 500 or put_resp.status_code == 429:
+        raise UploadError(f"Part {index} failed after {max_retries + 1} attempts: HTTP {put_resp.status_code}")
+    put_resp.raise_for_status()
+    metrics.record(metrics.SIGNED_PUT, started, len(encrypted))
+
+
+def _request_part_urls(
+    size: int,
+    md5_hex: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str,
+    part_size: int,
+    session: Optional[TSFSession],
+    part_md5s: Optional[List[str]] = None,
+    codec: Optional[str] = None
+) -> dict:
+    """
+    /upload/signed にパート数を伝え、パートごとの signedUrls・鍵・IV を含むメタデータを返す
+    part_md5s を渡した場合は、ダウンロード時の検証用に各パート平文のMD5として記録させる
+    codec を渡した場合は、/download で返せるよう圧縮コーデックも記録させる
+    """
+    if part_size <= 0:
+        raise ValueError("part_size must be positive")
+
+    part_count = max(1, -(-size // part_size))
+    extra: Dict[str, Any] = {"chunkCount": part_count, "chunkSize": part_size}
+    if part_md5s is not None:
+        extra[CHUNK_DIGESTS_FIELD] = part_md5s
+    if codec:
+        extra[compression.DOWNLOAD_FIELD] = codec
+    meta = _request_signed_upload(original_path, md5_hex, jwt_token, base_url, session, extra=extra)
+    if meta.get("signedUrls") is None and part_count == 1:
+        meta["signedUrls"] = [meta["signedUrl"]]
+        meta["aesKeysBase64"] = [meta["aesKeyBase64"]]
+        meta["ivsBase64"] = [meta["ivBase64"]]
+    for field_name in ("signedUrls", "aesKeysBase64", "ivsBase64"):
+        if len(meta.get(field_name) or []) != part_count:
+            raise UploadError(f"Server did not return {part_count} signed part URLs; chunked upload unsupported")
+    return meta
+
+
+def _send_parts(
+    read_part: Callable[[int], bytes],
+    meta: dict,
+    indices: List[int],
+    max_workers: int,
+    max_retries: int,
+    retry_backoff: float,
+    session: Optional[TSFSession],
+    on_part_done: Optional[Callable[[int, bytes, int], None]] = None
+) -> int:
+    """
+    indices で指定したパートを並列に暗号化して PUT し、送信した暗号文の合計バイト数を返す。
+    on_part_done(index, plaintext, encrypted_size) は各パートの PUT 成功後に呼ばれる。
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    if not indices:
+        return 0
+
+    urls, keys, ivs = meta["signedUrls"], meta["aesKeysBase64"], meta["ivsBase64"]
+    algorithm = meta["algorithm"]
+
+    def send(index: int) -> int:
+        plaintext = read_part(index)
+        encrypted = _encrypt_padded(plaintext, keys[index], ivs[index], algorithm)
+        _put_part(urls[index], encrypted, index, max_retries, retry_backoff, session)
+        if on_part_done is not None:
+            on_part_done(index, plaintext, len(encrypted))
+        return len(encrypted)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(indices))) as executor:
+        return sum(executor.map(send, indices))
+
+
+def _upload_parts(
+    read_part: Callable[[int], bytes],
+    size: int,
+    md5_hex: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str,
+    part_size: int,
+    max_workers: int,
+    max_retries: int,
+    retry_backoff: float,
+    session: Optional[TSFSession],
+    part_md5s: Optional[List[str]] = None,
+    codec: Optional[str] = None
+) -> dict:
+    meta = _request_part_urls(
+        size, md5_hex, original_path, jwt_token, base_url, part_size, session, part_md5s, codec
+    )
+    part_count = len(meta["signedUrls"])
+    uploaded_size = _send_parts(
+        read_part, meta, list(range(part_count)), max_workers, max_retries, retry_backoff, session
+    )
+
+    confirmation = confirm_upload(meta["fileId"], jwt_token, base_url, session)
+
+    return {
+        "fileId": meta["fileId"],
+        "uploadedSize": uploaded_size,
+        "finalFilesize": confirmation.get("filesize", uploaded_size),
+        "success": confirmation.get("success", True),
+        "parts": part_count
+    }
+
+
+def upload_binary_chunked(
+    data: bytes,
+    original_path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    part_size: int = 8 * 1024 * 1024,
+    max_workers: int = 4,
+    max_retries: int = DEFAULT_CONFIG["max_retries"],
+    retry_backoff: float = DEFAULT_CONFIG["retry_backoff"],
+    session: Optional[TSFSession] = None,
+    compress: Union[bool, str, None] = None
+) -> dict:
+    """
+    Upload ``data`` as independently encrypted parts PUT in parallel.
+
+    The data is split into ``part_size`` parts. /upload/signed is called with
+    ``chunkCount`` and ``chunkSize`` and must answer with one signed URL, AES
+    key and IV per part (``signedUrls``, ``aesKeysBase64``, ``ivsBase64``).
+    Each part is padded and encrypted on its own, which is the same layout
+    decode2binary reads back through ``urls``/``keys``/``ivs``. A failed part
+    is retried on its own with exponential backoff; the others are not resent.
+    The MD5 of every part is sent as ``chunkMd5s`` so that downloads with
+    ``verify=True`` can tell which chunk is corrupt.
+
+    Args:
+        data: Binary data to upload
+        original_path: Path recorded on the server
+        jwt_token: JWT token for authentication
+        base_url: Server base URL
+        part_size: Plaintext bytes per part
+        max_workers: Number of parts uploaded concurrently
+        max_retries: Retries per part for timeouts, connection errors, 429 and 5xx
+        retry_backoff: Exponential backoff base in seconds
+        session: Optional pooled session to send the requests through
+        compress: Compress before encrypting, as in upload_binary; parts are
+            cut from the compressed stream
+
+    Returns:
+        Dict with upload result, as upload_binary plus the number of ``parts``
+    """
+    original_size = len(data)
+    md5_hex = get_md5(data)
+    data, codec = _compress_for_upload(data, compress)
+    view = memoryview(data)
+
+    def read_part(index: int) -> bytes:
+        return bytes(view[index * part_size:(index + 1) * part_size])
+
+    result = _upload_parts(
+        read_part, len(data), md5_hex, original_path, jwt_token, base_url,
+        part_size, max_workers, max_retries, retry_backoff, session, _part_md5s(data, part_size), codec
+    )
+    if codec:
+        _record_compression(result["fileId"], codec, original_size, jwt_token, base_url, session)
+    result["compression"] = codec
+    return result
+
+
+def upload_file_chunked(
+    file_path: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    part_size: int = 8 * 1024 * 1024,
+    max_workers: int = 4,
+    max_retries: int = DEFAULT_CONFIG["max_retries"],
+    retry_backoff: float = DEFAULT_CONFIG["retry_backoff"],
+    session: Optional[TSFSession] = None
+) -> dict:
+    """
+    Upload a local file with upload_binary_chunked's multi-part layout.
+
+    Parts are read from disk by the worker that sends them, so memory stays
+    around ``part_size * max_workers`` regardless of the file size. The
+    whole-file and per-part MD5s are computed in the same read of the file.
+    """
+    size = os.path.getsize(file_path)
+    md5_hex, part_md5s = _file_md5s(file_path, part_size)
+
+    def read_part(index: int) -> bytes:
+        with open(file_path, "rb") as f:
+            f.seek(index * part_size)
+            return f.read(part_size)
+
+    return _upload_parts(
+        read_part, size, md5_hex, original_path, jwt_token, base_url,
+        part_size, max_workers, max_retries, retry_backoff, session, part_md5s
+    )
+
+
+def upload_file(
+    file_path: str,
+    original_path: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    stream: bool = False,
+    session: Optional[TSFSession] = None,
+    compress: Union[bool, str, None] = None
+) -> dict:
+    """
+    ローカルファイルを読み込んでバイナリ化し、upload_binary を呼び出すラッパ関数
+
+    stream=True の場合はファイル全体をメモリに載せず、upload_file_streaming で
+    読み込みながら暗号化してアップロードする。
+    compress は upload_binary と同じ。圧縮後のサイズは事前に分からないため、
+    stream=True とは併用できない。
+    """
+    if stream:
+        if compress:
+            raise ValueError("compress cannot be combined with stream=True")
+        return upload_file_streaming(file_path, original_path, jwt_token, base_url, session=session)
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    result = upload_binary(data, original_path, jwt_token, base_url, session, compress)
+    return result
+
+
+def confirm_upload(
+    file_id: str,
+    jwt_token: str,
+    base_url: str = "https://localhost:3000",
+    session: Optional[TSFSession] = None
+) -> dict[str, Any]:
+    """Confirm upload completion and get final file size."""
+    payload = {"fileId": file_id}
+    headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    started = metrics.start()
+    response = _http(session).post(urljoin(base_url, "upload/signed/confirm"), json=payload, headers=headers, verify=_ssl_verify(session))
+    response.raise_for_status()
+    result = response.json()
+    metrics.record(metrics.CONFIRM, started)
+    if "error" in result:
+        raise ValueError(f"Upload confirmation failed: {result['error']}")
+    return result
+
+
+def upload_file_direct(
+    file_path: str,
+    upload_token: str,
+    base_url: str = "https://localhost:3000",
+    session: Optional[TSFSession] = None
+) -> dict:
+    """
+    Upload a file using the direct upload endpoint with token authentication.
+    
+    Args:
+        file_path: Path to file to upload
+        upload_token: Upload token for authentication
+        base_url: Server base URL
+        session: Optional pooled session to send the request through
+        
+    Returns:
+        Dict with upload result
+    """
+
+    # Read file data
+    with open(file_path, "rb") as f:
+        file_data = f.read()
+
+    # Prepare the request
+    filename = os.path.basename(file_path)
+    files = {'file': (filename, file_data)}
+    data = {'filename': filename}
+    headers = {'Authorization': f'Bearer {upload_token}'}
+
+    # Upload file
+    response = _transfer(session, "POST", urljoin(base_url, "upload/direct"),
+                           files=files,
+                           data=data,
+                           headers=headers,
+                           verify=_ssl_verify(session))
+    response.raise_for_status()
+    return response.json()
+
+
+def upload_binary_direct(
+    data: bytes,
+    filename: str,
+    upload_token: str,
+    base_url: str = "https://localhost:3000",
+    session: Optional[TSFSession] = None
+) -> dict:
+    """
+    Upload binary data using the direct upload endpoint with token authentication.
+    
+    Args:
+        data: Binary data to upload
+        filename: Name for the uploaded file
+        upload_token: Upload token for authentication
+        base_url: Server base URL
+        session: Optional pooled session to send the request through
+        
+    Returns:
+        Dict with upload result
+    """
+    # Prepare the request
+    files = {'file': (filename, data)}
+    data_payload = {'filename': filename}
+    headers = {'Authorization': f'Bearer {upload_token}'}
+
+    # Upload file
+    response = _transfer(session, "POST", urljoin(base_url, "upload/direct"),
+                           files=files,
+                           data=data_payload,
+                           headers=headers,
+                           verify=_ssl_verify(session))
+    response.raise_for_status()
+    return response.json()